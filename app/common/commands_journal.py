@@ -0,0 +1,184 @@
+"""
+Stored commands: a JSON snapshot (`{"commands": [...]}`, the format other tools read)
+plus an append-only journal of edits next to it, one JSON object per line::
+
+    {"seq": 12, "add": "claw|60;"}
+    {"seq": 13, "remove": [3, 7]}
+
+Every edit appends one line. When the journal grows past `compact_size` entries
+it is renamed to `<journal>.old` and a new snapshot is written on a background
+thread, then the old journal is deleted. The snapshot records the last `seq`
+it contains, so entries already in it are skipped if compaction was interrupted.
+`close(commands)` writes the snapshot at exit, so the commands JSON read by other
+tools (timeline, runner, optimizer) is up to date.
+"""
+
+import json
+import logging
+import threading
+from pathlib import Path
+from typing import TYPE_CHECKING, Any, Optional
+
+import config
+
+if TYPE_CHECKING:
+    from io import TextIOWrapper
+
+log = logging.getLogger(__name__)
+
+COMMANDS_KEY = "commands"
+SEQ_KEY = "journal_seq"
+JOURNAL_SUFFIX = ".journal"
+OLD_JOURNAL_SUFFIX = ".old"
+
+
+def apply_entry(commands: "list[str]", entry: "dict[str, Any]") -> None:
+    if "add" in entry:
+        commands.append(entry["add"])
+        return
+    for row in sorted(entry["remove"], reverse=True):
+        del commands[row]
+
+
+class CommandsJournal:
+    def __init__(
+        self,
+        filepath: Path,
+        compact_size: int = config.COMMANDS_JOURNAL_COMPACT_SIZE,
+    ) -> None:
+        """
+        :param filepath: snapshot, the journal is `<filepath>.journal`
+        :param compact_size: journal entries to start compaction at
+        """
+        self.filepath = filepath
+        self.journal_path = filepath.with_name(filepath.name + JOURNAL_SUFFIX)
+        self.old_journal_path = self.journal_path.with_name(
+            self.journal_path.name + OLD_JOURNAL_SUFFIX,
+        )
+        self.compact_size = compact_size
+        self.seq = 0
+        self.entries = 0
+        self._journal: "Optional[TextIOWrapper]" = None
+        self._compaction: Optional[threading.Thread] = None
+
+    def load(self) -> "list[str]":
+        """
+        :return: commands from the snapshot with journal edits applied
+        """
+        commands: "list[str]" = []
+        snapshot_seq = 0
+        if self.filepath.exists():
+            with self.filepath.open("r") as file:
+                data = json.load(file)
+            commands = list(data.get(COMMANDS_KEY, []))
+            snapshot_seq = data.get(SEQ_KEY, 0)
+        self.seq = snapshot_seq
+        self.entries = 0
+        for path in (self.old_journal_path, self.journal_path):
+            if not path.exists():
+                continue
+            with path.open("r") as file:
+                for number, line in enumerate(file, 1):
+                    try:
+                        entry = json.loads(line)
+                    except ValueError:
+                        # torn last line of an interrupted write
+                        log.warning("Skip invalid journal line %s:%s", path, number)
+                        continue
+                    self.seq = max(self.seq, entry["seq"])
+                    if entry["seq"] <= snapshot_seq:
+                        continue
+                    apply_entry(commands, entry)
+                    self.entries += 1
+        return commands
+
+    def add(self, command: str) -> None:
+        self.append({"add": command})
+
+    def remove(self, rows: "list[int]") -> None:
+        """
+        :param rows: rows before removal
+        :return:
+        """
+        self.append({"remove": rows})
+
+    def append(self, entry: "dict[str, Any]") -> None:
+        if self._journal is None:
+            self._journal = self.journal_path.open("a")
+        self.seq += 1
+        self._journal.write(json.dumps({"seq": self.seq, **entry}) + "\n")
+        self._journal.flush()
+        self.entries += 1
+
+    def needs_compaction(self) -> bool:
+        return self.entries >= self.compact_size and not self.is_compacting()
+
+    def is_compacting(self) -> bool:
+        return self._compaction is not None and self._compaction.is_alive()
+
+    def rotate(self) -> None:
+        """
+        Move journal entries to the old journal, deleted once the snapshot is written
+        """
+        if self._journal is not None:
+            self._journal.close()
+            self._journal = None
+        if self.journal_path.exists() and self.old_journal_path.exists():
+            # left by an interrupted compaction, keep both until the snapshot is written
+            with self.old_journal_path.open("a") as old_journal:
+                old_journal.write(self.journal_path.read_text())
+            self.journal_path.unlink()
+        elif self.journal_path.exists():
+            self.journal_path.rename(self.old_journal_path)
+        self.entries = 0
+
+    def compact(self, commands: "list[str]") -> None:
+        """
+        Start writing the snapshot on a background thread
+
+        :param commands: current commands, copied
+        :return:
+        """
+        if self.is_compacting():
+            return
+        self.rotate()
+        self._compaction = threading.Thread(
+            target=self.write_snapshot,
+            args=(list(commands), self.seq),
+            name="commands-compaction",
+            daemon=True,
+        )
+        self._compaction.start()
+
+    def write_snapshot(self, commands: "list[str]", seq: int) -> None:
+        tmp_path = self.filepath.with_name(self.filepath.name + ".tmp")
+        try:
+            with tmp_path.open("w") as file:
+                json.dump({COMMANDS_KEY: commands, SEQ_KEY: seq}, file, indent=2)
+            tmp_path.replace(self.filepath)
+            self.old_journal_path.unlink(missing_ok=True)
+        except OSError:
+            log.exception("Commands compaction to %s failed", self.filepath)
+            return
+        log.info("Compacted %s commands to %s", len(commands), self.filepath)
+
+    def close(self, commands: "Optional[list[str]]" = None) -> None:
+        """
+        Wait for compaction, write the snapshot if there are edits not in it yet,
+        so tools reading the commands JSON see them
+
+        :param commands: current commands, only the journal is closed if None
+        :return:
+        """
+        if self._compaction is not None:
+            self._compaction.join()
+            self._compaction = None
+        if self._journal is not None:
+            self._journal.close()
+            self._journal = None
+        if commands is None:
+            return
+        if not self.journal_path.exists() and not self.old_journal_path.exists():
+            return
+        self.rotate()
+        self.write_snapshot(list(commands), self.seq)
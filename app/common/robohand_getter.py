@@ -12,6 +12,9 @@ if TYPE_CHECKING:
     )
     from robohandcontrol.ri_sdk_robocontrol.robocontrol import RobohandRISDKControl
     from robohandcontrol.robocontrol import RobohandControlBase
+    from robohandcontrol.simulated_robocontrol.robocontrol import (
+        RobohandSimulatedControl,
+    )
 
 
 def get_robohand_for_ri_sdk() -> "RobohandRISDKControl":
@@ -28,6 +31,15 @@ def get_robohand_for_adafruit_servokit() -> "RobohandAdafruitServoKitControl":
     return RobohandAdafruitServoKitControl()
 
 
+def get_robohand_simulated() -> "RobohandSimulatedControl":
+    from robohandcontrol.calibration import load_calibrations
+    from robohandcontrol.simulated_robocontrol.robocontrol import (
+        RobohandSimulatedControl,
+    )
+
+    return RobohandSimulatedControl(calibrations=load_calibrations())
+
+
 def get_robohand_socket_client_mode() -> "RobohandControlClientSocket":
     import config
     from robohandcontrol.client_socket_robocontrol.robocontrol import (
@@ -38,18 +50,22 @@ def get_robohand_socket_client_mode() -> "RobohandControlClientSocket":
         server_host=config.SERVER_IP_CONNECT,
         server_port=config.SERVER_PORT,
         command_splitter=config.COMMAND_SPLITTER,
+        binary_protocol="--binary-protocol" in sys.argv,
     )
 
 
-def robohand_control() -> "RobohandControlBase":
+def get_robohand_backend() -> "RobohandControlBase":
     run_sdk_mode = "--ri-sdk-mode" in sys.argv
     run_adafruit_servokit_mode = "--adafruit-servokit-mode" in sys.argv
     socket_client_mode = "--socket-client-mode" in sys.argv
-    if (run_sdk_mode + run_adafruit_servokit_mode + socket_client_mode) > 1:
+    simulated_mode = "--simulated-mode" in sys.argv
+    if (
+        run_sdk_mode + run_adafruit_servokit_mode + socket_client_mode + simulated_mode
+    ) > 1:
         msg = (
             "You cannot run more than one of "
             "`--ri-sdk-mode` / `--adafruit-servokit-mode` / `--socket-client-mode`"
-            ". Please choose either one"
+            " / `--simulated-mode`. Please choose either one"
         )
         raise ValueError(msg)
     if run_sdk_mode:
@@ -58,4 +74,51 @@ def robohand_control() -> "RobohandControlBase":
         return get_robohand_for_adafruit_servokit()
     if socket_client_mode:
         return get_robohand_socket_client_mode()
+    if simulated_mode:
+        return get_robohand_simulated()
     return LoggedRobohandControl()
+
+
+def robohand_control() -> "RobohandControlBase":
+    robohand = get_robohand_backend()
+    if "--smooth-motion" in sys.argv:
+        from robohandcontrol.trajectory import TrajectoryStreamer
+
+        # interpolated setpoints instead of jumps straight to the target
+        robohand = TrajectoryStreamer(robohand)
+    if "--cache-writes" in sys.argv:
+        from robohandcontrol.cached_robohand import CachedRobohandControl
+        from robohandcontrol.client_socket_robocontrol.robocontrol import (
+            RobohandControlClientSocket,
+        )
+
+        cached = CachedRobohandControl(robohand)
+        backend = unwrap_backend(robohand)
+        if isinstance(backend, RobohandControlClientSocket):
+            # server state is unknown after reconnect
+            backend.add_connected_handler(cached.invalidate)
+        return cached
+    return robohand
+
+
+def backend_chain(robohand: "RobohandControlBase") -> "list[RobohandControlBase]":
+    """
+    :param robohand: backend possibly wrapped by `robohand_control()`
+    :return: every wrapper from the outside in, the backend itself is the last
+    """
+    from robohandcontrol.cached_robohand import CachedRobohandControl
+    from robohandcontrol.trajectory import TrajectoryStreamer
+
+    chain = [robohand]
+    while isinstance(robohand, (CachedRobohandControl, TrajectoryStreamer)):
+        robohand = robohand.robohand
+        chain.append(robohand)
+    return chain
+
+
+def unwrap_backend(robohand: "RobohandControlBase") -> "RobohandControlBase":
+    """
+    :param robohand: backend possibly wrapped by `robohand_control()`
+    :return: the backend itself
+    """
+    return backend_chain(robohand)[-1]
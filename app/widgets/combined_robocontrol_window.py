@@ -1,7 +1,9 @@
 import logging
 import sys
+from typing import TYPE_CHECKING, Optional
 
-from PySide6.QtCore import QModelIndex, Qt
+from PySide6.QtCore import QModelIndex, Qt, Signal
+from PySide6.QtGui import QCloseEvent
 from PySide6.QtWidgets import QApplication, QHBoxLayout, QSplitter, QWidget
 
 import config
@@ -12,18 +14,49 @@ from app.widgets.robocontol_predefined_commands import (
     RoboControlPredefinedCommandsWidget,
 )
 from app.widgets.robocontrol import RoboControlWindow
-from robohandcontrol.robocontrol import RobohandControlBase
+from robohandcontrol.motion_recorder import (
+    MotionRecorder,
+    keyframe_commands,
+    write_recorded_timeline,
+)
+from robohandcontrol.robocontrol import Pose, RobohandControlBase
+from robohandcontrol.sequence_protocol import SequenceEvent, SequenceState
+from robohandcontrol.timeline import compile_commands, load_timeline
+
+if TYPE_CHECKING:
+    from robohandcontrol.client_socket_robocontrol.robocontrol import (
+        RobohandControlClientSocket,
+    )
+    from robohandcontrol.motion_timing import MotionScheduler
+
+log = logging.getLogger(__name__)
 
 
 class CombinedRoboControlWindow(QWidget):
+    # server sequence event prefix and args, emitted from the client reader thread
+    sequence_event = Signal(str, object)
+
     def __init__(
         self,
         robohand: RobohandControlBase,
         store_commands_filename: "str | None" = None,
+        remote_sequence: "Optional[RobohandControlClientSocket]" = None,
+        motion_scheduler: "Optional[MotionScheduler]" = None,
     ) -> None:
+        """
+        :param robohand:
+        :param store_commands_filename:
+        :param remote_sequence: if set, stored commands are played by the server
+        :param motion_scheduler: if set, commands are played with motion timing
+        """
         super().__init__()
+        self.remote_sequence = remote_sequence
+        self.motion_scheduler = motion_scheduler
+        self.remote_sequence_running = False
 
-        self.robo_control = RoboControlWindow(robohand)
+        # every command from the controls passes through, sampled while recording
+        self.recorder = MotionRecorder(robohand)
+        self.robo_control = RoboControlWindow(self.recorder)
 
         self.predefined_commands = RoboControlPredefinedCommandsWidget(
             filename=store_commands_filename,
@@ -40,11 +73,15 @@ class CombinedRoboControlWindow(QWidget):
 
         self.register_actions()
         self.commands_timer = DelayedCommandsTimer(
-            handler=self.robo_control.set_state_from_commands,
+            handler=self.robo_control.set_state_from_pose,
+            motion_timing=motion_scheduler is not None,
         )
         self.commands_timer.timer_finished.connect(
             self.handle_run_commands_finished,
         )
+        if self.remote_sequence is not None:
+            self.sequence_event.connect(self.handle_sequence_event)
+            self.remote_sequence.add_sequence_event_handler(self.sequence_event.emit)
 
         self.setWindowTitle("RI RoboHand Control")
         self.setGeometry(400, 300, 1200, 600)
@@ -59,6 +96,7 @@ class CombinedRoboControlWindow(QWidget):
         self.predefined_commands.run_commands_button.clicked.connect(
             self.handle_run_commands,
         )
+        self.predefined_commands.record_button.toggled.connect(self.handle_record)
 
     def get_current_state_as_commands_text(self) -> str:
         states = []
@@ -75,25 +113,113 @@ class CombinedRoboControlWindow(QWidget):
         commands_text = self.get_current_state_as_commands_text()
         self.predefined_commands.add_element(commands_text)
 
+    def handle_record(self, checked: bool) -> None:
+        if checked:
+            self.recorder.start()
+            return
+        self.recorder.stop()
+        poses, durations = self.recorder.keyframes()
+        commands = keyframe_commands(poses)
+        for commands_text in commands:
+            self.predefined_commands.add_element(commands_text)
+        log.info("Added %s recorded steps", len(commands))
+        write_recorded_timeline(
+            config.BASE_DIR / config.RECORD_TIMELINE,
+            poses,
+            durations,
+        )
+
     def handle_command_double_clicked(self, index: QModelIndex) -> None:
-        model = self.predefined_commands.string_list_model
-        command_value = model.data(index, Qt.DisplayRole)  # type: ignore[attr-defined]
-        self.robo_control.set_state_from_commands(command_value)
+        model = self.predefined_commands.commands_model
+        command_value = model.data(index, Qt.ItemDataRole.DisplayRole)
+        if command_value is not None:
+            self.robo_control.set_state_from_commands(command_value)
 
     def handle_run_commands_finished(self) -> None:
         self.commands_timer.reset()
+        self.remote_sequence_running = False
         self.predefined_commands.set_run_button_icon_play()
 
+    def handle_sequence_event(self, prefix: str, args: "tuple[str, ...]") -> None:
+        if prefix == SequenceEvent.PROGRESS:
+            model = self.predefined_commands.commands_model
+            index = model.index(int(args[0]))
+            self.predefined_commands.list_view.setCurrentIndex(index)
+        elif prefix == SequenceEvent.TIMING:
+            estimated, actual = args
+            log.info("Sequence took %s ms, estimated %s ms", actual, estimated)
+        elif prefix == SequenceEvent.STATE and args[0] in (
+            SequenceState.STOPPED,
+            SequenceState.FINISHED,
+        ):
+            self.handle_run_commands_finished()
+
+    def run_remote_sequence(
+        self,
+        remote_sequence: "RobohandControlClientSocket",
+    ) -> None:
+        if self.remote_sequence_running:
+            remote_sequence.stop_sequence()
+            self.handle_run_commands_finished()
+            return
+        model = self.predefined_commands.commands_model
+        steps = []
+        # server step indices are list rows in progress events, so no row is skipped
+        for row, commands in enumerate(model.commands()):
+            try:
+                steps.append(Pose.from_commands(commands))
+            except ValueError as e:
+                log.error("Invalid stored commands %r in row %s: %s", commands, row, e)
+                self.predefined_commands.list_view.setCurrentIndex(model.index(row))
+                return
+        remote_sequence.upload_sequence(steps)
+        remote_sequence.start_sequence(self.commands_timer.timeout)
+        self.remote_sequence_running = True
+        self.predefined_commands.set_run_button_icon_stop()
+
     def handle_run_commands(self) -> None:
-        if self.commands_timer.timer.isActive():
+        if self.remote_sequence is not None:
+            self.run_remote_sequence(self.remote_sequence)
+        elif self.commands_timer.timer.isActive():
             self.commands_timer.timer.stop()
             self.handle_run_commands_finished()
         else:
-            commands = self.predefined_commands.string_list_model.stringList()
-            self.commands_timer.reset(commands=commands)
+            steps = self.load_steps()
+            if steps is None:
+                return
+            self.commands_timer.reset(steps=steps)
             self.commands_timer.start()
             self.predefined_commands.set_run_button_icon_stop()
 
+    def load_steps(self) -> "Optional[list[tuple[Pose, int]]]":
+        """
+        :return: stored commands compiled to absolute poses and durations,
+            None if a command is invalid
+        """
+        model = self.predefined_commands.commands_model
+        filepath = self.predefined_commands.filepath
+        try:
+            if filepath is None:
+                poses, durations = compile_commands(
+                    model.commands(),
+                    self.motion_scheduler,
+                )
+                return list(zip(poses, durations))
+            # the timeline is compiled from the file, cached while it's not edited
+            model.save()
+            if not filepath.exists():
+                return []
+            with load_timeline(filepath, self.motion_scheduler) as timeline:
+                return list(timeline)
+        except ValueError as e:
+            log.error("Invalid stored commands: %s", e)
+            return None
+
+    def closeEvent(self, event: QCloseEvent) -> None:
+        # child widgets don't get the close event of the window
+        self.predefined_commands.commands_model.save()
+        super().closeEvent(event)
+
 
 def main() -> None:
     logging.basicConfig(level=logging.INFO)
@@ -0,0 +1,86 @@
+from typing import TYPE_CHECKING, Optional, Union
+
+from PySide6.QtCore import QAbstractListModel, QModelIndex, QPersistentModelIndex, Qt
+
+if TYPE_CHECKING:
+    from app.common.commands_journal import CommandsJournal
+
+    ModelIndex = Union[QModelIndex, QPersistentModelIndex]
+
+
+class CommandsListModel(QAbstractListModel):
+    """
+    Stored commands text, one per row. Edits notify the view about changed rows only
+    and are written to the journal if set.
+    """
+
+    def __init__(self, journal: "Optional[CommandsJournal]" = None) -> None:
+        super().__init__()
+        self.journal = journal
+        self._commands: "list[str]" = journal.load() if journal is not None else []
+
+    def rowCount(self, parent: "ModelIndex" = QModelIndex()) -> int:
+        if parent.isValid():
+            return 0
+        return len(self._commands)
+
+    def data(
+        self,
+        index: "ModelIndex",
+        role: int = Qt.ItemDataRole.DisplayRole,
+    ) -> Optional[str]:
+        if not index.isValid() or role != Qt.ItemDataRole.DisplayRole:
+            return None
+        row: int = index.row()
+        return self._commands[row]
+
+    def commands(self) -> "list[str]":
+        return list(self._commands)
+
+    def append(self, command: str) -> None:
+        row = len(self._commands)
+        self.beginInsertRows(QModelIndex(), row, row)
+        self._commands.append(command)
+        self.endInsertRows()
+        if self.journal is not None:
+            self.journal.add(command)
+            self.compact_if_needed()
+
+    def remove_rows(self, rows: "list[int]") -> None:
+        """
+        :param rows: any order, duplicates are ignored
+        :return:
+        """
+        rows = sorted(set(rows))
+        if not rows:
+            return
+        # contiguous ranges from the end, so earlier rows keep their numbers
+        end = rows[-1]
+        start = end
+        for row in reversed(rows[:-1]):
+            if row == start - 1:
+                start = row
+                continue
+            self.remove_range(start, end)
+            start = end = row
+        self.remove_range(start, end)
+        if self.journal is not None:
+            self.journal.remove(rows)
+            self.compact_if_needed()
+
+    def remove_range(self, first: int, last: int) -> None:
+        self.beginRemoveRows(QModelIndex(), first, last)
+        del self._commands[first : last + 1]
+        self.endRemoveRows()
+
+    def compact_if_needed(self) -> None:
+        if self.journal is not None and self.journal.needs_compaction():
+            self.journal.compact(self._commands)
+
+    def save(self) -> None:
+        """
+        Write edits to the commands file, e.g. before it is compiled
+        or when the widget is closed. The journal is reopened on the next edit.
+        """
+        if self.journal is not None:
+            self.journal.close(self._commands)
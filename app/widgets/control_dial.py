@@ -1,15 +1,9 @@
-from typing import Callable
-
-from PySide6.QtCore import Signal
 from PySide6.QtWidgets import QDial
 
-from app.widgets.debounced import Debounced
 from config import SERVO_MAX_ANGLE, SERVO_MIN_ANGLE
 
 
-class DebouncedDial(QDial):
-    changed = Signal(int)
-
+class ControlDial(QDial):
     def __init__(
         self,
         notches_visible: bool = True,
@@ -22,18 +16,5 @@ class DebouncedDial(QDial):
         self.setWrapping(wrapping)
         self.setRange(min_value, max_value)
 
-        self.debounce = Debounced()
-
-        self.valueChanged.connect(self.debounce.handle)
-
-    def add_debounced_handler(self, handler: Callable[[int], None]) -> None:
-        """
-        Your callback handler
-
-        :param handler:
-        :return:
-        """
-        self.debounce.signal.connect(handler)
-
     def set_value(self, value: int) -> None:
         self.setValue(value)
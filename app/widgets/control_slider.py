@@ -0,0 +1,27 @@
+from PySide6.QtCore import Qt
+from PySide6.QtWidgets import QSlider
+
+from app.styles.slider import SLIDER_STYLESHEET_BIG_HANDLE
+from config import SERVO_MAX_ANGLE, SERVO_MIN_ANGLE
+
+
+class ControlSlider(QSlider):
+    def __init__(
+        self,
+        orientation: Qt.Orientation,
+        slider_minimum: int = SERVO_MIN_ANGLE,
+        slider_maximum: int = SERVO_MAX_ANGLE,
+    ) -> None:
+        """
+        :param slider_minimum:
+        :param slider_maximum:
+        """
+        super().__init__()
+        self.setOrientation(orientation)
+        self.setMinimum(slider_minimum)
+        self.setMaximum(slider_maximum)
+
+        self.setStyleSheet(SLIDER_STYLESHEET_BIG_HANDLE)
+
+    def set_value(self, value: int) -> None:
+        self.setValue(value)
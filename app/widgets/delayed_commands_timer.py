@@ -1,48 +1,103 @@
 import logging
-from typing import Callable, Optional
+import time
+from typing import TYPE_CHECKING, Callable, Optional
 
 from PySide6.QtCore import QTimer, Signal
 from PySide6.QtWidgets import QWidget
 
 import config
+from robohandcontrol.motion_timing import SequenceTiming
+
+if TYPE_CHECKING:
+    from robohandcontrol.robocontrol import Pose
 
 log = logging.getLogger(__name__)
 
 
 class DelayedCommandsTimer(QWidget):
+    """
+    Plays compiled steps (absolute poses and durations, see `timeline`),
+    nothing is parsed during playback
+    """
+
     timer_signal = Signal(int)
     timer_finished = Signal()
 
     def __init__(
         self,
-        handler: "Callable[[str], None]",
+        handler: "Callable[[Pose], None]",
         timeout: int = config.COMMANDS_TIMEOUT,
+        motion_timing: bool = False,
     ) -> None:
+        """
+        :param handler: called with every step pose
+        :param timeout: milliseconds between steps
+        :param motion_timing: wait for the step duration instead of `timeout`,
+            first step is sent immediately
+        """
         super().__init__()
         self.timeout = timeout
         self.handler = handler
+        self.motion_timing = motion_timing
+        self.timing = SequenceTiming()
+        # monotonic time the next command is due at, with motion timing
+        self.next_at = 0.0
         self.index = 0
         self.timer = QTimer()
-        self.commands: "list[str]" = []
+        self.timer.setSingleShot(motion_timing)
+        self.steps: "list[tuple[Pose, int]]" = []
         self.timer_finished.connect(self.reset)
         # noinspection PyUnresolvedReferences
         self.timer.timeout.connect(self.send_command)
 
     def start(self) -> None:
-        log.info("Start commands timer w/ commands %s", self.commands)
-        self.timer.start(self.timeout)
+        log.info("Start commands timer w/ %s steps", len(self.steps))
+        self.timing.start()
+        if not self.motion_timing:
+            self.timer.start(self.timeout)
+            return
+        self.next_at = time.monotonic()
+        self.timer.start(0)
 
-    def reset(self, commands: "Optional[list[str]]" = None) -> None:
+    def reset(self, steps: "Optional[list[tuple[Pose, int]]]" = None) -> None:
+        """
+        :param steps: absolute poses and durations in milliseconds
+        :return:
+        """
         self.timer.stop()
         self.index = 0
-        self.commands = commands or []
+        self.steps = steps or []
+
+    def step_duration(self, duration: int) -> float:
+        """
+        :param duration: compiled step duration, milliseconds
+        :return: seconds to wait before the next step
+        """
+        if not self.motion_timing:
+            return self.timeout / 1000
+        return duration / 1000
+
+    def finish(self) -> None:
+        self.timer.stop()
+        self.timing.finish()
+        self.timer_finished.emit()
 
     def send_command(self) -> None:
+        if self.index >= len(self.steps):
+            # motion timing: the last step had its time to finish
+            self.finish()
+            return
         self.timer_signal.emit(self.index)
-        self.handler(self.commands[self.index])
+        pose, step_duration = self.steps[self.index]
+        self.handler(pose)
 
         self.index += 1
+        duration = self.step_duration(step_duration)
+        self.timing.step(duration)
 
-        if self.index >= len(self.commands):
-            self.timer.stop()
-            self.timer_finished.emit()
+        if self.motion_timing:
+            self.next_at += duration
+            delay = max(self.next_at - time.monotonic(), 0.0)
+            self.timer.start(round(delay * 1000))
+        elif self.index >= len(self.steps):
+            self.finish()
@@ -0,0 +1,196 @@
+import time
+from contextlib import contextmanager
+from typing import TYPE_CHECKING, Optional
+
+from PySide6.QtCore import QObject, QTimer, Signal
+
+import config
+from robohandcontrol import tracing
+from robohandcontrol.robocontrol import Pose
+
+if TYPE_CHECKING:
+    from collections.abc import Iterator
+    from typing import Callable
+
+# milliseconds the send interval shrinks by after a tick without back-pressure
+RECOVERY_STEP = 2
+# a send taking more than this part of the interval is back-pressure
+BUSY_FRACTION = 0.5
+
+
+class AdaptiveRate:
+    """
+    Send interval: doubled on back-pressure, shrinks back by `RECOVERY_STEP`
+    after every send without it
+    """
+
+    def __init__(
+        self,
+        max_rate: int = config.INPUT_DISPATCH_RATE,
+        min_rate: int = config.INPUT_DISPATCH_MIN_RATE,
+    ) -> None:
+        """
+        :param max_rate: sends per second without back-pressure
+        :param min_rate: lowest sends per second
+        """
+        self.min_interval = max(1000 // max_rate, 1)
+        self.max_interval = max(1000 // min_rate, self.min_interval)
+        self.interval = self.min_interval
+
+    def back_off(self) -> int:
+        """
+        :return: new interval, milliseconds
+        """
+        self.interval = min(self.interval * 2, self.max_interval)
+        return self.interval
+
+    def recover(self) -> int:
+        """
+        :return: new interval, milliseconds
+        """
+        self.interval = max(self.interval - RECOVERY_STEP, self.min_interval)
+        return self.interval
+
+    def reset(self) -> None:
+        self.interval = self.min_interval
+
+
+class InputDispatcher(QObject):
+    """
+    Collects the latest value of every control and emits them as one pose.
+
+    Live follow: the first change after a pause is emitted at once
+    (leading edge), changes during a drag are merged and emitted once per tick,
+    the last ones on the tick after the drag stopped (trailing edge).
+    The timer stops after a tick without changes. The tick is longer while
+    the backend has pending commands or the previous send was slow,
+    changes keep being merged meanwhile.
+
+    Otherwise changes are emitted `settle_time` after the last one.
+    """
+
+    pose_ready = Signal(object)
+
+    def __init__(
+        self,
+        pending_commands: "Optional[Callable[[], int]]" = None,
+        rate: Optional[AdaptiveRate] = None,
+        live: bool = config.LIVE_FOLLOW,
+        settle_time: int = config.DEBOUNCE_TIME,
+    ) -> None:
+        """
+        :param pending_commands: backend commands not sent yet, back-pressure
+        :param rate: live follow send rate
+        :param live: live follow, can be switched with `set_live`
+        :param settle_time: milliseconds without changes to send them,
+            when not live
+        """
+        super().__init__()
+        self.pending_commands = pending_commands
+        self.rate = rate or AdaptiveRate()
+        self.live = live
+        self.settle_time = settle_time
+        self.timer = QTimer(self)
+        # noinspection PyUnresolvedReferences
+        self.timer.timeout.connect(self.tick)
+        self.pending = Pose()
+        self._suppressed = False
+        # first change merged into the pending pose, for tracing
+        self.changed_at: Optional[int] = None
+
+    def set_live(self, live: bool) -> None:
+        self.timer.stop()
+        self.live = live
+        self.rate.reset()
+        if self.pending:
+            self.flush()
+
+    def update(self, param: str, *args: int) -> None:
+        """
+        :param param: `ControlParam` value
+        :param args: angle or red, green, blue
+        :return:
+        """
+        if self._suppressed:
+            return
+        if tracing.tracer is not None and not self.pending:
+            self.changed_at = tracing.now()
+        self.pending.set(param, *args)
+        if not self.live:
+            # Starts or restarts the timer with the timeout specified in interval.
+            self.timer.start(self.settle_time)
+            return
+        if self.timer.isActive():
+            return
+        if self.is_congested():
+            self.timer.start(self.rate.back_off())
+            return
+        self.send()
+        self.timer.start(self.rate.interval)
+
+    def tick(self) -> None:
+        if not self.live:
+            self.timer.stop()
+            self.flush()
+            return
+        if not self.pending:
+            self.timer.stop()
+            return
+        if self.is_congested():
+            self.timer.setInterval(self.rate.back_off())
+            return
+        self.send()
+        self.timer.setInterval(self.rate.interval)
+
+    def is_congested(self) -> bool:
+        return self.pending_commands is not None and self.pending_commands() > 0
+
+    def send(self) -> None:
+        """
+        Emit the pending pose, adapt the rate to the time it took
+        """
+        started = time.perf_counter()
+        self.flush()
+        elapsed = (time.perf_counter() - started) * 1000
+        if elapsed > self.rate.interval * BUSY_FRACTION:
+            self.rate.back_off()
+        else:
+            self.rate.recover()
+
+    def flush(self) -> None:
+        pose, self.pending = self.pending, Pose()
+        tracer = tracing.tracer
+        if tracer is None:
+            # noinspection PyUnresolvedReferences
+            self.pose_ready.emit(pose)
+            return
+        trace_id = tracer.start_command("input_dispatch", self.changed_at)
+        self.changed_at = None
+        with tracing.command_context(trace_id):
+            # noinspection PyUnresolvedReferences
+            self.pose_ready.emit(pose)
+
+    def cancel(self) -> None:
+        """
+        Drop pending changes
+
+        :return:
+        """
+        self.timer.stop()
+        self.pending = Pose()
+        self.changed_at = None
+
+    @contextmanager
+    def suppressed(self) -> "Iterator[None]":
+        """
+        Changes inside the block are not sent, e.g. when controls are set
+        from a pose which is sent as is. Changes pending before the block,
+        e.g. of a control being dragged, are still sent.
+        """
+        pending, changed_at = self.pending, self.changed_at
+        self._suppressed = True
+        try:
+            yield
+        finally:
+            self._suppressed = False
+            self.pending, self.changed_at = pending, changed_at
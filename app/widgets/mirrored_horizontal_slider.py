@@ -1,12 +1,14 @@
 from typing import Callable
 
-from PySide6.QtCore import Qt
+from PySide6.QtCore import Qt, Signal
 from PySide6.QtWidgets import QHBoxLayout, QSlider, QWidget
 
 from config import SERVO_MAX_ANGLE, SERVO_MIN_ANGLE
 
 
 class MirroredHorizontalSlider(QWidget):
+    value_changed = Signal(int)
+
     def __init__(
         self,
         slider_minimum: int = SERVO_MIN_ANGLE,
@@ -47,5 +49,10 @@ class MirroredHorizontalSlider(QWidget):
         mirrored_value = self.slider_maximum + self.slider_minimum - value
         dependant.setValue(mirrored_value)
 
+        # what should be set
+        new_value = value if dependant is self.slider_left else mirrored_value
+        # noinspection PyUnresolvedReferences
+        self.value_changed.emit(new_value)
+
     def set_value(self, value: int) -> None:
         self.slider_right.setValue(value)
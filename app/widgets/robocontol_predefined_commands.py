@@ -1,9 +1,7 @@
-import json
 import sys
 from typing import TYPE_CHECKING
 
-from PySide6.QtCore import QStringListModel
-from PySide6.QtGui import QIcon
+from PySide6.QtGui import QCloseEvent, QIcon
 from PySide6.QtWidgets import (
     QApplication,
     QHBoxLayout,
@@ -14,6 +12,8 @@ from PySide6.QtWidgets import (
     QWidget,
 )
 
+from app.common.commands_journal import CommandsJournal
+from app.widgets.commands_list_model import CommandsListModel
 from config import BASE_DIR
 
 if TYPE_CHECKING:
@@ -34,10 +34,13 @@ class RoboControlPredefinedCommandsWidget(QWidget):
 
         self.setWindowTitle("String List Model Example")
 
-        self.string_list_model = QStringListModel()
+        journal = CommandsJournal(self.filepath) if self.filepath else None
+        self.commands_model = CommandsListModel(journal=journal)
 
         self.list_view = QListView()
-        self.list_view.setModel(self.string_list_model)
+        # rows are not measured one by one, fast with many commands
+        self.list_view.setUniformItemSizes(True)
+        self.list_view.setModel(self.commands_model)
         self.list_view.setSelectionMode(QListView.SelectionMode.ExtendedSelection)
         self.list_view.setDragEnabled(True)
         self.list_view.setEditTriggers(QListView.EditTrigger.NoEditTriggers)
@@ -54,6 +57,9 @@ class RoboControlPredefinedCommandsWidget(QWidget):
         )
         self.remove_button.clicked.connect(self.remove_selected_item)
 
+        self.record_button = QPushButton("Record")
+        self.record_button.setCheckable(True)
+
         self.run_commands_button = QPushButton()
         self.set_run_button_icon_play()
         self.run_commands_button.setMaximumWidth(42)
@@ -61,16 +67,13 @@ class RoboControlPredefinedCommandsWidget(QWidget):
         buttons_layout = QHBoxLayout()
         buttons_layout.addWidget(self.add_button)
         buttons_layout.addWidget(self.remove_button)
+        buttons_layout.addWidget(self.record_button)
         buttons_layout.addWidget(self.run_commands_button)
 
         main_layout = QVBoxLayout()
         main_layout.addWidget(self.list_view)
         main_layout.addLayout(buttons_layout)
 
-        self.commands_json_key = "commands"
-
-        self.restore_from_json_data()
-
         self.setLayout(main_layout)
 
     def set_run_button_icon(
@@ -87,47 +90,16 @@ class RoboControlPredefinedCommandsWidget(QWidget):
     def set_run_button_icon_stop(self) -> None:
         self.set_run_button_icon(QStyle.StandardPixmap.SP_MediaStop)
 
-    def restore_from_json_data(self) -> None:
-        if not self.filepath:
-            return
-
-        with self.filepath.open("r") as file:
-            data = json.load(file)
-
-        if self.commands_json_key not in data:
-            return
-
-        commands = data[self.commands_json_key]
-        self.string_list_model.setStringList(commands)
-
-    def save_json_data(self, commands: "list[str]") -> None:
-        if not self.filepath:
-            return
-
-        with self.filepath.open("w") as file:
-            data = {self.commands_json_key: commands}
-            json.dump(data, file, indent=2)
-
     def add_element(self, text: str) -> None:
-        item_list = self.string_list_model.stringList()
-        item_list.append(text)
-        self.string_list_model.setStringList(item_list)
-        self.save_json_data(item_list)
+        self.commands_model.append(text)
 
     def remove_selected_item(self) -> None:
-        selected_indexes = self.list_view.selectedIndexes()
-        item_list = self.string_list_model.stringList()
-        skip_idx = {index.row() for index in selected_indexes}
-
-        index = 0
-        for idx, val in enumerate(item_list):
-            if idx not in skip_idx:
-                item_list[index] = val
-                index += 1
-        skip_indexes = len(item_list) - len(skip_idx)
-        new_items = item_list[:skip_indexes]
-        self.string_list_model.setStringList(new_items)
-        self.save_json_data(new_items)
+        rows = [index.row() for index in self.list_view.selectedIndexes()]
+        self.commands_model.remove_rows(rows)
+
+    def closeEvent(self, event: QCloseEvent) -> None:
+        self.commands_model.save()
+        super().closeEvent(event)
 
 
 if __name__ == "__main__":
@@ -1,8 +1,10 @@
+import functools
 import logging
-from typing import TYPE_CHECKING, Callable
+from typing import TYPE_CHECKING
 
 from PySide6.QtCore import Qt
 from PySide6.QtWidgets import (
+    QCheckBox,
     QHBoxLayout,
     QVBoxLayout,
     QWidget,
@@ -11,13 +13,12 @@ from PySide6.QtWidgets import (
 import config
 from app.common.constants import DriveName
 from app.common.mappings import NAMES_TO_CONTROL_PARAMS
-from app.widgets.debounced_dial import DebouncedDial
-from app.widgets.debounced_mirrored_horizontal_slider import (
-    DebouncedMirroredHorizontalSlider,
-)
-from app.widgets.debounced_slider import DebouncedSlider
+from app.widgets.control_dial import ControlDial
+from app.widgets.control_slider import ControlSlider
+from app.widgets.input_dispatcher import InputDispatcher
 from app.widgets.lcd_indicator_panel import LcdIndicatorPanel
-from robohandcontrol.robocontrol import RobohandControlBase
+from app.widgets.mirrored_horizontal_slider import MirroredHorizontalSlider
+from robohandcontrol.robocontrol import Pose, RobohandControlBase, parse_commands
 
 if TYPE_CHECKING:
     from app.widgets.protocols import RGBValueSettable, ValueSettable
@@ -32,21 +33,33 @@ class RoboControlWindow(QWidget):
         self.robohand: RobohandControlBase = robohand
 
         self.command_components: "dict[str, ValueSettable | RGBValueSettable]" = {}
+        self.dispatcher = InputDispatcher(
+            pending_commands=self.robohand.pending_commands,
+        )
+        # noinspection PyUnresolvedReferences
+        self.dispatcher.pose_ready.connect(self.robohand.set_pose)
 
         self.indicators_panel = LcdIndicatorPanel(labels=list(DriveName))
         self.control_layout = self.get_robot_control_vertical_layout()
         self.the_main_vertical_layout = QVBoxLayout()
         self.the_main_vertical_layout.addLayout(self.control_layout)
+        # stream poses while dragging or send them when the controls settle
+        self.live_follow_checkbox = QCheckBox("Live follow")
+        self.live_follow_checkbox.setChecked(self.dispatcher.live)
+        self.live_follow_checkbox.toggled.connect(self.dispatcher.set_live)
+        self.the_main_vertical_layout.addWidget(self.live_follow_checkbox)
 
         self.setLayout(self.the_main_vertical_layout)
 
     def get_claw_control_layout(self) -> QHBoxLayout:
         layout = QHBoxLayout()
-        claw_mirrored_slider = DebouncedMirroredHorizontalSlider()
+        claw_mirrored_slider = MirroredHorizontalSlider()
         claw_mirrored_slider.value_changed.connect(
             self.indicators_panel.indicators[DriveName.CLAW].lcd.display,
         )
-        claw_mirrored_slider.debounce.add_debounced_handler(self.robohand.control_claw)
+        claw_mirrored_slider.value_changed.connect(
+            functools.partial(self.dispatcher.update, config.ControlParam.CLAW),
+        )
         layout.addWidget(claw_mirrored_slider)
         self.command_components[config.ControlParam.CLAW] = claw_mirrored_slider
         return layout
@@ -55,18 +68,18 @@ class RoboControlWindow(QWidget):
         self,
         orientation: Qt.Orientation,
         drive_name: DriveName,
-        handler: Callable[[int], None],
     ) -> QVBoxLayout:
         layout = QVBoxLayout()
-        debounced_slider = DebouncedSlider(orientation=orientation)
-        layout.addWidget(debounced_slider)
-        debounced_slider.valueChanged.connect(
+        control_slider = ControlSlider(orientation=orientation)
+        layout.addWidget(control_slider)
+        control_slider.valueChanged.connect(
             self.indicators_panel.indicators[drive_name].lcd.display,
         )
-        debounced_slider.add_debounced_handler(handler)
-
         control_key = NAMES_TO_CONTROL_PARAMS[drive_name]
-        self.command_components[control_key] = debounced_slider
+        control_slider.valueChanged.connect(
+            functools.partial(self.dispatcher.update, control_key),
+        )
+        self.command_components[control_key] = control_slider
 
         return layout
 
@@ -74,30 +87,30 @@ class RoboControlWindow(QWidget):
         return self.get_control_slider_layout(
             orientation=Qt.Orientation.Horizontal,
             drive_name=DriveName.EXTEND,
-            handler=self.robohand.control_extend_arrow,
         )
 
     def get_raise_control_layout(self) -> QVBoxLayout:
         return self.get_control_slider_layout(
             orientation=Qt.Orientation.Vertical,
             drive_name=DriveName.RAISE,
-            handler=self.robohand.control_raise_arrow,
         )
 
     def get_rotate_control_layout(self) -> QVBoxLayout:
         layout = QVBoxLayout()
 
-        debounced_dial = DebouncedDial()
-        self.command_components[config.ControlParam.ROTATION] = debounced_dial
+        control_dial = ControlDial()
+        self.command_components[config.ControlParam.ROTATION] = control_dial
 
-        debounced_dial.valueChanged.connect(
+        control_dial.valueChanged.connect(
             self.indicators_panel.indicators[DriveName.ROTATE].lcd.display,
         )
-        debounced_dial.add_debounced_handler(self.robohand.control_rotation)
+        control_dial.valueChanged.connect(
+            functools.partial(self.dispatcher.update, config.ControlParam.ROTATION),
+        )
 
-        debounced_dial.setMaximumSize(250, 250)
+        control_dial.setMaximumSize(250, 250)
 
-        layout.addWidget(debounced_dial)
+        layout.addWidget(control_dial)
         return layout
 
     def get_robot_control_vertical_layout(self) -> QVBoxLayout:
@@ -125,17 +138,32 @@ class RoboControlWindow(QWidget):
 
     def set_state_from_commands(self, commands_text: str) -> None:
         log.info("Run set state from command: %r", commands_text)
-        commands = commands_text.split(config.COMMAND_ENDL)
-        for command in commands:
-            if not command:
-                continue
-            param, *values = command.split(config.COMMAND_SPLITTER)
-            if param not in self.command_components:
+        pose = Pose()
+        for param, values in parse_commands(commands_text):
+            try:
+                pose.set(param, *map(int, values))
+            except ValueError:
                 log.warning(
                     "No control component found for key %s, available: %s",
                     param,
                     list(self.command_components),
                 )
-                continue
-            widget = self.command_components[param]
-            widget.set_value(*map(int, values))
+        self.set_state_from_pose(pose)
+
+    def set_state_from_pose(self, pose: Pose) -> None:
+        """
+        Set controls to the pose and send it, e.g. a compiled timeline step
+
+        :param pose:
+        :return:
+        """
+        # the whole pose is sent at once below
+        with self.dispatcher.suppressed():
+            for param, args in pose.items():
+                widget = self.command_components.get(param)
+                if widget is None:
+                    continue
+                widget.set_value(*args)
+
+        if pose:
+            self.robohand.set_pose(pose)
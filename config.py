@@ -13,8 +13,39 @@ COMMAND_SPLITTER = "|"
 COMMAND_ENDL = ";"
 
 STORE_COMMANDS = "commands.json"
+# edits of stored commands are appended to `commands.json.journal`,
+# the snapshot is rewritten in the background after this many edits
+COMMANDS_JOURNAL_COMPACT_SIZE = 1000
+SERVO_CALIBRATION = "calibration.json"
 
 COMMANDS_TIMEOUT = 1000
+# motion timing (`--motion-timing`): servo speed, degrees per second
+SERVO_SPEED = 250
+# milliseconds added to every step for the arm to settle
+SETTLE_TIME = 150
+# smooth motion (`--smooth-motion`): degrees per second squared
+SERVO_ACCELERATION = 600
+# setpoints per second
+TRAJECTORY_RATE = 50
+# simulated backend (`--simulated-mode`): I2C transaction latency, microseconds
+SIMULATED_I2C_LATENCY = 300
+# microseconds per byte, 400 kHz bus
+SIMULATED_I2C_BYTE_TIME = 23
+# motion recording: commanded joint angles sampled per second
+RECORD_RATE = 50
+# samples kept, older ones are overwritten (30 minutes)
+RECORD_BUFFER_SIZE = RECORD_RATE * 60 * 30
+# degrees a dropped sample may differ from the motion between kept keyframes
+RECORD_TOLERANCE = 2
+RECORD_TIMELINE = "recording.timeline"
+# command tracing (`--trace`): events kept in memory, file written at exit
+TRACE_BUFFER_SIZE = 100_000
+TRACE_FILE = "trace-{name}-{pid}.json"
+# server metrics (`--metrics`): Prometheus text format on http://host:port/metrics
+METRICS_HOST = "127.0.0.1"
+METRICS_PORT = 9464
+# unix socket path instead of the port if set
+METRICS_UNIX_SOCKET = os.getenv("METRICS_UNIX_SOCKET", "")
 
 
 class ControlParam(str, Enum):
@@ -57,3 +88,9 @@ class LEDPorts:
 SERVO_MIN_ANGLE = -90
 SERVO_MAX_ANGLE = 90
 DEBOUNCE_TIME = 200
+# live follow: control changes while dragging are merged and sent as one pose
+# this many times a second, down to `INPUT_DISPATCH_MIN_RATE` on back-pressure
+INPUT_DISPATCH_RATE = 50
+INPUT_DISPATCH_MIN_RATE = 5
+# live follow at start, when off changes are sent `DEBOUNCE_TIME` after the last one
+LIVE_FOLLOW = True
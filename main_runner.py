@@ -0,0 +1,4 @@
+from robohandcontrol.sequence_runner import main
+
+if __name__ == "__main__":
+    main()
@@ -1,6 +1,20 @@
 import logging
+import sys
 
 from app.common.robohand_getter import robohand_control
+from robohandcontrol import tracing
+from robohandcontrol.calibration import load_calibrations
+from robohandcontrol.motion_timing import MotionModel, MotionScheduler
+from robohandcontrol.server_socket_robocontrol.coalescing import (
+    CoalescingDispatchWorker,
+)
+from robohandcontrol.server_socket_robocontrol.dispatch_worker import (
+    ActuatorDispatchWorker,
+)
+from robohandcontrol.server_socket_robocontrol.metrics import (
+    ServerMetrics,
+    start_metrics_server,
+)
 from robohandcontrol.server_socket_robocontrol.robocontrol import (
     RobohandControlServerSocket,
 )
@@ -8,11 +22,36 @@ from robohandcontrol.server_socket_robocontrol.robocontrol import (
 
 def main() -> None:
     logging.basicConfig(level=logging.DEBUG)
+    if "--trace" in sys.argv:
+        tracing.enable("server")
 
-    control = RobohandControlServerSocket(
-        robohand=robohand_control(),
+    # send only the newest pending angle per actuator by default
+    worker = (
+        ActuatorDispatchWorker()
+        if "--no-coalescing" in sys.argv
+        else CoalescingDispatchWorker()
+    )
+    # sequence steps wait for the estimated move time instead of a fixed interval
+    motion_scheduler = (
+        MotionScheduler(MotionModel.from_calibrations(load_calibrations()))
+        if "--motion-timing" in sys.argv
+        else None
     )
-    control.run_server()
+    # Prometheus counters on `METRICS_PORT`
+    metrics = ServerMetrics() if "--metrics" in sys.argv else None
+    with worker as dispatch_worker:
+        control = RobohandControlServerSocket(
+            robohand=robohand_control(),
+            dispatch_worker=dispatch_worker,
+            motion_scheduler=motion_scheduler,
+            metrics=metrics,
+        )
+        if metrics is not None:
+            start_metrics_server(metrics)
+        if "--asyncio-server" in sys.argv:
+            control.run_server_asyncio()
+        else:
+            control.run_server()
 
 
 if __name__ == "__main__":
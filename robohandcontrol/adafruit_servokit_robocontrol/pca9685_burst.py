@@ -0,0 +1,124 @@
+"""
+Direct PCA9685 registers access:
+all changed channels are written in one auto-increment I2C transaction.
+"""
+
+from typing import TYPE_CHECKING, Optional
+
+if TYPE_CHECKING:
+    from adafruit_pca9685 import PCA9685
+
+CHANNELS_COUNT = 16
+# MODE1 register auto-increment bit
+MODE1_AUTO_INCREMENT = 0x20
+# LED0_ON_L, each channel has 4 registers: ON_L, ON_H, OFF_L, OFF_H
+LED0_ON_L_REGISTER = 0x06
+CHANNEL_REGISTERS_SIZE = 4
+# bit 4 of ON_H / OFF_H means "full on" / "full off"
+FULL_ON_OFF = 0x1000
+MAX_DUTY_CYCLE = 0xFFFF
+# less than one 12-bit count, the channel is fully off
+MIN_DUTY_CYCLE = 0x0010
+
+# adafruit_motor.servo.Servo defaults
+SERVO_MIN_PULSE = 750
+SERVO_MAX_PULSE = 2250
+SERVO_ACTUATION_RANGE = 180
+
+
+def duty_cycle_to_on_off(duty_cycle: int) -> "tuple[int, int]":
+    """
+    Same conversion as `adafruit_pca9685.PWMChannel.duty_cycle`
+
+    :param duty_cycle: 16-bit duty cycle
+    :return: ON and OFF 12-bit counts
+    """
+    if duty_cycle >= MAX_DUTY_CYCLE:
+        return FULL_ON_OFF, 0
+    if duty_cycle < MIN_DUTY_CYCLE:
+        return 0, FULL_ON_OFF
+    return 0, duty_cycle >> 4
+
+
+class PCA9685BurstWriter:
+    """
+    Collects channels duty cycles and writes them on `flush`.
+
+    Channels whose registers didn't change since the last write are skipped,
+    all the other are written in one transaction from the first changed channel
+    to the last one (unchanged channels in between are rewritten
+    with the same values, it's still faster than a separate transaction).
+    """
+
+    def __init__(self, pca: "PCA9685") -> None:
+        self.pca = pca
+        self.enable_auto_increment()
+        # registers as they are on the chip
+        self.registers = self.read_registers()
+        # registers to write
+        self.pending = bytearray(self.registers)
+        self.transactions = 0
+
+    def enable_auto_increment(self) -> None:
+        mode1 = self.pca.mode1_reg
+        if not mode1 & MODE1_AUTO_INCREMENT:
+            self.pca.mode1_reg = mode1 | MODE1_AUTO_INCREMENT
+
+    def read_registers(self) -> bytearray:
+        registers = bytearray(CHANNELS_COUNT * CHANNEL_REGISTERS_SIZE)
+        with self.pca.i2c_device as i2c:
+            i2c.write_then_readinto(bytes((LED0_ON_L_REGISTER,)), registers)
+        return registers
+
+    def set_on_off(self, channel: int, on: int, off: int) -> None:
+        offset = channel * CHANNEL_REGISTERS_SIZE
+        self.pending[offset] = on & 0xFF
+        self.pending[offset + 1] = on >> 8
+        self.pending[offset + 2] = off & 0xFF
+        self.pending[offset + 3] = off >> 8
+
+    def set_duty_cycle(self, channel: int, duty_cycle: int) -> None:
+        """
+        :param channel: PCA9685 channel, 0-15
+        :param duty_cycle: 16-bit duty cycle
+        :return:
+        """
+        self.set_on_off(channel, *duty_cycle_to_on_off(duty_cycle))
+
+    def changed_channels_range(self) -> "Optional[tuple[int, int]]":
+        if self.pending == self.registers:
+            return None
+        first = last = -1
+        for channel in range(CHANNELS_COUNT):
+            offset = channel * CHANNEL_REGISTERS_SIZE
+            end = offset + CHANNEL_REGISTERS_SIZE
+            if self.pending[offset:end] != self.registers[offset:end]:
+                if first < 0:
+                    first = channel
+                last = channel
+        if first < 0:
+            return None
+        return first, last
+
+    def flush(self) -> bool:
+        """
+        Write changed channels
+
+        :return: False if nothing changed and nothing was written
+        """
+        channels_range = self.changed_channels_range()
+        if channels_range is None:
+            return False
+        first, last = channels_range
+        start = first * CHANNEL_REGISTERS_SIZE
+        end = (last + 1) * CHANNEL_REGISTERS_SIZE
+
+        buffer = bytearray(1 + end - start)
+        buffer[0] = LED0_ON_L_REGISTER + start
+        buffer[1:] = self.pending[start:end]
+        with self.pca.i2c_device as i2c:
+            i2c.write(buffer)
+
+        self.registers[start:end] = self.pending[start:end]
+        self.transactions += 1
+        return True
@@ -0,0 +1,128 @@
+"""
+Servos and LED on a PCA9685 board: angles are converted to duty cycles
+with the calibration lookup tables and written by the burst writer.
+Shared by the Adafruit ServoKit backend and the simulated arm,
+which only differ in the device they write to.
+"""
+
+from typing import TYPE_CHECKING
+
+import config
+from config import LEDPorts, ServoPorts
+from robohandcontrol.adafruit_servokit_robocontrol.pca9685_burst import (
+    SERVO_ACTUATION_RANGE,
+    SERVO_MAX_PULSE,
+    SERVO_MIN_PULSE,
+    PCA9685BurstWriter,
+)
+from robohandcontrol.calibration import ServoLookupTables
+from robohandcontrol.robocontrol import Pose, RobohandControlBase
+from robohandcontrol.utils import map_range
+
+if TYPE_CHECKING:
+    from adafruit_pca9685 import PCA9685
+
+    from robohandcontrol.calibration import ServoCalibration
+
+LED_PORTS = (LEDPorts.RED_LED_PORT, LEDPorts.GREEN_LED_PORT, LEDPorts.BLUE_LED_PORT)
+
+
+class PCA9685RobohandControl(RobohandControlBase):
+    def __init__(
+        self,
+        pca: "PCA9685",
+        calibrations: "dict[int, ServoCalibration]",
+    ) -> None:
+        """
+        :param pca: PCA9685 device, real or simulated
+        :param calibrations: calibration by servo port
+        """
+        # registers are written directly, all changed channels at once
+        self.writer = PCA9685BurstWriter(pca)
+
+        self.led_max_duty_cycle = 0xFFFF
+
+        self.out_min = config.SERVO_MAX_ANGLE + config.SERVO_MIN_ANGLE
+        self.out_max = config.SERVO_MAX_ANGLE - config.SERVO_MIN_ANGLE
+
+        # same as adafruit_motor.servo.Servo duty cycle range
+        frequency = pca.frequency
+        self.servo_min_duty = int(SERVO_MIN_PULSE * frequency / 1_000_000 * 0xFFFF)
+        servo_max_duty = int(SERVO_MAX_PULSE * frequency / 1_000_000 * 0xFFFF)
+        self.servo_duty_range = servo_max_duty - self.servo_min_duty
+
+        self.lookup_tables = ServoLookupTables(
+            calibrations,
+            convert=self.angle_to_duty_cycle,
+        )
+
+    def angle_to_duty_cycle(self, angle: int) -> int:
+        servo_angle = map_range(
+            angle,
+            in_min=config.SERVO_MIN_ANGLE,
+            in_max=config.SERVO_MAX_ANGLE,
+            out_min=self.out_min,
+            out_max=self.out_max,
+        )
+        servo_angle = min(max(servo_angle, 0), SERVO_ACTUATION_RANGE)
+        return (
+            self.servo_min_duty
+            + self.servo_duty_range * servo_angle // SERVO_ACTUATION_RANGE
+        )
+
+    def set_servo_angle(self, channel: int, angle: int) -> None:
+        """
+        Only updates pending registers, call `writer.flush()` to write them
+
+        :param channel: servo port
+        :param angle:
+        :return:
+        """
+        self.writer.set_duty_cycle(channel, self.lookup_tables.lookup(channel, angle))
+
+    def set_pose(self, pose: Pose) -> None:
+        for channel, angle in (
+            (ServoPorts.SERVO_ROTATE_PORT, pose.rotation),
+            (ServoPorts.SERVO_ARROW_L_PORT, pose.raise_arrow),
+            (ServoPorts.SERVO_ARROW_R_PORT, pose.extend_arrow),
+            (ServoPorts.SERVO_CLAW_PORT, pose.claw),
+        ):
+            if angle is not None:
+                self.set_servo_angle(channel, angle)
+        if pose.led is not None:
+            self.set_led_channels(*pose.led)
+        self.writer.flush()
+
+    def control_claw(self, angle: int) -> None:
+        self.set_servo_angle(ServoPorts.SERVO_CLAW_PORT, angle)
+        self.writer.flush()
+
+    def control_extend_arrow(self, angle: int) -> None:
+        self.set_servo_angle(ServoPorts.SERVO_ARROW_R_PORT, angle)
+        self.writer.flush()
+
+    def control_raise_arrow(self, angle: int) -> None:
+        self.set_servo_angle(ServoPorts.SERVO_ARROW_L_PORT, angle)
+        self.writer.flush()
+
+    def control_rotation(self, angle: int) -> None:
+        self.set_servo_angle(ServoPorts.SERVO_ROTATE_PORT, angle)
+        self.writer.flush()
+
+    def map_color_value(self, value: int) -> int:
+        return map_range(
+            value,
+            in_min=0,
+            in_max=255,
+            out_min=0,
+            out_max=self.led_max_duty_cycle,
+        )
+
+    def set_led_channels(self, red: int, green: int, blue: int) -> None:
+        # I have LED connected to the last three pins on the PCA9685 board
+        for port, value in zip(LED_PORTS, (red, green, blue)):
+            self.writer.set_duty_cycle(port, self.map_color_value(value))
+
+    def set_led_rgb(self, red: int, green: int, blue: int) -> None:
+        self.set_led_channels(red, green, blue)
+        self.writer.flush()
@@ -0,0 +1,199 @@
+"""
+Loopback server, timestamping backend and statistics shared by benchmarks.
+
+Commands are identified by LED values: red is the client number,
+green and blue are the high and low bytes of the command number.
+"""
+
+import bisect
+import math
+import os
+import platform
+import socket
+import sys
+import threading
+import time
+from typing import TYPE_CHECKING, Any, Optional
+
+import config
+from robohandcontrol.robocontrol import Pose, RobohandControlBase
+from robohandcontrol.server_socket_robocontrol.robocontrol import (
+    RobohandControlServerSocket,
+)
+
+if TYPE_CHECKING:
+    from typing import Callable
+
+    from robohandcontrol.server_socket_robocontrol.dispatch_worker import (
+        ActuatorDispatchWorker,
+    )
+
+    CommandKey = tuple[int, int, int]
+
+LOOPBACK_HOST = "127.0.0.1"
+# commands per client, command number is 16 bits
+MAX_COMMANDS = 0x10000
+MAX_CLIENTS = 0x100
+# upper bounds of latency histogram buckets, milliseconds
+HISTOGRAM_BUCKETS = (0.1, 0.25, 0.5, 1, 2.5, 5, 10, 25, 50, 100, 250, 500, 1000)
+
+
+def command_key(client: int, number: int) -> "CommandKey":
+    return client, number >> 8 & 0xFF, number & 0xFF
+
+
+class TimestampingRobohand(RobohandControlBase):
+    """
+    Backend which records when every LED command arrived
+    """
+
+    def __init__(self) -> None:
+        self.received: "dict[CommandKey, float]" = {}
+        self.joint_commands = 0
+        self._condition = threading.Condition()
+
+    def record(self, key: "CommandKey") -> None:
+        now = time.perf_counter()
+        with self._condition:
+            self.received[key] = now
+            self._condition.notify_all()
+
+    def wait_for(self, key: "CommandKey", timeout: float) -> Optional[float]:
+        """
+        :param key: command key
+        :param timeout: seconds
+        :return: receive time or None if not received in time
+        """
+        with self._condition:
+            self._condition.wait_for(lambda: key in self.received, timeout)
+            return self.received.get(key)
+
+    def reset(self) -> None:
+        with self._condition:
+            self.received.clear()
+            self.joint_commands = 0
+
+    def count_joint_command(self) -> None:
+        with self._condition:
+            self.joint_commands += 1
+
+    def control_claw(self, angle: int) -> None:  # noqa: ARG002
+        self.count_joint_command()
+
+    def control_extend_arrow(self, angle: int) -> None:  # noqa: ARG002
+        self.count_joint_command()
+
+    def control_raise_arrow(self, angle: int) -> None:  # noqa: ARG002
+        self.count_joint_command()
+
+    def control_rotation(self, angle: int) -> None:  # noqa: ARG002
+        self.count_joint_command()
+
+    def set_led_rgb(self, red: int, green: int, blue: int) -> None:
+        self.record((red, green, blue))
+
+    def set_pose(self, pose: Pose) -> None:
+        if pose.led is not None:
+            self.record(pose.led)
+        if len(pose) > 1 or pose.led is None:
+            self.count_joint_command()
+
+
+def free_port() -> int:
+    with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as sock:
+        sock.bind((LOOPBACK_HOST, 0))
+        return int(sock.getsockname()[1])
+
+
+def wait_listening(port: int, timeout: float = 5.0) -> None:
+    deadline = time.monotonic() + timeout
+    while True:
+        try:
+            with socket.create_connection((LOOPBACK_HOST, port), timeout=timeout):
+                return
+        except OSError:
+            if time.monotonic() > deadline:
+                raise
+            time.sleep(0.01)
+
+
+def start_server(
+    robohand: RobohandControlBase,
+    asyncio_server: bool = False,
+    dispatch_worker: "Optional[ActuatorDispatchWorker]" = None,
+) -> int:
+    """
+    Run the socket server on a loopback port on a daemon thread
+
+    :param robohand: backend
+    :param asyncio_server: asyncio server instead of the select loop
+    :param dispatch_worker: started worker or None
+    :return: port
+    """
+    port = free_port()
+    server = RobohandControlServerSocket(
+        robohand,
+        server_host=LOOPBACK_HOST,
+        server_port=port,
+        dispatch_worker=dispatch_worker,
+    )
+    target: "Callable[[], None]" = (
+        server.run_server_asyncio if asyncio_server else server.run_server
+    )
+    threading.Thread(target=target, name="benchmark-server", daemon=True).start()
+    wait_listening(port)
+    return port
+
+
+def percentile(values: "list[float]", percent: float) -> float:
+    """
+    Nearest-rank percentile
+
+    :param values:
+    :param percent: 0-100
+    :return:
+    """
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    rank = max(math.ceil(percent / 100 * len(ordered)) - 1, 0)
+    return ordered[min(rank, len(ordered) - 1)]
+
+
+def latency_summary(latencies: "list[float]") -> "dict[str, float]":
+    """
+    :param latencies: seconds
+    :return: milliseconds statistics
+    """
+    if not latencies:
+        return {"count": 0}
+    return {
+        "count": len(latencies),
+        "mean_ms": sum(latencies) / len(latencies) * 1000,
+        "p50_ms": percentile(latencies, 50) * 1000,
+        "p90_ms": percentile(latencies, 90) * 1000,
+        "p99_ms": percentile(latencies, 99) * 1000,
+        "max_ms": max(latencies) * 1000,
+    }
+
+
+def latency_histogram(latencies: "list[float]") -> "dict[str, int]":
+    """
+    :param latencies: seconds
+    :return: count by bucket upper bound in milliseconds, `+Inf` for the rest
+    """
+    counts = [0] * (len(HISTOGRAM_BUCKETS) + 1)
+    for latency in latencies:
+        counts[bisect.bisect_left(HISTOGRAM_BUCKETS, latency * 1000)] += 1
+    labels = [str(bound) for bound in HISTOGRAM_BUCKETS] + ["+Inf"]
+    return dict(zip(labels, counts))
+
+
+def environment() -> "dict[str, Any]":
+    return {
+        "python": sys.version.split()[0],
+        "implementation": platform.python_implementation(),
+        "platform": platform.platform(),
+        "cpu_count": os.cpu_count(),
+        "debounce_time_ms": config.DEBOUNCE_TIME,
+    }
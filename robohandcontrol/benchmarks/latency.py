@@ -0,0 +1,288 @@
+"""
+End-to-end benchmark of the control path without the GUI and the arm:
+debounce -> client socket -> server -> backend, over loopback.
+
+Usage::
+
+    python -m robohandcontrol.benchmarks.latency [-o results.json]
+        [--binary-protocol] [--asyncio-server] [--worker none|queue|coalescing]
+
+Results are written as JSON: latency percentiles, commands per second
+per connection, the same with many concurrent clients and CPU time per command
+(client and server run in one process, so CPU time covers both).
+"""
+
+import argparse
+import json
+import logging
+import sys
+import threading
+import time
+from pathlib import Path
+from typing import TYPE_CHECKING, Any, Optional
+
+import config
+from robohandcontrol.benchmarks.common import (
+    LOOPBACK_HOST,
+    MAX_CLIENTS,
+    MAX_COMMANDS,
+    TimestampingRobohand,
+    command_key,
+    environment,
+    latency_summary,
+    start_server,
+)
+from robohandcontrol.client_socket_robocontrol.robocontrol import (
+    RobohandControlClientSocket,
+)
+from robohandcontrol.server_socket_robocontrol.coalescing import (
+    CoalescingDispatchWorker,
+)
+from robohandcontrol.server_socket_robocontrol.dispatch_worker import (
+    ActuatorDispatchWorker,
+)
+
+if TYPE_CHECKING:
+    from typing import Callable
+
+log = logging.getLogger(__name__)
+
+# seconds to wait for a command to reach the backend
+RECEIVE_TIMEOUT = 5.0
+
+
+class Debouncer:
+    """
+    Trailing-edge debounce on a timer thread, as controls had before `InputDispatcher`
+    """
+
+    def __init__(self, delay: float, handler: "Callable[[int], None]") -> None:
+        self.delay = delay
+        self.handler = handler
+        self._timer: Optional[threading.Timer] = None
+
+    def handle(self, value: int) -> None:
+        if self._timer is not None:
+            self._timer.cancel()
+        self._timer = threading.Timer(self.delay, self.handler, args=(value,))
+        self._timer.start()
+
+
+class Benchmark:
+    def __init__(
+        self,
+        binary_protocol: bool = False,
+        asyncio_server: bool = False,
+        worker: str = "queue",
+    ) -> None:
+        self.binary_protocol = binary_protocol
+        self.robohand = TimestampingRobohand()
+        self.dispatch_worker: Optional[ActuatorDispatchWorker] = None
+        if worker == "queue":
+            self.dispatch_worker = ActuatorDispatchWorker(queue_size=MAX_COMMANDS)
+        elif worker == "coalescing":
+            self.dispatch_worker = CoalescingDispatchWorker()
+        if self.dispatch_worker is not None:
+            self.dispatch_worker.start()
+        self.port = start_server(
+            self.robohand,
+            asyncio_server=asyncio_server,
+            dispatch_worker=self.dispatch_worker,
+        )
+
+    def close(self) -> None:
+        if self.dispatch_worker is not None:
+            self.dispatch_worker.stop()
+
+    def client(self, queue_size: int = MAX_COMMANDS) -> RobohandControlClientSocket:
+        client = RobohandControlClientSocket(
+            server_host=LOOPBACK_HOST,
+            server_port=self.port,
+            binary_protocol=self.binary_protocol,
+            queue_size=queue_size,
+        )
+        if not client.connected.wait(RECEIVE_TIMEOUT):
+            msg = f"Could not connect to the benchmark server on port {self.port}"
+            raise ConnectionError(msg)
+        return client
+
+    def latency(self, count: int) -> "dict[str, Any]":
+        """
+        One command at a time, the next one is sent when the previous one arrived
+
+        :param count: commands
+        :return:
+        """
+        self.robohand.reset()
+        client = self.client()
+        latencies = []
+        lost = 0
+        for number in range(count):
+            key = command_key(0, number)
+            sent_at = time.perf_counter()
+            client.set_led_rgb(*key)
+            received_at = self.robohand.wait_for(key, RECEIVE_TIMEOUT)
+            if received_at is None:
+                lost += 1
+                continue
+            latencies.append(received_at - sent_at)
+        client.close()
+        return {"latency": latency_summary(latencies), "lost": lost}
+
+    def debounced_latency(self, count: int) -> "dict[str, Any]":
+        """
+        Slider change to backend call, debounce included
+
+        :param count: commands
+        :return:
+        """
+        self.robohand.reset()
+        client = self.client()
+
+        def send(number: int) -> None:
+            client.set_led_rgb(*command_key(0, number))
+
+        debouncer = Debouncer(config.DEBOUNCE_TIME / 1000, send)
+        latencies = []
+        for number in range(count):
+            sent_at = time.perf_counter()
+            debouncer.handle(number)
+            received_at = self.robohand.wait_for(
+                command_key(0, number),
+                RECEIVE_TIMEOUT + debouncer.delay,
+            )
+            if received_at is not None:
+                latencies.append(received_at - sent_at)
+        client.close()
+        return {"latency": latency_summary(latencies)}
+
+    def throughput(self, clients_count: int, count: int) -> "dict[str, Any]":
+        """
+        Every client sends commands as fast as it can, latency is measured
+        for commands which reached the backend
+
+        :param clients_count: concurrent connections
+        :param count: commands per client
+        :return:
+        """
+        self.robohand.reset()
+        clients = [self.client() for _ in range(clients_count)]
+        sent_at: "dict[tuple[int, int, int], float]" = {}
+
+        def send_all(client_number: int, client: RobohandControlClientSocket) -> None:
+            for number in range(count):
+                key = command_key(client_number, number)
+                sent_at[key] = time.perf_counter()
+                client.set_led_rgb(*key)
+
+        cpu_started = time.process_time()
+        started = time.perf_counter()
+        senders = [
+            threading.Thread(target=send_all, args=(client_number, client))
+            for client_number, client in enumerate(clients)
+        ]
+        for sender in senders:
+            sender.start()
+        for sender in senders:
+            sender.join()
+        # the server merges frames of one read into one pose, so the last command
+        # of a client is executed even if earlier ones were superseded;
+        # the coalescing worker keeps only the latest LED of all clients
+        lost_clients = 0
+        for client_number in range(clients_count):
+            last_key = command_key(client_number, count - 1)
+            if self.robohand.wait_for(last_key, RECEIVE_TIMEOUT) is None:
+                lost_clients += 1
+        cpu_time = time.process_time() - cpu_started
+        for client in clients:
+            client.close()
+        total = clients_count * count
+        received = len(self.robohand.received)
+        elapsed = max(self.robohand.received.values(), default=started) - started
+
+        latencies = [
+            received_at - sent_at[key]
+            for key, received_at in self.robohand.received.items()
+            if key in sent_at
+        ]
+        return {
+            "clients": clients_count,
+            "commands_per_client": count,
+            "executed": received,
+            # superseded by later commands in the same pose
+            "coalesced": total - received,
+            "dropped_by_clients": sum(client.dropped for client in clients),
+            "lost_clients": lost_clients,
+            "seconds": elapsed,
+            "commands_per_second": total / elapsed if elapsed else 0.0,
+            "commands_per_second_per_connection": (
+                total / elapsed / clients_count if elapsed else 0.0
+            ),
+            "cpu_us_per_command": cpu_time / total * 1_000_000,
+            "latency": latency_summary(latencies),
+        }
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("-o", "--output", help="JSON file, stdout by default")
+    parser.add_argument("--binary-protocol", action="store_true")
+    parser.add_argument("--asyncio-server", action="store_true")
+    parser.add_argument(
+        "--worker",
+        choices=("none", "queue", "coalescing"),
+        default="queue",
+        help="server dispatch worker, coalescing drops superseded commands",
+    )
+    parser.add_argument("--latency-count", type=int, default=1000)
+    parser.add_argument("--debounced-count", type=int, default=20)
+    parser.add_argument("--throughput-count", type=int, default=5000)
+    parser.add_argument(
+        "--clients",
+        default="1,4,16",
+        help="comma separated numbers of concurrent clients",
+    )
+    return parser.parse_args()
+
+
+def main() -> None:
+    logging.basicConfig(level=logging.WARNING)
+    args = parse_args()
+    clients_counts = [int(count) for count in args.clients.split(",") if count]
+    if max(clients_counts) > MAX_CLIENTS or args.throughput_count > MAX_COMMANDS:
+        msg = f"Up to {MAX_CLIENTS} clients and {MAX_COMMANDS} commands per client"
+        raise SystemExit(msg)
+
+    benchmark = Benchmark(
+        binary_protocol=args.binary_protocol,
+        asyncio_server=args.asyncio_server,
+        worker=args.worker,
+    )
+    try:
+        results = {
+            "environment": environment(),
+            "settings": {
+                "binary_protocol": args.binary_protocol,
+                "asyncio_server": args.asyncio_server,
+                "worker": args.worker,
+            },
+            "latency": benchmark.latency(args.latency_count),
+            "debounced_latency": benchmark.debounced_latency(args.debounced_count),
+            "throughput": [
+                benchmark.throughput(clients_count, args.throughput_count)
+                for clients_count in clients_counts
+            ],
+        }
+    finally:
+        benchmark.close()
+
+    if args.output:
+        with Path(args.output).open("w") as file:
+            json.dump(results, file, indent=2)
+    else:
+        json.dump(results, sys.stdout, indent=2)
+        sys.stdout.write("\n")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,424 @@
+"""
+Load generator for the socket server: concurrent connections replaying
+a commands file or random slider sweeps at a fixed rate, with optional
+partial frames and slow readers.
+
+Usage::
+
+    python -m robohandcontrol.benchmarks.load [--clients 8] [--rate 50]
+        [--duration 10] [--replay commands.json] [--partial-frames 0.1]
+        [--slow-readers 2] [--binary-protocol] [--asyncio-server]
+        [--worker none|queue|coalescing] [--port PORT] [-o results.json]
+
+By default the server runs in this process with a backend which records when
+commands arrive, so executed commands and latency are reported. With `--port`
+the load goes to an already running `main_server.py` and only the client side
+is reported.
+"""
+
+import argparse
+import itertools
+import json
+import logging
+import random
+import socket
+import sys
+import threading
+import time
+from dataclasses import asdict, dataclass
+from pathlib import Path
+from typing import TYPE_CHECKING, Any, Optional
+
+import config
+from robohandcontrol.benchmarks.common import (
+    LOOPBACK_HOST,
+    MAX_CLIENTS,
+    MAX_COMMANDS,
+    command_key,
+    environment,
+    latency_histogram,
+    latency_summary,
+)
+from robohandcontrol.benchmarks.latency import RECEIVE_TIMEOUT, Benchmark
+from robohandcontrol.binary_protocol import SEQUENCE_MASK, encode_pose
+from robohandcontrol.client_socket_robocontrol.robocontrol import (
+    negotiate_binary_protocol,
+)
+from robohandcontrol.robocontrol import Pose
+from robohandcontrol.sequence_protocol import SequenceCommand, make_frame
+from robohandcontrol.timeline import load_commands
+from robohandcontrol.trajectory import JOINTS
+
+if TYPE_CHECKING:
+    from collections.abc import Iterator
+
+    from robohandcontrol.benchmarks.common import CommandKey
+
+log = logging.getLogger(__name__)
+
+# slider sweep: degrees per event
+SWEEP_MAX_STEP = 5
+# seconds between the two parts of a split frame
+PARTIAL_FRAME_DELAY = 0.005
+# slow reader: receive buffer, bytes read and seconds between reads
+SLOW_READER_BUFFER = 1024
+SLOW_READ_SIZE = 16
+SLOW_READ_INTERVAL = 0.05
+SLOW_READER_FRAME = make_frame(SequenceCommand.STOP).encode("utf-8")
+
+
+def sweep_stream(rng: random.Random) -> "Iterator[Pose]":
+    """
+    Slider drags: one joint moves towards a random angle a few degrees per event
+
+    :param rng:
+    :return: endless poses
+    """
+    angles = {param: 0 for param in JOINTS}
+    while True:
+        param = rng.choice(JOINTS)
+        target = rng.randint(config.SERVO_MIN_ANGLE, config.SERVO_MAX_ANGLE)
+        angle = angles[param]
+        while angle != target:
+            step = rng.randint(1, SWEEP_MAX_STEP)
+            if target > angle:
+                angle = min(angle + step, target)
+            else:
+                angle = max(angle - step, target)
+            pose = Pose()
+            pose.set(param, angle)
+            yield pose
+        angles[param] = angle
+
+
+@dataclass
+class ClientReport:
+    sent: int = 0
+    partial_frames: int = 0
+    errors: int = 0
+    # seconds from the first to the last command
+    seconds: float = 0.0
+
+
+class LoadClient(threading.Thread):
+    """
+    One connection sending a command stream at a fixed rate.
+    Every command carries the LED key of the client and command number.
+    """
+
+    def __init__(
+        self,
+        number: int,
+        address: "tuple[str, int]",
+        stream: "Iterator[Pose]",
+        rate: float,
+        duration: float,
+        sent_at: "dict[CommandKey, float]",
+        partial_frames: float = 0.0,
+        binary_protocol: bool = False,
+        seed: Optional[int] = None,
+    ) -> None:
+        """
+        :param number: client number, red LED value of its commands
+        :param address: server host and port
+        :param stream: poses to send
+        :param rate: commands per second, 0 for as fast as possible
+        :param duration: seconds
+        :param sent_at: send time by command key, shared by clients
+        :param partial_frames: share of commands sent in two parts
+        :param binary_protocol: negotiate the binary protocol
+        :param seed: random seed for splitting frames
+        """
+        super().__init__(name=f"load-client-{number}", daemon=True)
+        self.number = number
+        self.address = address
+        self.stream = stream
+        self.rate = rate
+        self.duration = duration
+        self.sent_at = sent_at
+        self.partial_frames = partial_frames
+        self.binary_protocol = binary_protocol
+        self.binary_mode = False
+        self.rng = random.Random(seed)  # noqa: S311
+        self.report = ClientReport()
+
+    def encode(self, number: int, pose: Pose) -> bytes:
+        if self.binary_mode:
+            return encode_pose(number & SEQUENCE_MASK, pose)
+        return pose.to_commands().encode("utf-8")
+
+    def send(self, sock: socket.socket, data: bytes) -> None:
+        if len(data) > 1 and self.rng.random() < self.partial_frames:
+            split = self.rng.randint(1, len(data) - 1)
+            sock.sendall(data[:split])
+            time.sleep(PARTIAL_FRAME_DELAY)
+            data = data[split:]
+            self.report.partial_frames += 1
+        sock.sendall(data)
+
+    def run(self) -> None:
+        try:
+            with socket.create_connection(
+                self.address,
+                timeout=config.CONNECT_TIMEOUT,
+            ) as sock:
+                sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+                if self.binary_protocol:
+                    self.binary_mode = negotiate_binary_protocol(sock)
+                sock.settimeout(RECEIVE_TIMEOUT)
+                self.send_stream(sock)
+        except OSError as e:
+            log.warning("Client %s connection error: %s", self.number, e)
+            self.report.errors += 1
+
+    def send_stream(self, sock: socket.socket) -> None:
+        period = 1 / self.rate if self.rate else 0.0
+        started = time.monotonic()
+        deadline = started + self.duration
+        next_at = started
+        for number, pose in zip(range(MAX_COMMANDS), self.stream):
+            now = time.monotonic()
+            if now >= deadline:
+                break
+            if next_at > now:
+                time.sleep(next_at - now)
+            # open loop: late commands are sent at once to keep the rate
+            next_at += period
+            key = command_key(self.number, number)
+            data = self.encode(number, pose.updated(Pose(led=key)))
+            self.sent_at[key] = time.perf_counter()
+            self.send(sock, data)
+            self.report.sent += 1
+        self.report.seconds = time.monotonic() - started
+
+
+@dataclass
+class SlowReaderReport:
+    # sequence commands sent, every one makes the server broadcast an event
+    commands: int = 0
+    bytes_read: int = 0
+    errors: int = 0
+
+
+class SlowReader(threading.Thread):
+    """
+    Subscribes to sequence events and reads them slower than they are sent
+    """
+
+    def __init__(
+        self,
+        number: int,
+        address: "tuple[str, int]",
+        stop_event: threading.Event,
+    ) -> None:
+        super().__init__(name=f"load-slow-reader-{number}", daemon=True)
+        self.address = address
+        self.stop_event = stop_event
+        self.report = SlowReaderReport()
+
+    def run(self) -> None:
+        try:
+            with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as sock:
+                sock.setsockopt(socket.SOL_SOCKET, socket.SO_RCVBUF, SLOW_READER_BUFFER)
+                sock.settimeout(config.CONNECT_TIMEOUT)
+                sock.connect(self.address)
+                while not self.stop_event.wait(SLOW_READ_INTERVAL):
+                    sock.sendall(SLOW_READER_FRAME)
+                    self.report.commands += 1
+                    try:
+                        self.report.bytes_read += len(sock.recv(SLOW_READ_SIZE))
+                    except socket.timeout:
+                        continue
+        except OSError as e:
+            log.warning("Slow reader connection error: %s", e)
+            self.report.errors += 1
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("-o", "--output", help="JSON file, stdout by default")
+    parser.add_argument("--clients", type=int, default=8)
+    parser.add_argument(
+        "--rate",
+        type=float,
+        default=50,
+        help="commands per second per client, 0 for as fast as possible",
+    )
+    parser.add_argument("--duration", type=float, default=10, help="seconds")
+    parser.add_argument(
+        "--replay",
+        type=Path,
+        help="commands JSON file to replay in a loop, random slider sweeps if not set",
+    )
+    parser.add_argument(
+        "--partial-frames",
+        type=float,
+        default=0.0,
+        help="share of commands split in two sends",
+    )
+    parser.add_argument(
+        "--slow-readers",
+        type=int,
+        default=0,
+        help="connections subscribed to sequence events which barely read",
+    )
+    parser.add_argument("--seed", type=int, default=None)
+    parser.add_argument("--binary-protocol", action="store_true")
+    parser.add_argument("--host", default=LOOPBACK_HOST)
+    parser.add_argument("--port", type=int, help="running server, in-process if not set")
+    parser.add_argument("--asyncio-server", action="store_true")
+    parser.add_argument(
+        "--worker",
+        choices=("none", "queue", "coalescing"),
+        default="queue",
+        help="dispatch worker of the in-process server",
+    )
+    return parser.parse_args()
+
+
+def server_report(
+    benchmark: Benchmark,
+    clients: "list[LoadClient]",
+    sent_at: "dict[CommandKey, float]",
+    started: float,
+) -> "dict[str, Any]":
+    """
+    Wait for the last command of every client and collect the backend side
+
+    :param benchmark: in-process server
+    :param clients: finished clients
+    :param sent_at: send time by command key
+    :param started: `perf_counter` time the load started
+    :return:
+    """
+    robohand = benchmark.robohand
+    lost_clients = 0
+    for client in clients:
+        if not client.report.sent:
+            continue
+        last_key = command_key(client.number, client.report.sent - 1)
+        if robohand.wait_for(last_key, RECEIVE_TIMEOUT) is None:
+            lost_clients += 1
+    received = dict(robohand.received)
+    latencies = [
+        received_at - sent_at[key]
+        for key, received_at in received.items()
+        if key in sent_at
+    ]
+    sent = sum(client.report.sent for client in clients)
+    elapsed = max(received.values(), default=started) - started
+    report: "dict[str, Any]" = {
+        "executed": len(received),
+        # merged into one pose with later commands or coalesced by the worker
+        "superseded": sent - len(received),
+        "lost_clients": lost_clients,
+        "seconds": elapsed,
+        "commands_per_second": len(received) / elapsed if elapsed else 0.0,
+        "latency": latency_summary(latencies),
+        "latency_histogram_ms": latency_histogram(latencies),
+    }
+    if benchmark.dispatch_worker is not None:
+        report["dispatch"] = asdict(benchmark.dispatch_worker.stats())
+    return report
+
+
+def main() -> None:
+    logging.basicConfig(level=logging.WARNING)
+    args = parse_args()
+    if not 0 < args.clients <= MAX_CLIENTS:
+        msg = f"From 1 to {MAX_CLIENTS} clients"
+        raise SystemExit(msg)
+
+    benchmark: Optional[Benchmark] = None
+    if args.port is None:
+        benchmark = Benchmark(
+            binary_protocol=args.binary_protocol,
+            asyncio_server=args.asyncio_server,
+            worker=args.worker,
+        )
+        address = (LOOPBACK_HOST, benchmark.port)
+    else:
+        address = (args.host, args.port)
+
+    rng = random.Random(args.seed)  # noqa: S311
+    poses = (
+        [Pose.from_commands(text) for text in load_commands(args.replay)]
+        if args.replay
+        else []
+    )
+    sent_at: "dict[CommandKey, float]" = {}
+    clients = [
+        LoadClient(
+            number,
+            address,
+            stream=(
+                itertools.cycle(poses)
+                if poses
+                else sweep_stream(random.Random(rng.randrange(2**32)))  # noqa: S311
+            ),
+            rate=args.rate,
+            duration=args.duration,
+            sent_at=sent_at,
+            partial_frames=args.partial_frames,
+            binary_protocol=args.binary_protocol,
+            seed=rng.randrange(2**32),
+        )
+        for number in range(args.clients)
+    ]
+    stop_event = threading.Event()
+    slow_readers = [
+        SlowReader(number, address, stop_event) for number in range(args.slow_readers)
+    ]
+
+    started = time.perf_counter()
+    for thread in (*slow_readers, *clients):
+        thread.start()
+    for client in clients:
+        client.join()
+    try:
+        server = (
+            server_report(benchmark, clients, sent_at, started)
+            if benchmark is not None
+            else None
+        )
+    finally:
+        stop_event.set()
+        for slow_reader in slow_readers:
+            slow_reader.join()
+        if benchmark is not None:
+            benchmark.close()
+
+    sent = sum(client.report.sent for client in clients)
+    results = {
+        "environment": environment(),
+        "settings": {
+            "clients": args.clients,
+            "rate": args.rate,
+            "duration": args.duration,
+            "stream": str(args.replay) if args.replay else "sweep",
+            "partial_frames": args.partial_frames,
+            "slow_readers": args.slow_readers,
+            "binary_protocol": args.binary_protocol,
+            "server": (
+                f"{args.host}:{args.port}"
+                if benchmark is None
+                else ("asyncio" if args.asyncio_server else "select")
+            ),
+            "worker": args.worker if benchmark is not None else None,
+        },
+        "sent": sent,
+        "offered_commands_per_second": sent / args.duration,
+        "clients": [asdict(client.report) for client in clients],
+        "slow_readers": [asdict(slow_reader.report) for slow_reader in slow_readers],
+        "server": server,
+    }
+    if args.output:
+        with Path(args.output).open("w") as file:
+            json.dump(results, file, indent=2)
+    else:
+        json.dump(results, sys.stdout, indent=2)
+        sys.stdout.write("\n")
+
+
+if __name__ == "__main__":
+    main()
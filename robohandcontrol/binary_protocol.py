@@ -0,0 +1,219 @@
+"""
+Compact binary wire protocol, negotiated per connection.
+
+The client sends the text frame `protocol|binary;`,
+if the server supports binary protocol, it replies with the same frame
+and all the next data from the client are little-endian records,
+record size is fixed for every opcode:
+
+- opcode: uint8
+- sequence number: uint16 (wraps around)
+- payload: int16 angle + 2 pad bytes or 3 uint8 RGB values + 1 pad byte,
+  pose payload is a uint8 mask of fields set, 4 int16 angles and 3 uint8 RGB values
+
+Text record carries a text protocol command which has no binary opcode
+(e.g. sequence commands): uint16 length and UTF-8 text of that length.
+
+A server without binary protocol support ignores the unknown prefix,
+the client doesn't get the reply and keeps using the text protocol.
+"""
+
+import logging
+import struct
+from typing import TYPE_CHECKING
+
+from config import COMMAND_ENDL, COMMAND_SPLITTER, ControlParam
+from robohandcontrol.robocontrol import Pose
+
+if TYPE_CHECKING:
+    # text records have a single str arg
+    Record = tuple[int, int, tuple[int | str, ...]]
+
+log = logging.getLogger(__name__)
+
+BINARY_PROTOCOL_HELLO = COMMAND_SPLITTER.join(("protocol", "binary"))
+BINARY_PROTOCOL_HELLO_FRAME = (BINARY_PROTOCOL_HELLO + COMMAND_ENDL).encode("utf-8")
+
+SEQUENCE_MASK = 0xFFFF
+
+OP_CLAW = 1
+OP_EXTEND_ARROW = 2
+OP_RAISE_ARROW = 3
+OP_ROTATION = 4
+OP_LED = 5
+OP_POSE = 6
+OP_TEXT = 7
+
+ANGLE_RECORD = struct.Struct("<BHh2x")
+RGB_RECORD = struct.Struct("<BHBBBx")
+POSE_RECORD = struct.Struct("<BHB4h3B")
+TEXT_RECORD_HEADER = struct.Struct("<BHH")
+MAX_RECORD_SIZE = POSE_RECORD.size
+MAX_TEXT_SIZE = 0xFFFF
+
+POSE_ROTATION = 1
+POSE_RAISE_ARROW = 1 << 1
+POSE_EXTEND_ARROW = 1 << 2
+POSE_CLAW = 1 << 3
+POSE_LED = 1 << 4
+
+PARAM_TO_OPCODE: "dict[str, int]" = {
+    ControlParam.CLAW: OP_CLAW,
+    ControlParam.EXTEND_ARROW: OP_EXTEND_ARROW,
+    ControlParam.RAISE_ARROW: OP_RAISE_ARROW,
+    ControlParam.ROTATION: OP_ROTATION,
+    ControlParam.LED: OP_LED,
+}
+OPCODE_TO_PARAM: "dict[int, str]" = {
+    opcode: param for param, opcode in PARAM_TO_OPCODE.items()
+}
+OPCODE_TO_STRUCT: "dict[int, struct.Struct]" = {
+    OP_CLAW: ANGLE_RECORD,
+    OP_EXTEND_ARROW: ANGLE_RECORD,
+    OP_RAISE_ARROW: ANGLE_RECORD,
+    OP_ROTATION: ANGLE_RECORD,
+    OP_LED: RGB_RECORD,
+    OP_POSE: POSE_RECORD,
+}
+
+
+def encode_record(opcode: int, sequence: int, *args: int) -> bytes:
+    return OPCODE_TO_STRUCT[opcode].pack(opcode, sequence & SEQUENCE_MASK, *args)
+
+
+def encode_command(param: str, sequence: int, *args: int) -> bytes:
+    return encode_record(PARAM_TO_OPCODE[param], sequence, *args)
+
+
+def encode_pose(sequence: int, pose: Pose) -> bytes:
+    mask = 0
+    angles = []
+    for flag, angle in (
+        (POSE_ROTATION, pose.rotation),
+        (POSE_RAISE_ARROW, pose.raise_arrow),
+        (POSE_EXTEND_ARROW, pose.extend_arrow),
+        (POSE_CLAW, pose.claw),
+    ):
+        if angle is not None:
+            mask |= flag
+        angles.append(angle or 0)
+    rgb = (0, 0, 0)
+    if pose.led is not None:
+        mask |= POSE_LED
+        rgb = pose.led
+    return encode_record(OP_POSE, sequence, mask, *angles, *rgb)
+
+
+def encode_text(sequence: int, text: str) -> bytes:
+    data = text.encode("utf-8")
+    if len(data) > MAX_TEXT_SIZE:
+        msg = f"Text record is too long: {len(data)} bytes"
+        raise ValueError(msg)
+    header = TEXT_RECORD_HEADER.pack(OP_TEXT, sequence & SEQUENCE_MASK, len(data))
+    return header + data
+
+
+def decode_pose(args: "tuple[int, ...]") -> Pose:
+    """
+    :param args: pose record payload
+    :return:
+    """
+    mask, rotation, raise_arrow, extend_arrow, claw, red, green, blue = args
+    return Pose(
+        rotation=rotation if mask & POSE_ROTATION else None,
+        raise_arrow=raise_arrow if mask & POSE_RAISE_ARROW else None,
+        extend_arrow=extend_arrow if mask & POSE_EXTEND_ARROW else None,
+        claw=claw if mask & POSE_CLAW else None,
+        led=(red, green, blue) if mask & POSE_LED else None,
+    )
+
+
+class BinaryRecordBuffer:
+    """
+    Incremental binary records buffer for one connection,
+    same interface as `CommandFrameBuffer`.
+    """
+
+    def __init__(self, records_count: int = 64) -> None:
+        self.buffer = bytearray(MAX_RECORD_SIZE * records_count)
+        self.view = memoryview(self.buffer)
+        self.filled = 0
+
+    def writable(self) -> memoryview:
+        if self.filled == len(self.buffer):
+            # only a long text record doesn't fit
+            self.grow()
+        return self.view[self.filled :]
+
+    def grow(self) -> None:
+        buffer = bytearray(len(self.buffer) * 2)
+        buffer[: self.filled] = self.view[: self.filled]
+        self.buffer = buffer
+        self.view = memoryview(buffer)
+
+    def text_record_size(self, offset: int) -> int:
+        """
+        :param offset: text record start
+        :return: record size or 0 if it is not received completely yet
+        """
+        available = self.filled - offset
+        if available < TEXT_RECORD_HEADER.size:
+            return 0
+        _, _, length = TEXT_RECORD_HEADER.unpack_from(self.buffer, offset)
+        size = TEXT_RECORD_HEADER.size + int(length)
+        if available < size:
+            return 0
+        return size
+
+    def commit(self, nbytes: int) -> "list[Record]":
+        """
+        :param nbytes: number of bytes received into `writable()`
+        :return: decoded records: (opcode, sequence, args)
+        """
+        self.filled += nbytes
+        records: "list[Record]" = []
+        offset = 0
+        while offset < self.filled:
+            opcode = self.buffer[offset]
+            if opcode == OP_TEXT:
+                size = self.text_record_size(offset)
+                if not size:
+                    break
+                _, sequence, _ = TEXT_RECORD_HEADER.unpack_from(self.buffer, offset)
+                start = offset + TEXT_RECORD_HEADER.size
+                text = str(self.view[start : offset + size], "utf-8", "replace")
+                records.append((opcode, sequence, (text,)))
+                offset += size
+                continue
+            record_struct = OPCODE_TO_STRUCT.get(opcode)
+            if record_struct is None:
+                # record size is unknown, the rest of the stream can't be decoded
+                log.error(
+                    "Unknown opcode %s, drop %s buffered bytes",
+                    opcode,
+                    self.filled - offset,
+                )
+                offset = self.filled
+                break
+            if self.filled - offset < record_struct.size:
+                break
+            _, sequence, *args = record_struct.unpack_from(self.buffer, offset)
+            records.append((opcode, sequence, tuple(args)))
+            offset += record_struct.size
+
+        if offset:
+            rest = self.filled - offset
+            self.buffer[:rest] = self.view[offset : self.filled]
+            self.filled = rest
+        return records
+
+    def feed(self, data: bytes) -> "list[Record]":
+        records: "list[Record]" = []
+        offset = 0
+        while offset < len(data):
+            target = self.writable()
+            size = min(len(target), len(data) - offset)
+            target[:size] = data[offset : offset + size]
+            records.extend(self.commit(size))
+            offset += size
+        return records
@@ -0,0 +1,111 @@
+import logging
+import threading
+from dataclasses import dataclass, replace
+from typing import TYPE_CHECKING, Optional
+
+from config import ControlParam
+from robohandcontrol.robocontrol import Pose, RobohandControlBase
+
+if TYPE_CHECKING:
+    from typing import Callable
+
+log = logging.getLogger(__name__)
+
+
+@dataclass
+class CacheStats:
+    # writes dropped because the value is already set
+    hits: int = 0
+    # writes passed to the wrapped backend
+    misses: int = 0
+
+
+class CachedRobohandControl(RobohandControlBase):
+    """
+    Wraps any backend and drops writes of values which are already set.
+
+    Last value sent is remembered per joint and for the LED.
+    Call `invalidate` when the real state may differ from the cached one
+    (reconnect, servos were moved by something else, etc.)
+    """
+
+    def __init__(self, robohand: RobohandControlBase) -> None:
+        self.robohand = robohand
+        self.last_values: "dict[str, tuple[int, ...]]" = {}
+        self.stats = CacheStats()
+        self._lock = threading.Lock()
+
+    def invalidate(self, param: Optional[str] = None) -> None:
+        """
+        :param param: `ControlParam` to forget, all if not set
+        :return:
+        """
+        with self._lock:
+            if param is None:
+                self.last_values.clear()
+            else:
+                self.last_values.pop(param, None)
+
+    def reset_stats(self) -> None:
+        with self._lock:
+            self.stats = CacheStats()
+
+    def is_cached(self, param: str, args: "tuple[int, ...]") -> bool:
+        with self._lock:
+            if self.last_values.get(param) == args:
+                self.stats.hits += 1
+                return True
+            self.stats.misses += 1
+            return False
+
+    def remember(self, param: str, args: "tuple[int, ...]") -> None:
+        with self._lock:
+            self.last_values[param] = args
+
+    def write(
+        self,
+        param: str,
+        method: "Callable[..., None]",
+        *args: int,
+    ) -> None:
+        if self.is_cached(param, args):
+            log.debug("Skip %s%s, already set", param, args)
+            return
+        method(*args)
+        self.remember(param, args)
+
+    def control_claw(self, angle: int) -> None:
+        self.write(ControlParam.CLAW, self.robohand.control_claw, angle)
+
+    def control_extend_arrow(self, angle: int) -> None:
+        self.write(ControlParam.EXTEND_ARROW, self.robohand.control_extend_arrow, angle)
+
+    def control_raise_arrow(self, angle: int) -> None:
+        self.write(ControlParam.RAISE_ARROW, self.robohand.control_raise_arrow, angle)
+
+    def control_rotation(self, angle: int) -> None:
+        self.write(ControlParam.ROTATION, self.robohand.control_rotation, angle)
+
+    def set_led_rgb(self, red: int, green: int, blue: int) -> None:
+        self.write(ControlParam.LED, self.robohand.set_led_rgb, red, green, blue)
+
+    def pending_commands(self) -> int:
+        return self.robohand.pending_commands()
+
+    def set_pose(self, pose: Pose) -> None:
+        items = pose.items()
+        changed = {
+            param: args for param, args in items if not self.is_cached(param, args)
+        }
+        if not changed:
+            log.debug("Skip pose %s, already set", pose)
+            return
+        if len(changed) < len(items):
+            # send only changed joints
+            pose = replace(
+                pose,
+                **{param: None for param, _ in items if param not in changed},
+            )
+        self.robohand.set_pose(pose)
+        for param, args in changed.items():
+            self.remember(param, args)
@@ -0,0 +1,147 @@
+"""
+Servo calibration and precomputed angle -> register value lookup tables.
+
+Calibration file example (keys are ports from `ServoPorts`)::
+
+    {
+      "servos": {
+        "0": {"trim": 3},
+        "1": {"reversed": true},
+        "3": {"points": [[-90, -85], [0, 0], [90, 80]], "speed": 180}
+      }
+    }
+
+- `points`: nonlinear calibration, (commanded angle, physical angle) pairs,
+  angles between points are interpolated linearly
+- `trim`: offset in degrees added after `points`
+- `reversed`: servo is mounted the other way round
+- `speed`: degrees per second, used by motion timing (`robohandcontrol.motion_timing`)
+
+Servos missing in the file are not calibrated.
+"""
+
+import json
+import logging
+from array import array
+from dataclasses import dataclass, field
+from typing import TYPE_CHECKING, Any, Optional
+
+import config
+from config import BASE_DIR, ServoPorts
+
+if TYPE_CHECKING:
+    from pathlib import Path
+    from typing import Callable
+
+log = logging.getLogger(__name__)
+
+SERVO_PORTS = (
+    ServoPorts.SERVO_ROTATE_PORT,
+    ServoPorts.SERVO_CLAW_PORT,
+    ServoPorts.SERVO_ARROW_R_PORT,
+    ServoPorts.SERVO_ARROW_L_PORT,
+)
+
+
+@dataclass
+class ServoCalibration:
+    trim: int = 0
+    is_reversed: bool = False
+    points: "list[tuple[int, int]]" = field(default_factory=list)
+    # degrees per second, default speed if not set
+    speed: Optional[float] = None
+
+    def physical_angle(self, angle: int) -> int:
+        """
+        :param angle: commanded angle
+        :return: angle to turn the servo to
+        """
+        physical = self.interpolate(angle) + self.trim
+        if self.is_reversed:
+            physical = config.SERVO_MAX_ANGLE + config.SERVO_MIN_ANGLE - physical
+        return min(max(physical, config.SERVO_MIN_ANGLE), config.SERVO_MAX_ANGLE)
+
+    def interpolate(self, angle: int) -> int:
+        points = self.points
+        if not points:
+            return angle
+        if angle <= points[0][0]:
+            return points[0][1]
+        for (x0, y0), (x1, y1) in zip(points, points[1:]):
+            if angle <= x1:
+                return round(y0 + (y1 - y0) * (angle - x0) / (x1 - x0))
+        return points[-1][1]
+
+    @classmethod
+    def from_dict(cls, data: "dict[str, Any]") -> "ServoCalibration":
+        points = data.get("points") or []
+        if not isinstance(points, list):
+            msg = f"Calibration points should be a list, got {points!r}"
+            raise TypeError(msg)
+        return cls(
+            trim=int(data.get("trim", 0)),
+            is_reversed=bool(data.get("reversed", False)),
+            points=sorted((int(x), int(y)) for x, y in points),
+            speed=float(data["speed"]) if data.get("speed") else None,
+        )
+
+
+def load_calibrations(
+    filename: Optional[str] = config.SERVO_CALIBRATION,
+) -> "dict[int, ServoCalibration]":
+    """
+    :param filename: calibration file name relative to `BASE_DIR`
+    :return: calibration by servo port
+    """
+    calibrations = {port: ServoCalibration() for port in SERVO_PORTS}
+    if not filename:
+        return calibrations
+    filepath: Path = BASE_DIR / filename
+    if not filepath.exists():
+        log.info("No servo calibration file %s, use defaults", filepath)
+        return calibrations
+
+    with filepath.open("r") as file:
+        data = json.load(file)
+    for port, servo_data in data.get("servos", {}).items():
+        calibrations[int(port)] = ServoCalibration.from_dict(servo_data)
+    log.info("Loaded servo calibration from %s", filepath)
+    return calibrations
+
+
+class ServoLookupTables:
+    """
+    Per servo arrays of register values for every angle
+    from `SERVO_MIN_ANGLE` to `SERVO_MAX_ANGLE`
+    """
+
+    def __init__(
+        self,
+        calibrations: "dict[int, ServoCalibration]",
+        convert: "Callable[[int], int]",
+    ) -> None:
+        """
+        :param calibrations: calibration by servo port
+        :param convert: physical angle to backend register value
+        """
+        self.min_angle = config.SERVO_MIN_ANGLE
+        self.max_angle = config.SERVO_MAX_ANGLE
+        self.tables: "dict[int, array[int]]" = {
+            port: array(
+                "H",
+                (
+                    convert(calibration.physical_angle(angle))
+                    for angle in range(self.min_angle, self.max_angle + 1)
+                ),
+            )
+            for port, calibration in calibrations.items()
+        }
+
+    def lookup(self, port: int, angle: int) -> int:
+        """
+        :param port: servo port
+        :param angle: commanded angle, clamped to the servo range
+        :return: register value
+        """
+        angle = min(max(angle, self.min_angle), self.max_angle)
+        return self.tables[port][angle - self.min_angle]
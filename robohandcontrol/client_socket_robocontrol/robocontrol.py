@@ -1,6 +1,10 @@
 import logging
+import queue
 import socket
-from typing import Optional
+import threading
+import time
+from contextlib import contextmanager, suppress
+from typing import TYPE_CHECKING, Optional
 
 from config import (
     COMMAND_ENDL,
@@ -10,22 +14,144 @@ from config import (
     SERVER_PORT,
     ControlParam,
 )
-from robohandcontrol.robocontrol import RobohandControlBase
+from robohandcontrol import tracing
+from robohandcontrol.binary_protocol import (
+    BINARY_PROTOCOL_HELLO_FRAME,
+    SEQUENCE_MASK,
+    encode_command,
+    encode_pose,
+    encode_text,
+)
+from robohandcontrol.robocontrol import Pose, RobohandControlBase
+from robohandcontrol.sequence_protocol import SequenceCommand, encode_step, make_frame
+from robohandcontrol.server_socket_robocontrol.framing import CommandFrameBuffer
+
+if TYPE_CHECKING:
+    from collections import deque
+    from collections.abc import Iterator
+    from typing import Callable
+
+    # (prefix, args) command, a pose or a text frame, encoded on the I/O thread
+    Command = tuple[str, tuple[int, ...]] | Pose | str
+    # commands collected by `batch()` are queued together
+    OutgoingItem = Command | list[Command]
+    # event prefix, args
+    SequenceEventHandler = Callable[[str, tuple[str, ...]], None]
 
 log = logging.getLogger(__name__)
 
+OUTGOING_QUEUE_SIZE = 64
+# seconds, doubled after every failed attempt
+RECONNECT_MIN_DELAY = 0.1
+RECONNECT_MAX_DELAY = 5.0
+# seconds to wait for more commands to send them together, off by default:
+# a command is sent at once with the commands already queued
+BATCH_MAX_DELAY = 0.0
+# bytes, send as soon as the batch is this big
+BATCH_MAX_SIZE = 1024
+# seconds, an idle I/O thread checks if the client is closed
+STOP_CHECK_INTERVAL = 0.1
+
+
+def is_setpoint(item: "OutgoingItem") -> bool:
+    """
+    :param item: queued item
+    :return: True for control commands, optionally with trace frames,
+        False for items with sequence frames
+    """
+    commands = item if isinstance(item, list) else [item]
+    return all(
+        not isinstance(command, str) or command.startswith(tracing.TRACE_PREFIX)
+        for command in commands
+    )
+
+
+def negotiate_binary_protocol(client_socket: socket.socket) -> bool:
+    """
+    Ask server to switch to the binary protocol.
+    If server doesn't reply in time, the text protocol is used.
+
+    :param client_socket: connected socket
+    :return: True if server switched to the binary protocol
+    """
+    log.debug("Negotiate binary protocol")
+    try:
+        client_socket.sendall(BINARY_PROTOCOL_HELLO_FRAME)
+        reply = b""
+        while len(reply) < len(BINARY_PROTOCOL_HELLO_FRAME):
+            data = client_socket.recv(len(BINARY_PROTOCOL_HELLO_FRAME) - len(reply))
+            if not data:
+                break
+            reply += data
+    except OSError as e:
+        log.warning("Binary protocol is not supported by server (%s)", e)
+        return False
+    if reply != BINARY_PROTOCOL_HELLO_FRAME:
+        log.warning("Unexpected binary protocol reply %r", reply)
+        return False
+    log.info("Using binary protocol")
+    return True
+
 
 class RobohandControlClientSocket(RobohandControlBase):
+    """
+    Sends commands to the server socket.
+
+    Control methods only put commands to the outgoing queue and return,
+    connecting, reconnecting with backoff and sending are done
+    on the background I/O thread, so the caller (GUI thread) never blocks.
+
+    Commands queued together are sent in one `send` call:
+    everything already queued, up to `batch_max_size` bytes, waiting up to
+    `batch_max_delay` for more (0 by default, no waiting).
+    Use `batch()` to send a group of calls at once.
+    """
+
     def __init__(
         self,
         server_host: str = SERVER_IP_CONNECT,
         server_port: int = SERVER_PORT,
         command_splitter: str = COMMAND_SPLITTER,
+        binary_protocol: bool = False,
+        queue_size: int = OUTGOING_QUEUE_SIZE,
+        reconnect_min_delay: float = RECONNECT_MIN_DELAY,
+        reconnect_max_delay: float = RECONNECT_MAX_DELAY,
+        batch_max_delay: float = BATCH_MAX_DELAY,
+        batch_max_size: int = BATCH_MAX_SIZE,
     ) -> None:
         self.server_host = server_host
         self.server_port = server_port
         self.command_splitter = command_splitter
+        # try to negotiate binary protocol on connect
+        self.binary_protocol = binary_protocol
+        # binary protocol is negotiated for the current connection
+        self.binary_mode = False
+        self.sequence = 0
+        self.reconnect_min_delay = reconnect_min_delay
+        self.reconnect_max_delay = reconnect_max_delay
+        self.batch_max_delay = batch_max_delay
+        self.batch_max_size = batch_max_size
+        # commands collected by `batch()`, queued on exit or `flush()`
+        # `batch` and `batch_depth` of the calling thread, so commands sent
+        # from other threads (streamer, event handlers) aren't collected
+        self._local = threading.local()
+        # commands dropped because the outgoing queue was full
+        self.dropped = 0
+        self.connected = threading.Event()
+        self.connected_handlers: "list[Callable[[], None]]" = []
+        self.sequence_event_handlers: "list[SequenceEventHandler]" = []
+
+        self.outgoing: "queue.Queue[Optional[OutgoingItem]]" = queue.Queue(
+            maxsize=queue_size,
+        )
         self._socket: Optional[socket.socket] = None
+        self._stop = threading.Event()
+        self._thread = threading.Thread(
+            target=self.run,
+            name="robohand-client-io",
+            daemon=True,
+        )
+        self._thread.start()
 
     def control_claw(self, angle: int) -> None:
         log.info("[Send] Set claw angle to %s", angle)
@@ -47,58 +173,413 @@ class RobohandControlClientSocket(RobohandControlBase):
         log.info("[Send] Set led rgb to %s, %s, %s", red, green, blue)
         self.send_command(ControlParam.LED, red, green, blue)
 
-    @property
-    def socket(self) -> Optional[socket.socket]:
+    def set_pose(self, pose: Pose) -> None:
+        log.info("[Send] Set pose %s", pose)
+        self.enqueue_command(pose)
+
+    def pending_commands(self) -> int:
+        return self.outgoing.qsize()
+
+    def add_connected_handler(self, handler: "Callable[[], None]") -> None:
+        """
+        Handler is called on the I/O thread after every (re)connect
+
+        :param handler:
+        :return:
+        """
+        self.connected_handlers.append(handler)
+
+    def add_sequence_event_handler(self, handler: "SequenceEventHandler") -> None:
+        """
+        Handler is called on the reader thread for every server sequence event,
+        e.g. `("sequence_progress", ("3", "10"))`
+
+        :param handler:
+        :return:
+        """
+        self.sequence_event_handlers.append(handler)
+
+    def upload_sequence(self, steps: "list[Pose]") -> None:
+        """
+        Replace the sequence stored on the server
+
+        :param steps: poses to play
+        :return:
+        """
+        log.info("[Send] Upload sequence of %s steps", len(steps))
+        with self.batch():
+            self.enqueue(make_frame(SequenceCommand.CLEAR))
+            for pose in steps:
+                self.enqueue(make_frame(SequenceCommand.ADD, encode_step(pose)))
+
+    def start_sequence(self, interval: Optional[int] = None) -> None:
+        """
+        :param interval: milliseconds between steps, server keeps the last one if None
+        :return:
+        """
+        log.info("[Send] Start sequence, interval %s", interval)
+        if interval is None:
+            self.enqueue(make_frame(SequenceCommand.START))
+        else:
+            self.enqueue(make_frame(SequenceCommand.START, interval))
+
+    def stop_sequence(self) -> None:
+        log.info("[Send] Stop sequence")
+        self.enqueue(make_frame(SequenceCommand.STOP))
+
+    def pause_sequence(self) -> None:
+        log.info("[Send] Pause sequence")
+        self.enqueue(make_frame(SequenceCommand.PAUSE))
+
+    def resume_sequence(self) -> None:
+        log.info("[Send] Resume sequence")
+        self.enqueue(make_frame(SequenceCommand.RESUME))
+
+    def seek_sequence(self, index: int) -> None:
+        log.info("[Send] Seek sequence to step %s", index)
+        self.enqueue(make_frame(SequenceCommand.SEEK, index))
+
+    def close(self, timeout: Optional[float] = None) -> None:
+        """
+        Send queued commands and stop the I/O thread
+
+        :param timeout: seconds to wait for the thread to finish
+        :return:
+        """
+        self._stop.set()
+        # wakes the I/O thread, if the queue is full it exits once it is sent
+        with suppress(queue.Full):
+            self.outgoing.put_nowait(None)
+        self._thread.join(timeout)
+
+    @contextmanager
+    def batch(self) -> "Iterator[None]":
+        """
+        Send all control calls made inside the block as one frame.
+        Nested blocks are sent when the outer one exits.
+
+        :return:
+        """
+        depth: int = getattr(self._local, "batch_depth", 0)
+        if depth == 0:
+            self._local.batch = []
+        self._local.batch_depth = depth + 1
+        try:
+            yield
+        finally:
+            self._local.batch_depth -= 1
+            if self._local.batch_depth == 0:
+                self.flush()
+                self._local.batch = None
+
+    def current_batch(self) -> "Optional[list[Command]]":
         """
+        :return: commands collected by `batch()` of the calling thread
+        """
+        batch: "Optional[list[Command]]" = getattr(self._local, "batch", None)
+        return batch
+
+    def flush(self) -> None:
+        """
+        Queue commands collected by `batch()` so far
+
         :return:
         """
-        if self._socket:
-            return self._socket
-        log.debug("Create a TCP socket")
-        client_socket = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
-        client_socket.settimeout(CONNECT_TIMEOUT)
+        commands = self.current_batch()
+        if not commands:
+            return
+        self._local.batch = []
+        self.enqueue(commands)
 
+    def enqueue(self, item: "OutgoingItem") -> None:
+        batch = self.current_batch()
+        if batch is not None and not isinstance(item, list):
+            batch.append(item)
+            return
         try:
-            log.debug("Connect to the server")
-            client_socket.connect((SERVER_IP_CONNECT, SERVER_PORT))
+            self.outgoing.put_nowait(item)
+            return
+        except queue.Full:
+            self.dropped += 1
+        # setpoints are absolute, the newest one matters, sequence frames are kept
+        dropped = self.drop_oldest_setpoint() if is_setpoint(item) else None
+        if dropped is not None:
+            with suppress(queue.Full):
+                self.outgoing.put_nowait(item)
+                item = dropped
+        log.warning(
+            "Outgoing queue is full (server %s:%s), drop %s",
+            self.server_host,
+            self.server_port,
+            item,
+        )
+
+    def drop_oldest_setpoint(self) -> "Optional[OutgoingItem]":
+        """
+        :return: removed queued setpoint, None if there are only sequence frames
+        """
+        with self.outgoing.mutex:
+            queued_items: "deque[Optional[OutgoingItem]]" = self.outgoing.queue
+            for index, queued in enumerate(queued_items):
+                if queued is not None and is_setpoint(queued):
+                    del queued_items[index]
+                    self.outgoing.not_full.notify()
+                    return queued
+        return None
+
+    def enqueue_command(self, command: "Command") -> None:
+        """
+        Queue a control command, after its trace frame if tracing is enabled
+
+        :param command:
+        :return:
+        """
+        tracer = tracing.tracer
+        if tracer is None:
+            self.enqueue(command)
+            return
+        start = tracing.now()
+        trace_id = tracing.current_trace.get()
+        if trace_id is None:
+            trace_id = tracer.new_id()
+        tracer.flow(tracing.PHASE_FLOW_START, trace_id, start)
+        traced: "list[Command]" = [tracing.trace_frame(trace_id), command]
+        batch = self.current_batch()
+        if batch is not None:
+            batch.extend(traced)
+        else:
+            self.enqueue(traced)
+        tracer.complete("send_command", trace_id, start)
+
+    def send_command(self, prefix: str, *args: int) -> None:
+        self.enqueue_command((prefix, args))
+
+    def next_sequence(self) -> int:
+        self.sequence = (self.sequence + 1) & SEQUENCE_MASK
+        return self.sequence
+
+    def encode(self, item: "Command") -> bytes:
+        if isinstance(item, str):
+            if self.binary_mode:
+                return encode_text(self.next_sequence(), item)
+            return item.encode("utf-8")
+        if isinstance(item, Pose):
+            if self.binary_mode:
+                return encode_pose(self.next_sequence(), item)
+            return item.to_commands(self.command_splitter).encode("utf-8")
+
+        prefix, args = item
+        if self.binary_mode:
+            return encode_command(prefix, self.next_sequence(), *args)
+        command = self.command_splitter.join((prefix, *map(str, args))) + COMMAND_ENDL
+        return command.encode("utf-8")
+
+    def encode_items(self, items: "list[OutgoingItem]") -> bytes:
+        payload = bytearray()
+        for item in items:
+            commands = item if isinstance(item, list) else [item]
+            for command in commands:
+                payload += self.encode(command)
+        return bytes(payload)
+
+    def collect_batch(
+        self,
+        item: "OutgoingItem",
+    ) -> "tuple[list[OutgoingItem], bytearray, bool]":
+        """
+        Take more queued items to send with the `item`, called on the I/O thread
+
+        :param item: first item
+        :return: items, encoded payload and whether the stop signal was received
+        """
+        items = [item]
+        payload = bytearray(self.encode_items(items))
+        deadline = time.monotonic() + self.batch_max_delay
+        while len(payload) < self.batch_max_size:
+            timeout = deadline - time.monotonic()
+            try:
+                if timeout > 0:
+                    next_item = self.outgoing.get(timeout=timeout)
+                else:
+                    next_item = self.outgoing.get_nowait()
+            except queue.Empty:
+                break
+            if next_item is None:
+                return items, payload, True
+            items.append(next_item)
+            payload += self.encode_items([next_item])
+        return items, payload, False
+
+    def connect(self) -> Optional[socket.socket]:
+        """
+        Connect to the server, called on the I/O thread
+
+        :return: connected socket or None
+        """
+        log.debug("Connect to the server %s:%s", self.server_host, self.server_port)
+        try:
+            client_socket = socket.create_connection(
+                (self.server_host, self.server_port),
+                timeout=CONNECT_TIMEOUT,
+            )
         except socket.timeout:
             log.error(
                 "Connection to %s:%s timed out after %s seconds",
-                SERVER_IP_CONNECT,
-                SERVER_PORT,
+                self.server_host,
+                self.server_port,
                 CONNECT_TIMEOUT,
             )
             return None
         except OSError as e:
-            log.error("Could not connect to host, error: %s", e)
-        except ConnectionRefusedError:
             log.error(
-                "Could not connect to server %s:%s",
+                "Could not connect to server %s:%s, error: %s",
                 self.server_host,
                 self.server_port,
+                e,
             )
             return None
-        self._socket = client_socket
-        return self._socket
 
-    def send_command_to_server(self, command: str) -> None:
-        if not self.socket:
-            return
+        client_socket.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        self.binary_mode = self.binary_protocol and negotiate_binary_protocol(
+            client_socket,
+        )
+        log.info("Connected to the server %s:%s", self.server_host, self.server_port)
+        return client_socket
+
+    def connect_with_backoff(self) -> Optional[socket.socket]:
+        """
+        :return: connected socket or None if the client is closed
+        """
+        delay = self.reconnect_min_delay
+        while not self._stop.is_set():
+            client_socket = self.connect()
+            if client_socket is not None:
+                return client_socket
+            log.info("Reconnect in %.1f seconds", delay)
+            self._stop.wait(delay)
+            delay = min(delay * 2, self.reconnect_max_delay)
+        return None
+
+    def disconnect(self) -> None:
+        self.connected.clear()
+        if self._socket is not None:
+            self._socket.close()
+            self._socket = None
 
+    def send_command_to_server(self, command: "bytes | bytearray") -> bool:
+        """
+        Send encoded command, called on the I/O thread
+
+        :param command:
+        :return: False if the connection is lost
+        """
+        if self._socket is None:
+            return False
+        view = memoryview(command)
+        sent = 0
         try:
-            self.socket.send(command.encode("utf-8"))
-        except TimeoutError:
+            while sent < len(view):
+                try:
+                    sent += self._socket.send(view[sent:])
+                except socket.timeout:
+                    # server is slow to read, send the rest on the same stream
+                    # so no frame is split or sent twice
+                    if self._stop.is_set():
+                        raise
+                    log.warning(
+                        "Sending to the server timed out, %s bytes left",
+                        len(view) - sent,
+                    )
+        except socket.timeout:
             log.error("Server socket connection timed out")
-            self._socket = None
-        except BrokenPipeError:
+        except OSError as e:
             log.error(
-                "Connection refused on server %s:%s, skip sending command %r",
+                "Connection lost to server %s:%s (%s), command %r will be resent",
                 self.server_host,
                 self.server_port,
+                e,
                 command,
             )
-            self._socket = None
+        else:
+            return True
+        self.disconnect()
+        return False
 
-    def send_command(self, prefix: str, *args: int) -> None:
-        command = self.command_splitter.join((prefix, *map(str, args))) + COMMAND_ENDL
-        self.send_command_to_server(command)
+    def ensure_connected(self) -> bool:
+        if self._socket is not None:
+            return True
+        self._socket = self.connect_with_backoff()
+        if self._socket is None:
+            return False
+        self.connected.set()
+        threading.Thread(
+            target=self.read_events,
+            args=(self._socket,),
+            name="robohand-client-reader",
+            daemon=True,
+        ).start()
+        for handler in self.connected_handlers:
+            handler()
+        return True
+
+    def read_events(self, client_socket: socket.socket) -> None:
+        """
+        Reader thread: receive server events until the connection is closed
+
+        :param client_socket: connected socket
+        :return:
+        """
+        frames_buffer = CommandFrameBuffer()
+        while True:
+            try:
+                nbytes = client_socket.recv_into(frames_buffer.writable())
+            except socket.timeout:
+                continue
+            except OSError:
+                break
+            if not nbytes:
+                break
+            for frame in frames_buffer.commit(nbytes):
+                self.handle_event(frame)
+        log.debug("Stop reading events")
+
+    def handle_event(self, frame: str) -> None:
+        prefix, *args = frame.split(self.command_splitter)
+        for handler in self.sequence_event_handlers:
+            try:
+                handler(prefix, tuple(args))
+            except Exception:
+                log.exception("Error handling server event %r", frame)
+
+    def run(self) -> None:
+        """
+        I/O thread: connect, take commands from the queue and send them,
+        reconnect on errors.
+
+        :return:
+        """
+        items: "list[OutgoingItem]" = []
+        payload: "bytes | bytearray" = b""
+        stop = False
+        while True:
+            if not self.ensure_connected():
+                break
+            if not items:
+                if stop:
+                    break
+                try:
+                    item = self.outgoing.get(timeout=STOP_CHECK_INTERVAL)
+                except queue.Empty:
+                    if self._stop.is_set():
+                        break
+                    continue
+                if item is None:
+                    break
+                items, payload, stop = self.collect_batch(item)
+            if not payload:
+                # encoded again after reconnect, protocol may differ
+                payload = self.encode_items(items)
+            if self.send_command_to_server(payload):
+                items = []
+            payload = b""
+        self.disconnect()
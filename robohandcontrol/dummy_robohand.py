@@ -1,6 +1,6 @@
 import logging
 
-from robohandcontrol.robocontrol import RobohandControlBase
+from robohandcontrol.robocontrol import Pose, RobohandControlBase
 
 log = logging.getLogger(__name__)
 
@@ -26,3 +26,6 @@ class LoggedRobohandControl(RobohandControlBase):
 
     def set_led_rgb(self, red: int, green: int, blue: int) -> None:
         log.info("Set led rgb to %s, %s, %s", red, green, blue)
+
+    def set_pose(self, pose: Pose) -> None:
+        log.info("Set pose %s", pose)
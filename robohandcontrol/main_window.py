@@ -6,21 +6,44 @@ from PySide6.QtWidgets import (
 )
 
 import config
-from app.common.robohand_getter import robohand_control
+from app.common.robohand_getter import robohand_control, unwrap_backend
 from app.widgets.combined_robocontrol_window import CombinedRoboControlWindow
+from robohandcontrol import tracing
+from robohandcontrol.calibration import load_calibrations
+from robohandcontrol.client_socket_robocontrol.robocontrol import (
+    RobohandControlClientSocket,
+)
+from robohandcontrol.motion_timing import MotionModel, MotionScheduler
 
 
 def get_main_window() -> CombinedRoboControlWindow:
     robohand = robohand_control()
+    backend = unwrap_backend(robohand)
+    # play stored commands on the server instead of the GUI timer
+    remote_sequence = (
+        backend
+        if "--server-playback" in sys.argv
+        and isinstance(backend, RobohandControlClientSocket)
+        else None
+    )
+    motion_scheduler = (
+        MotionScheduler(MotionModel.from_calibrations(load_calibrations()))
+        if "--motion-timing" in sys.argv
+        else None
+    )
     window = CombinedRoboControlWindow(
         robohand,
         store_commands_filename=config.STORE_COMMANDS,
+        remote_sequence=remote_sequence,
+        motion_scheduler=motion_scheduler,
     )
     return window
 
 
 def main() -> None:
     logging.basicConfig(level=logging.DEBUG)
+    if "--trace" in sys.argv:
+        tracing.enable("gui")
     app = QApplication(sys.argv)
 
     window = get_main_window()
@@ -0,0 +1,302 @@
+"""
+Motion recording: wraps a backend, the sampling thread stores the last commanded
+joint angles at a fixed rate into preallocated arrays used as a ring buffer,
+so a sample allocates no Python objects.
+
+The recording is exported as keyframes: a sample is dropped if every joint
+is within `tolerance` degrees of the linear motion between the kept ones
+(Ramer-Douglas-Peucker over time). Keyframes are saved as stored commands
+(only changed joints per step, the timing is lost) or as a timeline file
+with the recorded durations.
+"""
+
+import hashlib
+import logging
+import threading
+import time
+from array import array
+from typing import TYPE_CHECKING, Optional
+
+import config
+from robohandcontrol.binary_protocol import (
+    POSE_CLAW,
+    POSE_EXTEND_ARROW,
+    POSE_RAISE_ARROW,
+    POSE_ROTATION,
+)
+from robohandcontrol.robocontrol import Pose, RobohandControlBase
+from robohandcontrol.timeline import (
+    TIMELINE_HEADER,
+    TIMELINE_MAGIC,
+    TIMELINE_VERSION,
+    write_steps,
+)
+
+if TYPE_CHECKING:
+    from pathlib import Path
+
+log = logging.getLogger(__name__)
+
+# in `Pose` fields order, as the binary protocol mask bits
+JOINT_FLAGS = (POSE_ROTATION, POSE_RAISE_ARROW, POSE_EXTEND_ARROW, POSE_CLAW)
+JOINTS_COUNT = len(JOINT_FLAGS)
+ROTATION, RAISE_ARROW, EXTEND_ARROW, CLAW = range(JOINTS_COUNT)
+# timeline header durations digest of recorded timelines
+RECORDED_DIGEST = hashlib.sha256(b"recorded").digest()[:8]
+
+
+class MotionRecorder(RobohandControlBase):
+    def __init__(
+        self,
+        robohand: RobohandControlBase,
+        capacity: int = config.RECORD_BUFFER_SIZE,
+        rate: float = config.RECORD_RATE,
+    ) -> None:
+        """
+        :param robohand: backend, every call is passed through
+        :param capacity: samples kept, older ones are overwritten
+        :param rate: samples per second while recording
+        """
+        self.robohand = robohand
+        self.capacity = capacity
+        self.period = 1 / rate
+        # monotonic ns, angles by joint, mask of joints commanded so far
+        self.times = array("q", bytes(8 * capacity))
+        self.angles = array("h", bytes(2 * capacity * JOINTS_COUNT))
+        self.masks = array("B", bytes(capacity))
+        # samples written since `start`, the ring holds the last `capacity`
+        self.count = 0
+        self.current = array("h", bytes(2 * JOINTS_COUNT))
+        self.current_mask = 0
+        self._lock = threading.Lock()
+        self._recording = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def command(self, joint: int, angle: int) -> None:
+        with self._lock:
+            self.current[joint] = angle
+            self.current_mask |= JOINT_FLAGS[joint]
+
+    def control_claw(self, angle: int) -> None:
+        self.robohand.control_claw(angle)
+        self.command(CLAW, angle)
+
+    def control_extend_arrow(self, angle: int) -> None:
+        self.robohand.control_extend_arrow(angle)
+        self.command(EXTEND_ARROW, angle)
+
+    def control_raise_arrow(self, angle: int) -> None:
+        self.robohand.control_raise_arrow(angle)
+        self.command(RAISE_ARROW, angle)
+
+    def control_rotation(self, angle: int) -> None:
+        self.robohand.control_rotation(angle)
+        self.command(ROTATION, angle)
+
+    def set_led_rgb(self, red: int, green: int, blue: int) -> None:
+        self.robohand.set_led_rgb(red, green, blue)
+
+    def set_pose(self, pose: Pose) -> None:
+        self.robohand.set_pose(pose)
+        with self._lock:
+            for joint, angle in enumerate(
+                (pose.rotation, pose.raise_arrow, pose.extend_arrow, pose.claw),
+            ):
+                if angle is not None:
+                    self.current[joint] = angle
+                    self.current_mask |= JOINT_FLAGS[joint]
+
+    def pending_commands(self) -> int:
+        return self.robohand.pending_commands()
+
+    @property
+    def is_recording(self) -> bool:
+        return self._recording.is_set()
+
+    def start(self) -> None:
+        """
+        Start a new recording, the previous one is discarded
+        """
+        if self.is_recording:
+            return
+        self.count = 0
+        with self._lock:
+            # only joints commanded during the recording are kept
+            self.current_mask = 0
+        self._recording.set()
+        self._thread = threading.Thread(
+            target=self.run,
+            name="robohand-recorder",
+            daemon=True,
+        )
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._recording.clear()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+        log.info("Recorded %s samples", min(self.count, self.capacity))
+
+    def sample(self) -> None:
+        slot = self.count % self.capacity
+        offset = slot * JOINTS_COUNT
+        with self._lock:
+            self.times[slot] = time.monotonic_ns()
+            self.angles[offset : offset + JOINTS_COUNT] = self.current
+            self.masks[slot] = self.current_mask
+        self.count += 1
+
+    def run(self) -> None:
+        next_at = time.monotonic()
+        while self._recording.is_set():
+            self.sample()
+            next_at += self.period
+            delay = next_at - time.monotonic()
+            if delay < 0:
+                # skip missed samples instead of taking them in a burst
+                next_at = time.monotonic()
+                continue
+            time.sleep(delay)
+
+    def samples(self) -> "tuple[array[int], array[int], array[int]]":
+        """
+        :return: times, angles and masks of the recording, oldest first
+        """
+        if self.count <= self.capacity:
+            count = self.count
+            return (
+                self.times[:count],
+                self.angles[: count * JOINTS_COUNT],
+                self.masks[:count],
+            )
+        slot = self.count % self.capacity
+        offset = slot * JOINTS_COUNT
+        return (
+            self.times[slot:] + self.times[:slot],
+            self.angles[offset:] + self.angles[:offset],
+            self.masks[slot:] + self.masks[:slot],
+        )
+
+    def keyframes(
+        self,
+        tolerance: float = config.RECORD_TOLERANCE,
+    ) -> "tuple[list[Pose], list[int]]":
+        """
+        :param tolerance: degrees
+        :return: absolute poses and durations until the next one in milliseconds
+        """
+        times, angles, masks = self.samples()
+        poses = []
+        durations = []
+        indexes = reduce_keyframes(times, angles, masks, tolerance)
+        for number, index in enumerate(indexes):
+            if not masks[index]:
+                # nothing commanded yet
+                continue
+            offset = index * JOINTS_COUNT
+            rotation, raise_arrow, extend_arrow, claw = (
+                angles[offset + joint] if masks[index] & flag else None
+                for joint, flag in enumerate(JOINT_FLAGS)
+            )
+            poses.append(
+                Pose(
+                    rotation=rotation,
+                    raise_arrow=raise_arrow,
+                    extend_arrow=extend_arrow,
+                    claw=claw,
+                ),
+            )
+            next_index = indexes[number + 1] if number + 1 < len(indexes) else index
+            durations.append((times[next_index] - times[index]) // 1_000_000)
+        return poses, durations
+
+
+def keyframe_commands(poses: "list[Pose]") -> "list[str]":
+    """
+    :param poses: absolute keyframes
+    :return: stored commands, joints changed since the previous step only
+    """
+    commands = []
+    previous = Pose()
+    for pose in poses:
+        changes = Pose()
+        for param, args in pose.items():
+            if getattr(previous, param) != args[0]:
+                changes.set(param, *args)
+        previous = pose
+        if changes:
+            commands.append(changes.to_commands())
+    return commands
+
+
+def write_recorded_timeline(
+    target: "Path",
+    poses: "list[Pose]",
+    durations: "list[int]",
+) -> None:
+    """
+    Timeline without a commands source, played with the recorded durations
+    """
+    header = TIMELINE_HEADER.pack(
+        TIMELINE_MAGIC,
+        TIMELINE_VERSION,
+        0,
+        0,
+        bytes(32),
+        RECORDED_DIGEST,
+        len(poses),
+    )
+    write_steps(target, header, poses, durations)
+    log.info("Saved %s recorded steps to %s", len(poses), target)
+
+
+def reduce_keyframes(
+    times: "array[int]",
+    angles: "array[int]",
+    masks: "array[int]",
+    tolerance: float,
+) -> "list[int]":
+    """
+    :param times: sample times
+    :param angles: `JOINTS_COUNT` angles per sample
+    :param masks: commanded joints per sample, runs of the same mask are reduced
+        separately, their ends are kept
+    :param tolerance: degrees
+    :return: indexes of kept samples
+    """
+    count = len(times)
+    if count <= 2:  # noqa: PLR2004
+        return list(range(count))
+    keep = bytearray(count)
+    ranges = []
+    first = 0
+    for index in range(1, count + 1):
+        if index < count and masks[index] == masks[first]:
+            continue
+        last = index - 1
+        keep[first] = keep[last] = 1
+        ranges.append((first, last))
+        first = index
+    while ranges:
+        first, last = ranges.pop()
+        start = times[first]
+        span = times[last] - start or 1
+        worst = tolerance
+        worst_index = -1
+        for index in range(first + 1, last):
+            fraction = (times[index] - start) / span
+            for joint in range(JOINTS_COUNT):
+                first_angle = angles[first * JOINTS_COUNT + joint]
+                last_angle = angles[last * JOINTS_COUNT + joint]
+                expected = first_angle + (last_angle - first_angle) * fraction
+                deviation = abs(angles[index * JOINTS_COUNT + joint] - expected)
+                if deviation > worst:
+                    worst = deviation
+                    worst_index = index
+        if worst_index < 0:
+            continue
+        keep[worst_index] = 1
+        ranges.append((first, worst_index))
+        ranges.append((worst_index, last))
+    return [index for index in range(count) if keep[index]]
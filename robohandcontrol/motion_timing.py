@@ -0,0 +1,171 @@
+"""
+Step durations estimated from joint movement instead of a fixed timeout.
+
+A step takes as long as its largest joint move: `delta / speed`
+for every joint changed, the slowest one wins, plus a settle margin.
+A joint whose previous angle is unknown is assumed to move across its full range.
+"""
+
+import logging
+import time
+from dataclasses import dataclass, field
+from typing import TYPE_CHECKING, Optional
+
+import config
+from config import ControlParam, ServoPorts
+from robohandcontrol.robocontrol import Pose
+
+if TYPE_CHECKING:
+    from robohandcontrol.calibration import ServoCalibration
+
+log = logging.getLogger(__name__)
+
+JOINT_PORTS: "dict[str, int]" = {
+    ControlParam.ROTATION: ServoPorts.SERVO_ROTATE_PORT,
+    ControlParam.RAISE_ARROW: ServoPorts.SERVO_ARROW_L_PORT,
+    ControlParam.EXTEND_ARROW: ServoPorts.SERVO_ARROW_R_PORT,
+    ControlParam.CLAW: ServoPorts.SERVO_CLAW_PORT,
+}
+FULL_RANGE = config.SERVO_MAX_ANGLE - config.SERVO_MIN_ANGLE
+
+
+def default_speeds() -> "dict[str, float]":
+    return {param: float(config.SERVO_SPEED) for param in JOINT_PORTS}
+
+
+@dataclass
+class MotionModel:
+    # degrees per second by joint `ControlParam`
+    speeds: "dict[str, float]" = field(default_factory=default_speeds)
+    # seconds added to every step
+    settle_time: float = config.SETTLE_TIME / 1000
+
+    @classmethod
+    def from_calibrations(
+        cls,
+        calibrations: "dict[int, ServoCalibration]",
+        settle_time: float = config.SETTLE_TIME / 1000,
+    ) -> "MotionModel":
+        """
+        :param calibrations: calibration by servo port, `speed` overrides default
+        :param settle_time: seconds
+        :return:
+        """
+        speeds = default_speeds()
+        for param, port in JOINT_PORTS.items():
+            calibration = calibrations.get(port)
+            if calibration is not None and calibration.speed:
+                speeds[param] = calibration.speed
+        return cls(speeds=speeds, settle_time=settle_time)
+
+    def move_time(self, param: str, previous: Optional[int], angle: int) -> float:
+        delta = FULL_RANGE if previous is None else abs(angle - previous)
+        return delta / self.speeds[param]
+
+    def step_duration(self, position: Pose, pose: Pose) -> float:
+        """
+        :param position: current joint angles, None if unknown
+        :param pose: step to make
+        :return: seconds
+        """
+        duration = 0.0
+        for param, args in pose.items():
+            if param not in self.speeds:
+                # LED doesn't move
+                continue
+            previous = getattr(position, param)
+            duration = max(duration, self.move_time(param, previous, args[0]))
+        return duration + self.settle_time
+
+
+class MotionScheduler:
+    """
+    Tracks commanded joint angles and estimates every next step duration
+    """
+
+    def __init__(
+        self,
+        model: Optional[MotionModel] = None,
+        position: Optional[Pose] = None,
+    ) -> None:
+        self.model = model or MotionModel()
+        self.position = position or Pose()
+
+    def advance(self, pose: Pose) -> float:
+        """
+        :param pose: step being sent
+        :return: seconds to wait before the next step
+        """
+        duration = self.model.step_duration(self.position, pose)
+        self.position = self.position.updated(pose)
+        return duration
+
+    def estimate(self, poses: "list[Pose]") -> "list[float]":
+        """
+        Step durations for the sequence, doesn't change the position
+
+        :param poses:
+        :return: seconds per step
+        """
+        position = self.position
+        durations = []
+        for pose in poses:
+            durations.append(self.model.step_duration(position, pose))
+            position = position.updated(pose)
+        return durations
+
+
+@dataclass
+class SequenceTimingReport:
+    steps: int = 0
+    # seconds
+    estimated: float = 0.0
+    actual: float = 0.0
+
+    @property
+    def error(self) -> float:
+        return self.actual - self.estimated
+
+
+class SequenceTiming:
+    """
+    Estimated vs actual sequence time, pauses are not counted
+    """
+
+    def __init__(self) -> None:
+        self.report = SequenceTimingReport()
+        self.started_at: Optional[float] = None
+        self.paused_at: Optional[float] = None
+        self.paused_for = 0.0
+
+    def start(self) -> None:
+        self.report = SequenceTimingReport()
+        self.started_at = time.monotonic()
+        self.paused_at = None
+        self.paused_for = 0.0
+
+    def step(self, duration: float) -> None:
+        self.report.steps += 1
+        self.report.estimated += duration
+
+    def pause(self) -> None:
+        if self.paused_at is None:
+            self.paused_at = time.monotonic()
+
+    def resume(self) -> None:
+        if self.paused_at is not None:
+            self.paused_for += time.monotonic() - self.paused_at
+            self.paused_at = None
+
+    def finish(self) -> SequenceTimingReport:
+        if self.started_at is not None:
+            self.resume()
+            self.report.actual = time.monotonic() - self.started_at - self.paused_for
+            self.started_at = None
+        log.info(
+            "Sequence of %s steps took %.3fs, estimated %.3fs",
+            self.report.steps,
+            self.report.actual,
+            self.report.estimated,
+        )
+        return self.report
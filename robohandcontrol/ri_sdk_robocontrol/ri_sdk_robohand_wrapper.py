@@ -1,12 +1,18 @@
 import logging
 from ctypes import CDLL
 from dataclasses import dataclass
+from typing import Optional
 
 from ri_sdk import RoboIntellectSDK, contrib
 from ri_sdk.exceptions import MethodCallError
 
 import config
 from config import DEFAULT_PWM_ADDRESS, LEDPorts, ServoPorts
+from robohandcontrol.calibration import (
+    ServoCalibration,
+    ServoLookupTables,
+    load_calibrations,
+)
 from robohandcontrol.utils import map_range
 
 # Инициализируем глобальные переменные
@@ -27,6 +33,10 @@ ARROW_R_START_PULSE = 2000
 # (подъем: меньше - выше)
 ARROW_L_START_PULSE = 1000
 
+# границы скважности (в шагах) для модели mg90s
+SERVO_MIN_STEPS = 60
+SERVO_MAX_STEPS = 550
+
 
 log = logging.getLogger(__name__)
 
@@ -38,8 +48,22 @@ class ServoInfo:
     start_position_pulse: int
 
 
+def angle_to_steps(angle: int) -> int:
+    return map_range(
+        angle,
+        in_min=config.SERVO_MIN_ANGLE,
+        in_max=config.SERVO_MAX_ANGLE,
+        out_min=SERVO_MIN_STEPS,
+        out_max=SERVO_MAX_STEPS,
+    )
+
+
 class RoboHand:
-    def __init__(self, lib: CDLL) -> None:
+    def __init__(
+        self,
+        lib: CDLL,
+        calibrations: "Optional[dict[int, ServoCalibration]]" = None,
+    ) -> None:
         self.ri_sdk = RoboIntellectSDK(
             lib=lib,
             setup_methods_args=True,
@@ -74,6 +98,12 @@ class RoboHand:
             self.servo_raise,
         ]
 
+        # таблицы угол -> скважность, с учетом калибровки
+        self.lookup_tables = ServoLookupTables(
+            calibrations or load_calibrations(),
+            convert=angle_to_steps,
+        )
+
         self.pwm_descriptor = self.init_pwm()
         self.i2c_descriptor = self.init_i2c()
         self.led_descriptor = self.init_led()
@@ -260,18 +290,26 @@ class RoboHand:
         :return:
         """
         # от 55 до 554 шагов включительно.
-        steps = map_range(
-            angle,
-            in_min=config.SERVO_MIN_ANGLE,
-            in_max=config.SERVO_MAX_ANGLE,
-            out_min=60,
-            out_max=550,
-        )
         self.ri_sdk.exec_servo_drive_turn_by_duty_cycle(
             descriptor=servo.descriptor,
-            steps=steps,
+            steps=self.lookup_tables.lookup(servo.port, angle),
         )
 
+    def set_servos_angles(self, servos_angles: "list[tuple[ServoInfo, int]]") -> None:
+        """
+        Поворачивает несколько сервоприводов подряд, без промежуточных вызовов.
+
+        :param servos_angles: пары (сервопривод, угол)
+        :return:
+        """
+        turn_by_duty_cycle = self.ri_sdk.exec_servo_drive_turn_by_duty_cycle
+        lookup = self.lookup_tables.lookup
+        for servo, angle in servos_angles:
+            turn_by_duty_cycle(
+                descriptor=servo.descriptor,
+                steps=lookup(servo.port, angle),
+            )
+
     def destruct_servos(self) -> None:
         """
         Уничтожает сервоприводы
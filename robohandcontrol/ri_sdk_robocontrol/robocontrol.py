@@ -4,7 +4,7 @@ from robohandcontrol.ri_sdk_robocontrol.ri_sdk_robohand_wrapper import (
     RoboHand,
     ServoInfo,
 )
-from robohandcontrol.robocontrol import RobohandControlBase
+from robohandcontrol.robocontrol import Pose, RobohandControlBase
 
 
 class RobohandRISDKControl(RobohandControlBase):
@@ -18,6 +18,21 @@ class RobohandRISDKControl(RobohandControlBase):
             angle=angle,
         )
 
+    def set_pose(self, pose: Pose) -> None:
+        servos_angles = [
+            (servo, angle)
+            for servo, angle in (
+                (self.robohand.servo_rotate, pose.rotation),
+                (self.robohand.servo_raise, pose.raise_arrow),
+                (self.robohand.servo_pull, pose.extend_arrow),
+                (self.robohand.servo_claw, pose.claw),
+            )
+            if angle is not None
+        ]
+        self.robohand.set_servos_angles(servos_angles)
+        if pose.led is not None:
+            self.set_led_rgb(*pose.led)
+
     def control_claw(self, angle: int) -> None:
         self.set_servo_angle(self.robohand.servo_claw, angle)
 
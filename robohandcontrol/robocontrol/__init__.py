@@ -1,3 +1,8 @@
-__all__ = ("RobohandControlBase",)
+__all__ = (
+    "Pose",
+    "RobohandControlBase",
+    "parse_commands",
+)
 
 from .base import RobohandControlBase
+from .pose import Pose, parse_commands
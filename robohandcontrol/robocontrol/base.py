@@ -2,6 +2,8 @@ __all__ = ("RobohandControlBase",)
 
 from abc import ABC, abstractmethod
 
+from .pose import Pose
+
 
 class RobohandControlBase(ABC):
     @abstractmethod
@@ -23,3 +25,32 @@ class RobohandControlBase(ABC):
     @abstractmethod
     def set_led_rgb(self, red: int, green: int, blue: int) -> None:
         raise NotImplementedError
+
+    def pending_commands(self) -> int:
+        """
+        Commands accepted but not passed to the arm yet.
+        Live control waits while there are any, synchronous backends have none.
+
+        :return:
+        """
+        return 0
+
+    def set_pose(self, pose: Pose) -> None:
+        """
+        Set all joints and LED from the pose in one call.
+        Default implementation calls control methods one by one,
+        backends override it with a bulk implementation.
+
+        :param pose:
+        :return:
+        """
+        if pose.rotation is not None:
+            self.control_rotation(pose.rotation)
+        if pose.raise_arrow is not None:
+            self.control_raise_arrow(pose.raise_arrow)
+        if pose.extend_arrow is not None:
+            self.control_extend_arrow(pose.extend_arrow)
+        if pose.claw is not None:
+            self.control_claw(pose.claw)
+        if pose.led is not None:
+            self.set_led_rgb(*pose.led)
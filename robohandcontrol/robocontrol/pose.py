@@ -0,0 +1,127 @@
+__all__ = (
+    "Pose",
+    "parse_commands",
+)
+
+from dataclasses import dataclass, fields, replace
+from typing import TYPE_CHECKING, Any, Optional
+
+from config import COMMAND_ENDL, COMMAND_SPLITTER, ControlParam
+
+if TYPE_CHECKING:
+    FieldValue = Optional[int | tuple[int, int, int]]
+
+
+def parse_commands(
+    commands_text: str,
+    command_splitter: str = COMMAND_SPLITTER,
+    command_endl: str = COMMAND_ENDL,
+) -> "list[tuple[str, list[str]]]":
+    """
+    Split commands text like `rotation|-76;claw|84;` into prefixes and args
+
+    :param commands_text:
+    :param command_splitter:
+    :param command_endl:
+    :return: list of (prefix, args)
+    """
+    commands = []
+    for command in commands_text.split(command_endl):
+        if not command:
+            continue
+        prefix, *args = command.split(command_splitter)
+        commands.append((prefix, args))
+    return commands
+
+
+@dataclass
+class Pose:
+    """
+    Target angles for joints and LED color, None means "don't change".
+
+    Fields order is the order joints are set in.
+    """
+
+    rotation: Optional[int] = None
+    raise_arrow: Optional[int] = None
+    extend_arrow: Optional[int] = None
+    claw: Optional[int] = None
+    led: "Optional[tuple[int, int, int]]" = None
+
+    def __len__(self) -> int:
+        return sum(value is not None for _, value in self.all_fields())
+
+    def all_fields(self) -> "list[tuple[str, FieldValue]]":
+        return [(field.name, getattr(self, field.name)) for field in fields(self)]
+
+    def items(self) -> "list[tuple[str, tuple[int, ...]]]":
+        """
+        :return: (ControlParam, args) for every field set
+        """
+        items: "list[tuple[str, tuple[int, ...]]]" = []
+        for name, value in self.all_fields():
+            if value is None:
+                continue
+            args = value if isinstance(value, tuple) else (value,)
+            items.append((ControlParam(name), args))
+        return items
+
+    def set(self, param: str, *args: int) -> None:
+        """
+        :param param: `ControlParam` value
+        :param args: angle or red, green, blue
+        :return:
+        """
+        control_param = ControlParam(param)
+        if control_param is ControlParam.LED:
+            red, green, blue = args
+            self.led = (red, green, blue)
+            return
+        (angle,) = args
+        setattr(self, control_param.value, angle)
+
+    def updated(self, other: "Pose") -> "Pose":
+        """
+        :param other: newer pose
+        :return: new pose with fields set in `other` overridden
+        """
+        # values of different fields types, checked by the dataclass fields
+        changes: "dict[str, Any]" = {
+            name: value for name, value in other.all_fields() if value is not None
+        }
+        return replace(self, **changes)
+
+    def to_commands(
+        self,
+        command_splitter: str = COMMAND_SPLITTER,
+        command_endl: str = COMMAND_ENDL,
+    ) -> str:
+        return "".join(
+            command_splitter.join((param, *map(str, args))) + command_endl
+            for param, args in self.items()
+        )
+
+    @classmethod
+    def from_commands(
+        cls,
+        commands_text: str,
+        command_splitter: str = COMMAND_SPLITTER,
+        command_endl: str = COMMAND_ENDL,
+    ) -> "Pose":
+        """
+        Build pose from commands text like `rotation|-76;claw|84;`
+
+        :param commands_text:
+        :param command_splitter:
+        :param command_endl:
+        :return:
+        :raises ValueError: unknown command prefix or invalid args
+        """
+        pose = cls()
+        for prefix, args in parse_commands(
+            commands_text,
+            command_splitter=command_splitter,
+            command_endl=command_endl,
+        ):
+            pose.set(prefix, *map(int, args))
+        return pose
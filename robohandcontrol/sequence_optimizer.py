@@ -0,0 +1,183 @@
+"""
+Offline commands file optimizer: fewer steps, same resulting poses.
+
+- joints already at the commanded angle are removed from a step,
+  steps left empty are dropped
+- consecutive steps touching different joints are merged into one step
+- steps with barrier joints (claw by default: grasp has to happen
+  exactly between the moves around it) are never merged with neighbours
+
+Usage::
+
+    python -m robohandcontrol.sequence_optimizer commands.json [-o out.json]
+        [--barrier claw,led] [--no-barriers]
+"""
+
+import argparse
+import json
+import logging
+from dataclasses import dataclass
+from pathlib import Path
+from typing import TYPE_CHECKING, Optional
+
+import config
+from config import ControlParam
+from robohandcontrol.calibration import load_calibrations
+from robohandcontrol.motion_timing import MotionModel, MotionScheduler
+from robohandcontrol.robocontrol import Pose
+from robohandcontrol.timeline import COMMANDS_JSON_KEY, load_commands
+
+if TYPE_CHECKING:
+    from collections.abc import Collection
+
+log = logging.getLogger(__name__)
+
+DEFAULT_BARRIERS = frozenset((ControlParam.CLAW,))
+OPTIMIZED_SUFFIX = ".optimized.json"
+
+
+@dataclass
+class SequenceEstimate:
+    steps: int
+    # seconds with the fixed `COMMANDS_TIMEOUT`
+    fixed_duration: float
+    # seconds with motion timing
+    motion_duration: float
+
+
+def estimate(poses: "list[Pose]", model: MotionModel) -> SequenceEstimate:
+    """
+    :param poses: steps
+    :param model: same as playback uses, built from the servo calibrations
+    :return:
+    """
+    return SequenceEstimate(
+        steps=len(poses),
+        fixed_duration=len(poses) * config.COMMANDS_TIMEOUT / 1000,
+        motion_duration=sum(MotionScheduler(model).estimate(poses)),
+    )
+
+
+def params(pose: Pose) -> "set[str]":
+    return {param for param, _ in pose.items()}
+
+
+def drop_noops(poses: "list[Pose]") -> "list[Pose]":
+    """
+    :param poses: steps
+    :return: steps without joints which are already at the angle
+    """
+    state = Pose()
+    result = []
+    for pose in poses:
+        changed = Pose()
+        for param, args in pose.items():
+            value = args if param == ControlParam.LED else args[0]
+            if getattr(state, param) != value:
+                changed.set(param, *args)
+        state = state.updated(pose)
+        if changed:
+            result.append(changed)
+    return result
+
+
+def merge_disjoint(
+    poses: "list[Pose]",
+    barriers: "Collection[str]" = DEFAULT_BARRIERS,
+) -> "list[Pose]":
+    """
+    :param poses: steps
+    :param barriers: `ControlParam` values, steps with them are not merged
+    :return: steps with consecutive disjoint steps merged
+    """
+    result: "list[Pose]" = []
+    merged_params: "set[str]" = set()
+    for pose in poses:
+        pose_params = params(pose)
+        is_barrier = bool(pose_params.intersection(barriers))
+        previous: Optional[Pose] = result[-1] if result else None
+        if (
+            previous is not None
+            and not is_barrier
+            and not merged_params.intersection(barriers)
+            and not merged_params.intersection(pose_params)
+        ):
+            result[-1] = previous.updated(pose)
+            merged_params |= pose_params
+            continue
+        result.append(pose)
+        merged_params = pose_params
+    return result
+
+
+def optimize(
+    commands: "list[str]",
+    barriers: "Collection[str]" = DEFAULT_BARRIERS,
+) -> "list[str]":
+    """
+    :param commands: stored commands
+    :param barriers: `ControlParam` values of barrier joints
+    :return: optimized commands
+    :raises ValueError: invalid command
+    """
+    poses = [Pose.from_commands(commands_text) for commands_text in commands]
+    poses = merge_disjoint(drop_noops(poses), barriers)
+    return [pose.to_commands() for pose in poses]
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("source", type=Path, help="commands JSON file")
+    parser.add_argument(
+        "-o",
+        "--output",
+        type=Path,
+        help=f"optimized file, `<source>{OPTIMIZED_SUFFIX}` by default",
+    )
+    parser.add_argument(
+        "--barrier",
+        default=",".join(DEFAULT_BARRIERS),
+        help="comma separated joints whose steps are not merged",
+    )
+    parser.add_argument(
+        "--no-barriers",
+        action="store_true",
+        help="merge steps with any joints",
+    )
+    return parser.parse_args()
+
+
+def main() -> None:
+    logging.basicConfig(level=logging.INFO)
+    args = parse_args()
+    source: Path = args.source
+    output: Path = args.output or source.with_name(source.stem + OPTIMIZED_SUFFIX)
+    if output.resolve() == source.resolve():
+        msg = "Output file should differ from the source file"
+        raise SystemExit(msg)
+    barriers: "set[str]" = (
+        set()
+        if args.no_barriers
+        else {ControlParam(param.strip()) for param in args.barrier.split(",") if param}
+    )
+
+    commands = load_commands(source)
+    optimized = optimize(commands, barriers)
+    with output.open("w") as file:
+        json.dump({COMMANDS_JSON_KEY: optimized}, file, indent=2)
+
+    model = MotionModel.from_calibrations(load_calibrations())
+    for name, steps in (("before", commands), ("after", optimized)):
+        result = estimate([Pose.from_commands(text) for text in steps], model)
+        log.info(
+            "%s: %s steps, %.1fs with fixed timeout, %.1fs with motion timing",
+            name,
+            result.steps,
+            result.fixed_duration,
+            result.motion_duration,
+        )
+    log.info("Saved to %s", output)
+
+
+if __name__ == "__main__":
+    main()
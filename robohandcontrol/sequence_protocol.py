@@ -0,0 +1,81 @@
+"""
+Server-side sequences: commands to control playback and events sent back.
+
+Sequence is uploaded step by step, every step is a pose
+encoded to fit into one text frame::
+
+    sequence_clear;
+    sequence_add|rotation=-76,raise_arrow=-59,claw=84;
+    sequence_add|claw=-20,led=255.0.0;
+    sequence_start|1000;
+
+Server pushes events to clients which sent sequence commands::
+
+    sequence_progress|3|10;
+    sequence_timing|5420|5468;
+    sequence_state|finished;
+"""
+
+from enum import Enum
+
+from config import COMMAND_ENDL, COMMAND_SPLITTER
+from robohandcontrol.robocontrol import Pose
+
+STEP_ITEMS_SPLITTER = ","
+STEP_VALUE_SPLITTER = "="
+STEP_ARGS_SPLITTER = "."
+
+
+class SequenceCommand(str, Enum):
+    CLEAR = "sequence_clear"
+    # step
+    ADD = "sequence_add"
+    # optional interval, milliseconds
+    START = "sequence_start"
+    STOP = "sequence_stop"
+    PAUSE = "sequence_pause"
+    RESUME = "sequence_resume"
+    # step index
+    SEEK = "sequence_seek"
+
+
+class SequenceEvent(str, Enum):
+    # step index, steps count
+    PROGRESS = "sequence_progress"
+    # SequenceState
+    STATE = "sequence_state"
+    # estimated and actual sequence time in milliseconds, sent when finished
+    TIMING = "sequence_timing"
+
+
+class SequenceState(str, Enum):
+    STOPPED = "stopped"
+    RUNNING = "running"
+    PAUSED = "paused"
+    FINISHED = "finished"
+
+
+def encode_step(pose: Pose) -> str:
+    return STEP_ITEMS_SPLITTER.join(
+        STEP_VALUE_SPLITTER.join((param, STEP_ARGS_SPLITTER.join(map(str, args))))
+        for param, args in pose.items()
+    )
+
+
+def decode_step(step: str) -> Pose:
+    """
+    :param step: encoded step
+    :return:
+    :raises ValueError: invalid step
+    """
+    pose = Pose()
+    for item in step.split(STEP_ITEMS_SPLITTER):
+        if not item:
+            continue
+        param, args = item.split(STEP_VALUE_SPLITTER)
+        pose.set(param, *map(int, args.split(STEP_ARGS_SPLITTER)))
+    return pose
+
+
+def make_frame(prefix: str, *args: object) -> str:
+    return COMMAND_SPLITTER.join((prefix, *map(str, args))) + COMMAND_ENDL
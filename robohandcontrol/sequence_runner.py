@@ -0,0 +1,179 @@
+"""
+Headless sequence player: plays a commands file without the GUI and Qt,
+e.g. on the board next to the arm.
+
+Usage::
+
+    python main_runner.py commands.json [--loop [N]] [--speed 2] [--dry-run]
+        [--motion-timing] [--simulated-mode | --adafruit-servokit-mode | ...]
+
+Backend flags are the same as for `main.py` and `main_server.py`.
+A `.timeline` file (compiled or recorded) is played as is, a commands JSON
+is compiled to its timeline first (cached next to it).
+Every step is an absolute pose, the next one runs at the previous step time
+plus its duration on the monotonic clock, so delays don't accumulate.
+"""
+
+import argparse
+import logging
+import time
+from pathlib import Path
+from typing import TYPE_CHECKING, Optional
+
+from robohandcontrol.motion_timing import SequenceTiming
+from robohandcontrol.timeline import (
+    TIMELINE_SUFFIX,
+    Timeline,
+    compile_commands,
+    load_commands,
+    load_timeline,
+)
+
+if TYPE_CHECKING:
+    from robohandcontrol.robocontrol import Pose, RobohandControlBase
+
+log = logging.getLogger(__name__)
+
+# seconds before a step to stop sleeping and wait for it precisely
+SPIN_TIME = 0.002
+
+
+def wait_until(deadline: float) -> None:
+    """
+    :param deadline: monotonic time
+    :return:
+    """
+    delay = deadline - time.monotonic() - SPIN_TIME
+    if delay > 0:
+        time.sleep(delay)
+    while time.monotonic() < deadline:
+        pass
+
+
+def load_steps(
+    source: Path,
+    motion_timing: bool,
+    write_cache: bool = True,
+) -> "list[tuple[Pose, int]]":
+    """
+    :param source: commands JSON or timeline file
+    :param motion_timing: estimate durations of commands JSON steps
+    :param write_cache: save the compiled timeline next to the commands JSON,
+        otherwise it is compiled in memory
+    :return: absolute poses and durations in milliseconds
+    """
+    if source.suffix == TIMELINE_SUFFIX:
+        with Timeline(source) as timeline:
+            return list(timeline)
+    motion_scheduler = None
+    if motion_timing:
+        from robohandcontrol.calibration import load_calibrations
+        from robohandcontrol.motion_timing import MotionModel, MotionScheduler
+
+        motion_scheduler = MotionScheduler(
+            MotionModel.from_calibrations(load_calibrations()),
+        )
+    if not write_cache:
+        poses, durations = compile_commands(load_commands(source), motion_scheduler)
+        return list(zip(poses, durations))
+    with load_timeline(source, motion_scheduler) as timeline:
+        return list(timeline)
+
+
+def play(
+    steps: "list[tuple[Pose, int]]",
+    robohand: "Optional[RobohandControlBase]",
+    speed: float = 1.0,
+) -> None:
+    """
+    :param steps: absolute poses and durations in milliseconds
+    :param robohand: backend, None to only log the steps (dry run)
+    :param speed: durations are divided by it
+    :return:
+    """
+    if robohand is None:
+        offset = 0.0
+        for index, (pose, duration) in enumerate(steps):
+            log.info("Step %s at %.3fs: %s", index, offset, pose)
+            offset += duration / 1000 / speed
+        log.info("Sequence of %s steps takes %.3fs", len(steps), offset)
+        return
+    timing = SequenceTiming()
+    timing.start()
+    next_at = time.monotonic()
+    for pose, duration in steps:
+        wait_until(next_at)
+        robohand.set_pose(pose)
+        step_duration = duration / 1000 / speed
+        timing.step(step_duration)
+        next_at += step_duration
+    # the last step had its time to finish
+    wait_until(next_at)
+    timing.finish()
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("source", type=Path, help="commands JSON or timeline file")
+    parser.add_argument(
+        "--loop",
+        type=int,
+        nargs="?",
+        const=0,
+        default=1,
+        help="times to play, forever without a number",
+    )
+    parser.add_argument(
+        "--speed",
+        type=float,
+        default=1.0,
+        help="speed multiplier, step durations are divided by it",
+    )
+    parser.add_argument(
+        "--dry-run",
+        action="store_true",
+        help="log the steps and the total time, no backend is started, no files "
+        "are written",
+    )
+    parser.add_argument(
+        "--motion-timing",
+        action="store_true",
+        help="estimated move durations instead of `COMMANDS_TIMEOUT`",
+    )
+    # backend flags are read by `robohand_control()`
+    args, _ = parser.parse_known_args()
+    return args
+
+
+def main() -> None:
+    logging.basicConfig(level=logging.INFO)
+    args = parse_args()
+    if args.speed <= 0 or args.loop < 0:
+        msg = "Speed should be positive and loop count not negative"
+        raise SystemExit(msg)
+    steps = load_steps(args.source, args.motion_timing, write_cache=not args.dry_run)
+    if args.dry_run:
+        play(steps, None, args.speed)
+        return
+
+    from app.common.robohand_getter import backend_chain, robohand_control
+
+    robohand = robohand_control()
+    played = 0
+    try:
+        while args.loop == 0 or played < args.loop:
+            play(steps, robohand, args.speed)
+            played += 1
+    except KeyboardInterrupt:
+        log.info("Stopped after %s plays", played)
+    finally:
+        # from the outside in: streaming threads send their last setpoints
+        # before the socket client sends its queued commands
+        for backend in backend_chain(robohand):
+            close = getattr(backend, "close", None)
+            if close is not None:
+                close()
+
+
+if __name__ == "__main__":
+    main()
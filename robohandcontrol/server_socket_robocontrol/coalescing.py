@@ -0,0 +1,205 @@
+import threading
+from dataclasses import replace
+from typing import TYPE_CHECKING, Generic, Optional, TypeVar
+
+from robohandcontrol.robocontrol import Pose
+from robohandcontrol.server_socket_robocontrol.dispatch_worker import (
+    ActuatorDispatchWorker,
+)
+
+if TYPE_CHECKING:
+    from typing import Callable
+
+    from robohandcontrol.server_socket_robocontrol.dispatch_worker import (
+        DispatchItem,
+    )
+
+T = TypeVar("T")
+
+
+class CoalescingCommandBuffer(Generic[T]):
+    """
+    One pending slot per actuator, latest value wins.
+
+    A newer command for the same actuator replaces the pending one
+    and is moved to the end, so commands for different actuators
+    keep their relative order. Memory is bounded by the number of actuators.
+    """
+
+    def __init__(self) -> None:
+        self._pending: "dict[str, T]" = {}
+        # reentrant, can be held by the caller to make several changes atomic
+        self.condition = threading.Condition(threading.RLock())
+        self._closed = False
+        self.coalesced = 0
+
+    def __len__(self) -> int:
+        return len(self._pending)
+
+    def put(
+        self,
+        key: str,
+        item: T,
+        merge: "Optional[Callable[[T, T], T]]" = None,
+    ) -> bool:
+        """
+        :param key: actuator key, e.g. `ControlParam.CLAW`
+        :param item:
+        :param merge: combine pending and new item instead of replacing
+        :return: True if a pending item for this key was replaced
+        """
+        with self.condition:
+            pending = self._pending.pop(key, None)
+            replaced = pending is not None
+            if pending is not None and merge is not None:
+                item = merge(pending, item)
+            self._pending[key] = item
+            self.coalesced += replaced
+            self.condition.notify()
+        return replaced
+
+    def discard(self, key: str) -> bool:
+        """
+        :param key:
+        :return: True if a pending item was removed
+        """
+        with self.condition:
+            return self._pending.pop(key, None) is not None
+
+    def pending_items(self) -> "list[tuple[str, T]]":
+        with self.condition:
+            return list(self._pending.items())
+
+    def replace_pending(self, key: str, item: T) -> None:
+        """
+        Replace a pending item keeping its position
+        """
+        with self.condition:
+            if key in self._pending:
+                self._pending[key] = item
+
+    def get(self, timeout: Optional[float] = None) -> Optional[T]:
+        """
+        Wait for the oldest pending item.
+
+        :param timeout: seconds to wait
+        :return: None if closed and drained or on timeout
+        """
+        with self.condition:
+            if not self.condition.wait_for(
+                lambda: self._pending or self._closed,
+                timeout,
+            ):
+                return None
+            if not self._pending:
+                return None
+            key = next(iter(self._pending))
+            return self._pending.pop(key)
+
+    def close(self) -> None:
+        """
+        Wake up waiting `get`, pending items are still returned
+        """
+        with self.condition:
+            self._closed = True
+            self.condition.notify_all()
+
+    def reopen(self) -> None:
+        with self.condition:
+            self._closed = False
+
+
+class CoalescingDispatchWorker(ActuatorDispatchWorker):
+    """
+    Dispatch worker which sends only the newest pending command per actuator.
+
+    While the backend is busy, intermediate absolute positions
+    (e.g. from a dragged slider) are overwritten instead of replayed.
+    """
+
+    def __init__(self, name: str = "robohand-coalescing-dispatch") -> None:
+        super().__init__(name=name)
+        self.buffer: "CoalescingCommandBuffer[DispatchItem]" = CoalescingCommandBuffer()
+
+    def start(self) -> None:
+        self.buffer.reopen()
+        super().start()
+
+    @staticmethod
+    def get_pose(item: "DispatchItem") -> Optional[Pose]:
+        _, args, _ = item
+        if len(args) == 1 and isinstance(args[0], Pose):
+            return args[0]
+        return None
+
+    def merge_items(
+        self,
+        pending: "DispatchItem",
+        item: "DispatchItem",
+    ) -> "DispatchItem":
+        """
+        Poses may set different joints, so pending pose is updated, not replaced
+        """
+        pending_pose = self.get_pose(pending)
+        pose = self.get_pose(item)
+        if pending_pose is None or pose is None:
+            return item
+        method, _, _ = item
+        _, _, submitted_at = pending
+        return method, (pending_pose.updated(pose),), submitted_at
+
+    def discard_overridden(self, item: "DispatchItem", key: str) -> int:
+        """
+        Keep one pending value per actuator:
+        a new pose overrides pending single joint commands,
+        a new single joint command overrides the joint in pending poses.
+
+        :param item: new item
+        :param key: new item key
+        :return: number of discarded pending values
+        """
+        discarded = 0
+        pose = self.get_pose(item)
+        if pose is not None:
+            for param, _ in pose.items():
+                discarded += self.buffer.discard(param)
+            return discarded
+
+        for pending_key, pending in self.buffer.pending_items():
+            pending_pose = self.get_pose(pending)
+            if pending_pose is None or getattr(pending_pose, key, None) is None:
+                continue
+            discarded += 1
+            pending_pose = replace(pending_pose, **{key: None})
+            if not pending_pose:
+                self.buffer.discard(pending_key)
+                continue
+            method, _, submitted_at = pending
+            self.buffer.replace_pending(
+                pending_key,
+                (method, (pending_pose,), submitted_at),
+            )
+        return discarded
+
+    def put(
+        self,
+        item: "DispatchItem",
+        key: str,
+        block: bool,  # noqa: ARG002
+        timeout: Optional[float],  # noqa: ARG002
+    ) -> None:
+        with self.buffer.condition:
+            coalesced = self.discard_overridden(item, key)
+            coalesced += self.buffer.put(key, item, merge=self.merge_items)
+        if coalesced:
+            with self._stats_lock:
+                self._stats.coalesced += coalesced
+
+    def get(self) -> "Optional[DispatchItem]":
+        return self.buffer.get()
+
+    def put_stop_signal(self) -> None:
+        self.buffer.close()
+
+    def queue_depth(self) -> int:
+        return len(self.buffer)
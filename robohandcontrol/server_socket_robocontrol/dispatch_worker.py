@@ -0,0 +1,213 @@
+import logging
+import queue
+import threading
+import time
+from dataclasses import dataclass, replace
+from typing import TYPE_CHECKING, Optional
+
+if TYPE_CHECKING:
+    from typing import Callable
+
+    DispatchItem = tuple[Callable[..., None], tuple[object, ...], float]
+
+log = logging.getLogger(__name__)
+
+DEFAULT_QUEUE_SIZE = 256
+
+
+@dataclass
+class DispatchStats:
+    # commands accepted into the queue
+    submitted: int = 0
+    # commands rejected because the queue was full
+    dropped: int = 0
+    # pending commands overwritten by a newer one for the same actuator
+    coalesced: int = 0
+    # commands executed on the backend (including failed ones)
+    dispatched: int = 0
+    failed: int = 0
+    queue_depth: int = 0
+    max_queue_depth: int = 0
+    # seconds spent waiting in the queue
+    total_wait_time: float = 0.0
+    max_wait_time: float = 0.0
+    # seconds spent in backend calls
+    total_dispatch_time: float = 0.0
+    max_dispatch_time: float = 0.0
+
+    @property
+    def avg_dispatch_time(self) -> float:
+        if not self.dispatched:
+            return 0.0
+        return self.total_dispatch_time / self.dispatched
+
+    @property
+    def avg_wait_time(self) -> float:
+        if not self.dispatched:
+            return 0.0
+        return self.total_wait_time / self.dispatched
+
+
+class ActuatorDispatchWorker:
+    """
+    Runs backend (`RobohandControlBase`) calls on a dedicated thread.
+
+    Network handlers only parse and `submit` commands into a bounded queue,
+    so a slow I2C transaction or ctypes call doesn't delay reading next frames.
+    Commands are executed in the order submitted.
+    """
+
+    def __init__(
+        self,
+        queue_size: int = DEFAULT_QUEUE_SIZE,
+        name: str = "robohand-dispatch",
+    ) -> None:
+        self.queue: "queue.Queue[Optional[DispatchItem]]" = queue.Queue(
+            maxsize=queue_size,
+        )
+        self.name = name
+        self._stats = DispatchStats()
+        self._stats_lock = threading.Lock()
+        self._thread: Optional[threading.Thread] = None
+        # called on the worker thread with method name and call duration
+        self.dispatch_observer: "Optional[Callable[[str, float], None]]" = None
+
+    def __enter__(self) -> "ActuatorDispatchWorker":
+        self.start()
+        return self
+
+    def __exit__(self, *exc_info: object) -> None:
+        self.stop()
+
+    @property
+    def is_running(self) -> bool:
+        return self._thread is not None and self._thread.is_alive()
+
+    def start(self) -> None:
+        if self.is_running:
+            return
+        self._thread = threading.Thread(target=self.run, name=self.name, daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout: Optional[float] = None) -> None:
+        """
+        Execute already submitted commands and stop the thread.
+
+        :param timeout: seconds to wait for the thread to finish
+        :return:
+        """
+        if not self.is_running:
+            return
+        self.put_stop_signal()
+        if self._thread is not None:
+            self._thread.join(timeout)
+        self._thread = None
+
+    def put(
+        self,
+        item: "DispatchItem",
+        key: str,  # noqa: ARG002
+        block: bool,
+        timeout: Optional[float],
+    ) -> None:
+        """
+        Put item to the queue, raises `queue.Full` if there's no free slot
+
+        :param item:
+        :param key: actuator key, not used by the plain FIFO queue
+        :param block:
+        :param timeout:
+        :return:
+        """
+        self.queue.put(item, block, timeout)
+
+    def get(self) -> "Optional[DispatchItem]":
+        """
+        Wait for the next item, None means stop
+
+        :return:
+        """
+        return self.queue.get()
+
+    def put_stop_signal(self) -> None:
+        self.queue.put(None)
+
+    def queue_depth(self) -> int:
+        return self.queue.qsize()
+
+    def submit(
+        self,
+        method: "Callable[..., None]",
+        *args: object,
+        key: Optional[str] = None,
+        block: bool = False,
+        timeout: Optional[float] = None,
+    ) -> bool:
+        """
+        Queue a backend call.
+
+        :param method: backend method, e.g. `robohand.control_claw`
+        :param args: method args
+        :param key: actuator key (`ControlParam`), method name by default
+        :param block: wait for a free slot if the queue is full
+        :param timeout: seconds to wait for a free slot if blocking
+        :return: False if the command was dropped because the queue is full
+        """
+        item = (method, args, time.perf_counter())
+        try:
+            self.put(item, key or method.__name__, block, timeout)
+        except queue.Full:
+            with self._stats_lock:
+                self._stats.dropped += 1
+            log.warning("Dispatch queue is full, drop %s%s", method.__name__, args)
+            return False
+
+        depth = self.queue_depth()
+        with self._stats_lock:
+            self._stats.submitted += 1
+            self._stats.max_queue_depth = max(self._stats.max_queue_depth, depth)
+        return True
+
+    def stats(self) -> DispatchStats:
+        """
+        :return: counters snapshot
+        """
+        with self._stats_lock:
+            return replace(self._stats, queue_depth=self.queue_depth())
+
+    def reset_stats(self) -> None:
+        with self._stats_lock:
+            self._stats = DispatchStats()
+
+    def dispatch(self, item: "DispatchItem") -> None:
+        method, args, submitted_at = item
+        started_at = time.perf_counter()
+        failed = False
+        try:
+            method(*args)
+        except Exception:
+            failed = True
+            log.exception("Error dispatching %s%s", method.__name__, args)
+        finished_at = time.perf_counter()
+
+        wait_time = started_at - submitted_at
+        dispatch_time = finished_at - started_at
+        if self.dispatch_observer is not None:
+            self.dispatch_observer(method.__name__, dispatch_time)
+        with self._stats_lock:
+            stats = self._stats
+            stats.dispatched += 1
+            stats.failed += failed
+            stats.total_wait_time += wait_time
+            stats.max_wait_time = max(stats.max_wait_time, wait_time)
+            stats.total_dispatch_time += dispatch_time
+            stats.max_dispatch_time = max(stats.max_dispatch_time, dispatch_time)
+
+    def run(self) -> None:
+        log.info("Start dispatch worker %s", self.name)
+        while True:
+            item = self.get()
+            if item is None:
+                break
+            self.dispatch(item)
+        log.info("Dispatch worker %s stopped", self.name)
@@ -0,0 +1,141 @@
+import logging
+from typing import TYPE_CHECKING, Optional
+
+from config import COMMAND_ENDL
+from robohandcontrol.binary_protocol import BinaryRecordBuffer
+
+if TYPE_CHECKING:
+    from typing import Callable
+
+    from robohandcontrol.binary_protocol import Record
+
+log = logging.getLogger(__name__)
+
+DEFAULT_RECV_BUFFER_SIZE = 1024
+MAX_FRAME_SIZE = 64 * 1024
+
+
+class CommandFrameBuffer:
+    """
+    Incremental `COMMAND_ENDL`-delimited frame buffer for one connection.
+
+    Data is received directly into a preallocated buffer (`recv_into`),
+    only complete frames are decoded, an incomplete tail is moved
+    to the buffer start and waits for the next read.
+    """
+
+    def __init__(
+        self,
+        size: int = DEFAULT_RECV_BUFFER_SIZE,
+        max_frame_size: int = MAX_FRAME_SIZE,
+        command_endl: str = COMMAND_ENDL,
+    ) -> None:
+        self.buffer = bytearray(size)
+        self.view = memoryview(self.buffer)
+        self.filled = 0
+        self.max_frame_size = max_frame_size
+        self.endl = command_endl.encode("utf-8")
+
+    def writable(self) -> memoryview:
+        """
+        Free tail of the buffer to receive data into.
+        Grows the buffer if there is no free space left.
+
+        :return:
+        """
+        if self.filled == len(self.buffer):
+            self.grow()
+        return self.view[self.filled :]
+
+    def grow(self) -> None:
+        new_size = len(self.buffer) * 2
+        if new_size > self.max_frame_size:
+            log.warning(
+                "Frame exceeds %s bytes without %r, drop %s buffered bytes",
+                self.max_frame_size,
+                self.endl,
+                self.filled,
+            )
+            self.filled = 0
+            return
+        buffer = bytearray(new_size)
+        buffer[: self.filled] = self.view[: self.filled]
+        self.buffer = buffer
+        self.view = memoryview(buffer)
+
+    def commit(self, nbytes: int) -> "list[str]":
+        """
+        Mark `nbytes` received into `writable()` and extract complete frames.
+
+        :param nbytes: number of bytes received
+        :return: complete frames without `COMMAND_ENDL`
+        """
+        # delimiter may start in the previously received tail
+        scan_from = max(self.filled - len(self.endl) + 1, 0)
+        self.filled += nbytes
+        frames: "list[str]" = []
+        start = 0
+        end = self.buffer.find(self.endl, scan_from, self.filled)
+        while end != -1:
+            if end > start:
+                frames.append(str(self.view[start:end], "utf-8", "replace"))
+            start = end + len(self.endl)
+            end = self.buffer.find(self.endl, start, self.filled)
+
+        if start:
+            rest = self.filled - start
+            self.buffer[:rest] = self.view[start : self.filled]
+            self.filled = rest
+        return frames
+
+    def pending(self) -> bytes:
+        """
+        :return: received bytes which are not a complete frame yet
+        """
+        return bytes(self.view[: self.filled])
+
+    def feed(self, data: bytes) -> "list[str]":
+        """
+        Copy received data into the buffer and extract complete frames.
+
+        :param data:
+        :return: complete frames without `COMMAND_ENDL`
+        """
+        frames: "list[str]" = []
+        offset = 0
+        while offset < len(data):
+            target = self.writable()
+            size = min(len(target), len(data) - offset)
+            target[:size] = data[offset : offset + size]
+            frames.extend(self.commit(size))
+            offset += size
+        return frames
+
+
+class ClientConnection:
+    """
+    Receive state of one client connection:
+    text frames until the binary protocol is negotiated, binary records after
+    """
+
+    def __init__(self, send: "Optional[Callable[[bytes], None]]" = None) -> None:
+        """
+        :param send: sends data to the client, may be called from any thread
+        """
+        self.text = CommandFrameBuffer()
+        self.binary: Optional[BinaryRecordBuffer] = None
+        self.send = send
+
+    def writable(self) -> memoryview:
+        if self.binary is not None:
+            return self.binary.writable()
+        return self.text.writable()
+
+    def switch_to_binary(self) -> "list[Record]":
+        """
+        :return: records from data already received after the hello frame
+        """
+        self.binary = BinaryRecordBuffer()
+        # client doesn't send binary data before the reply,
+        # but keep anything already received just in case
+        return self.binary.feed(self.text.pending())
@@ -0,0 +1,255 @@
+"""
+Server counters exposed in Prometheus text format (`--metrics`).
+
+Every counter has a single writer: commands are counted on the thread
+which parses them (select loop, asyncio loop or its executor), backend calls
+are timed under the backend lock or on the dispatch worker thread.
+So counters are plain ints without locks, scrapes read them as is.
+"""
+
+import bisect
+import logging
+import socket
+import socketserver
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from typing import TYPE_CHECKING, Optional
+
+import config
+from config import ControlParam
+
+if TYPE_CHECKING:
+    from typing import Callable
+
+    from robohandcontrol.server_socket_robocontrol.dispatch_worker import (
+        ActuatorDispatchWorker,
+    )
+
+log = logging.getLogger(__name__)
+
+METRICS_PATH = "/metrics"
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+# backend call duration histogram buckets, seconds
+BACKEND_BUCKETS = (0.0001, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.5)
+
+
+class Histogram:
+    def __init__(self, buckets: "tuple[float, ...]" = BACKEND_BUCKETS) -> None:
+        self.buckets = buckets
+        # per bucket, not cumulative, the last one is +Inf
+        self.counts = [0] * (len(buckets) + 1)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value: float) -> None:
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+    def render(self, name: str, labels: str) -> "list[str]":
+        lines = []
+        cumulative = 0
+        bounds = [*map(str, self.buckets), "+Inf"]
+        for bound, count in zip(bounds, self.counts):
+            cumulative += count
+            lines.append(f'{name}_bucket{{{labels},le="{bound}"}} {cumulative}')
+        lines.append(f"{name}_sum{{{labels}}} {self.sum}")
+        lines.append(f"{name}_count{{{labels}}} {self.count}")
+        return lines
+
+
+class ServerMetrics:
+    def __init__(self) -> None:
+        # by `ControlParam`, binary pose records are counted as `pose`
+        self.commands = {param.value: 0 for param in ControlParam}
+        self.sequence_commands = 0
+        self.parse_errors = 0
+        self.unknown_commands = 0
+        self.connections = 0
+        self.disconnections = 0
+        self.backend_calls: "dict[str, Histogram]" = {}
+        self.dispatch_worker: "Optional[ActuatorDispatchWorker]" = None
+
+    def command(self, param: str) -> None:
+        self.commands[param] = self.commands.get(param, 0) + 1
+
+    def observe_backend(self, method: str, seconds: float) -> None:
+        histogram = self.backend_calls.get(method)
+        if histogram is None:
+            histogram = self.backend_calls[method] = Histogram()
+        histogram.observe(seconds)
+
+    def render(self) -> str:
+        """
+        :return: Prometheus text exposition
+        """
+        lines: "list[str]" = []
+
+        def metric(name: str, kind: str, help_text: str) -> None:
+            lines.append(f"# HELP {name} {help_text}")
+            lines.append(f"# TYPE {name} {kind}")
+
+        metric(
+            "robohand_commands_total",
+            "counter",
+            "Control commands received, by parameter",
+        )
+        lines.extend(
+            f'robohand_commands_total{{param="{param}"}} {count}'
+            for param, count in self.commands.items()
+        )
+        for name, help_text, value in (
+            (
+                "robohand_sequence_commands_total",
+                "Sequence commands received",
+                self.sequence_commands,
+            ),
+            (
+                "robohand_parse_errors_total",
+                "Commands with invalid arguments",
+                self.parse_errors,
+            ),
+            (
+                "robohand_unknown_commands_total",
+                "Commands with unknown prefix or opcode",
+                self.unknown_commands,
+            ),
+            ("robohand_connections_total", "Accepted connections", self.connections),
+        ):
+            metric(name, "counter", help_text)
+            lines.append(f"{name} {value}")
+        metric("robohand_clients_connected", "gauge", "Connected clients")
+        connected = self.connections - self.disconnections
+        lines.append(f"robohand_clients_connected {connected}")
+
+        metric(
+            "robohand_backend_call_seconds",
+            "histogram",
+            "Backend call duration, by method",
+        )
+        for method, histogram in list(self.backend_calls.items()):
+            lines.extend(
+                histogram.render("robohand_backend_call_seconds", f'method="{method}"'),
+            )
+
+        if self.dispatch_worker is not None:
+            self.render_dispatch(self.dispatch_worker, metric, lines)
+        return "\n".join(lines) + "\n"
+
+    @staticmethod
+    def render_dispatch(
+        dispatch_worker: "ActuatorDispatchWorker",
+        metric: "Callable[[str, str, str], None]",
+        lines: "list[str]",
+    ) -> None:
+        stats = dispatch_worker.stats()
+        for name, kind, help_text, value in (
+            (
+                "robohand_dispatch_submitted_total",
+                "counter",
+                "Commands queued for the backend",
+                stats.submitted,
+            ),
+            (
+                "robohand_dispatch_dropped_total",
+                "counter",
+                "Commands dropped because the queue was full",
+                stats.dropped,
+            ),
+            (
+                "robohand_dispatch_coalesced_total",
+                "counter",
+                "Pending commands overwritten by a newer one",
+                stats.coalesced,
+            ),
+            (
+                "robohand_dispatch_failed_total",
+                "counter",
+                "Backend calls which raised",
+                stats.failed,
+            ),
+            (
+                "robohand_dispatch_queue_depth",
+                "gauge",
+                "Commands waiting for the backend",
+                stats.queue_depth,
+            ),
+            (
+                "robohand_dispatch_max_queue_depth",
+                "gauge",
+                "Largest queue depth seen",
+                stats.max_queue_depth,
+            ),
+            (
+                "robohand_dispatch_wait_seconds_total",
+                "counter",
+                "Time commands spent in the queue",
+                stats.total_wait_time,
+            ),
+        ):
+            metric(name, kind, help_text)
+            lines.append(f"{name} {value}")
+
+
+class MetricsRequestHandler(BaseHTTPRequestHandler):
+    metrics: ServerMetrics
+
+    def do_GET(self) -> None:
+        if self.path != METRICS_PATH:
+            self.send_error(404)
+            return
+        body = self.metrics.render().encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", CONTENT_TYPE)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format: str, *args: object) -> None:  # noqa: A002
+        log.debug(format, *args)
+
+
+class UnixHTTPServer(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    daemon_threads = True
+
+    def get_request(self) -> "tuple[socket.socket, tuple[str, int]]":
+        request, _ = super().get_request()
+        # `BaseHTTPRequestHandler` expects a host, port address
+        return request, ("local", 0)
+
+
+def start_metrics_server(
+    metrics: ServerMetrics,
+    host: str = config.METRICS_HOST,
+    port: int = config.METRICS_PORT,
+    unix_socket: str = config.METRICS_UNIX_SOCKET,
+) -> socketserver.BaseServer:
+    """
+    Serve `/metrics` on a daemon thread
+
+    :param metrics:
+    :param host: HTTP host, local only by default
+    :param port: HTTP port
+    :param unix_socket: path, used instead of the port if set
+    :return: server, `shutdown()` to stop
+    """
+    handler = type(
+        "BoundMetricsRequestHandler",
+        (MetricsRequestHandler,),
+        {"metrics": metrics},
+    )
+    server: socketserver.BaseServer
+    if unix_socket:
+        Path(unix_socket).unlink(missing_ok=True)
+        server = UnixHTTPServer(unix_socket, handler)
+        log.info("Serving metrics on unix socket %s", unix_socket)
+    else:
+        server = ThreadingHTTPServer((host, port), handler)
+        log.info("Serving metrics on http://%s:%s%s", host, port, METRICS_PATH)
+    threading.Thread(
+        target=server.serve_forever,
+        name="robohand-metrics",
+        daemon=True,
+    ).start()
+    return server
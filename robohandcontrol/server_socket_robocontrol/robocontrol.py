@@ -1,7 +1,12 @@
+import asyncio
 import logging
+import queue
 import select
 import socket
-from typing import TYPE_CHECKING
+import threading
+import time
+from concurrent.futures import Executor, ThreadPoolExecutor
+from typing import TYPE_CHECKING, Optional
 
 from config import (
     COMMAND_ENDL,
@@ -10,16 +15,38 @@ from config import (
     SERVER_PORT,
     ControlParam,
 )
-from robohandcontrol.robocontrol import RobohandControlBase
+from robohandcontrol import tracing
+from robohandcontrol.binary_protocol import (
+    BINARY_PROTOCOL_HELLO,
+    BINARY_PROTOCOL_HELLO_FRAME,
+    OP_POSE,
+    OP_TEXT,
+    PARAM_TO_OPCODE,
+    decode_pose,
+)
+from robohandcontrol.robocontrol import Pose, RobohandControlBase
+from robohandcontrol.sequence_protocol import SequenceCommand, decode_step, make_frame
+from robohandcontrol.server_socket_robocontrol.framing import ClientConnection
+from robohandcontrol.server_socket_robocontrol.sequence_engine import SequenceEngine
 
 if TYPE_CHECKING:
     from typing import Callable
 
-    # set angle or set rgb
-    MethodType = Callable[[int], None] | Callable[[int, int, int], None]
+    from robohandcontrol.binary_protocol import Record
+    from robohandcontrol.motion_timing import MotionScheduler
+    from robohandcontrol.server_socket_robocontrol.dispatch_worker import (
+        ActuatorDispatchWorker,
+    )
+    from robohandcontrol.server_socket_robocontrol.metrics import ServerMetrics
+
+    # set angle, set rgb or set pose from a binary record
+    MethodType = Callable[..., None]
 
 log = logging.getLogger(__name__)
 
+# dispatch key for poses, single joint commands use `ControlParam`
+POSE_KEY = "pose"
+
 
 class RobohandControlServerSocket(RobohandControlBase):
     def __init__(
@@ -28,8 +55,17 @@ class RobohandControlServerSocket(RobohandControlBase):
         server_host: str = SERVER_IP_BIND,
         server_port: int = SERVER_PORT,
         command_splitter: str = COMMAND_SPLITTER,
+        dispatch_worker: "Optional[ActuatorDispatchWorker]" = None,
+        motion_scheduler: "Optional[MotionScheduler]" = None,
+        metrics: "Optional[ServerMetrics]" = None,
     ) -> None:
         self.robohand = robohand
+        # if set, backend calls are executed on the worker thread
+        self.dispatch_worker = dispatch_worker
+        self.metrics = metrics
+        if metrics is not None and dispatch_worker is not None:
+            metrics.dispatch_worker = dispatch_worker
+            dispatch_worker.dispatch_observer = metrics.observe_backend
         self.server_host = server_host
         self.server_port = server_port
         self.command_splitter = command_splitter
@@ -41,60 +77,361 @@ class RobohandControlServerSocket(RobohandControlBase):
             ControlParam.ROTATION: self.control_rotation,
             ControlParam.LED: self.set_led_rgb,
         }
+        self.binary_methods: "dict[int, MethodType]" = {
+            PARAM_TO_OPCODE[param]: method for param, method in self.methods.items()
+        }
+        self.binary_methods[OP_POSE] = self.set_pose_from_record
+        # metrics label by opcode
+        self.binary_params = {
+            opcode: ControlParam(param).value
+            for param, opcode in PARAM_TO_OPCODE.items()
+        }
+        self.binary_params[OP_POSE] = POSE_KEY
+        self.sequence_methods: "dict[str, MethodType]" = {
+            SequenceCommand.CLEAR: self.sequence_clear,
+            SequenceCommand.ADD: self.sequence_add,
+            SequenceCommand.START: self.sequence_start,
+            SequenceCommand.STOP: self.sequence_stop,
+            SequenceCommand.PAUSE: self.sequence_pause,
+            SequenceCommand.RESUME: self.sequence_resume,
+            SequenceCommand.SEEK: self.sequence_seek,
+        }
+        # serializes direct backend calls, the sequence engine has its own thread
+        self._robohand_lock = threading.Lock()
+        self.sequence = SequenceEngine(
+            self,
+            listener=self.broadcast_event,
+            motion_scheduler=motion_scheduler,
+        )
+        # connections which sent sequence commands get sequence events
+        self.subscribers: "set[ClientConnection]" = set()
+        self._subscribers_lock = threading.Lock()
 
     def control_claw(self, angle: int) -> None:
         log.info("Set claw angle to %s", angle)
-        self.robohand.control_claw(angle)
+        self.call_robohand(ControlParam.CLAW, self.robohand.control_claw, angle)
 
     def control_extend_arrow(self, angle: int) -> None:
         log.info("Extend tower to angle %s", angle)
-        self.robohand.control_extend_arrow(angle)
+        self.call_robohand(
+            ControlParam.EXTEND_ARROW,
+            self.robohand.control_extend_arrow,
+            angle,
+        )
 
     def control_raise_arrow(self, angle: int) -> None:
         log.info("Raise tower to angle %s", angle)
-        self.robohand.control_raise_arrow(angle)
+        self.call_robohand(
+            ControlParam.RAISE_ARROW,
+            self.robohand.control_raise_arrow,
+            angle,
+        )
 
     def control_rotation(self, angle: int) -> None:
         log.info("Rotate base to angle %s", angle)
-        self.robohand.control_rotation(angle)
+        self.call_robohand(ControlParam.ROTATION, self.robohand.control_rotation, angle)
 
     def set_led_rgb(self, red: int, green: int, blue: int) -> None:
         log.info("Set led rgb to %s, %s, %s", red, green, blue)
-        self.robohand.set_led_rgb(red, green, blue)
+        self.call_robohand(ControlParam.LED, self.robohand.set_led_rgb, red, green, blue)
 
-    def handle_command(self, command: str) -> None:
-        commands = command.split(COMMAND_ENDL)
-        for cmd in commands:
-            if not cmd:
-                continue
+    def set_pose(self, pose: Pose) -> None:
+        log.info("Set pose %s", pose)
+        self.call_robohand(POSE_KEY, self.robohand.set_pose, pose)
+
+    def set_pose_from_record(self, *args: int) -> None:
+        self.set_pose(decode_pose(args))
+
+    def sequence_clear(self) -> None:
+        self.sequence.clear()
+
+    def sequence_add(self, step: str) -> None:
+        self.sequence.add_step(decode_step(step))
+
+    def sequence_start(self, interval: str = "") -> None:
+        """
+        :param interval: milliseconds between steps, previous one if empty
+        :return:
+        """
+        self.sequence.start(int(interval) / 1000 if interval else None)
+
+    def sequence_stop(self) -> None:
+        self.sequence.stop()
+
+    def sequence_pause(self) -> None:
+        self.sequence.pause()
+
+    def sequence_resume(self) -> None:
+        self.sequence.resume()
+
+    def sequence_seek(self, index: str) -> None:
+        self.sequence.seek(int(index))
+
+    def subscribe(self, connection: ClientConnection) -> None:
+        if connection.send is None:
+            return
+        with self._subscribers_lock:
+            self.subscribers.add(connection)
+
+    def unsubscribe(self, connection: ClientConnection) -> None:
+        with self._subscribers_lock:
+            self.subscribers.discard(connection)
+
+    def broadcast_event(self, event: str, args: "tuple[object, ...]") -> None:
+        """
+        Send sequence event to subscribed clients as a text frame
+
+        :param event: `SequenceEvent`
+        :param args:
+        :return:
+        """
+        frame = make_frame(event, *args).encode("utf-8")
+        with self._subscribers_lock:
+            subscribers = list(self.subscribers)
+        for connection in subscribers:
+            try:
+                connection.send(frame)  # type: ignore[misc]
+            except OSError as e:
+                log.warning("Could not send sequence event to client: %s", e)
+                self.unsubscribe(connection)
+
+    def call_robohand(
+        self,
+        key: str,
+        method: "Callable[..., None]",
+        *args: "int | Pose",
+    ) -> None:
+        """
+        Call backend method directly or via the dispatch worker
+
+        :param key: actuator key, used for coalescing
+        :param method: backend method
+        :param args:
+        :return:
+        """
+        if tracing.tracer is not None:
+            method = self.traced(tracing.tracer, method)
+        if self.dispatch_worker is None:
+            with self._robohand_lock:
+                started_at = time.perf_counter()
+                try:
+                    method(*args)
+                except Exception:
+                    # a bad command or a bus error must not stop the server
+                    log.exception("Error calling %s%s", method.__name__, args)
+                if self.metrics is not None:
+                    self.metrics.observe_backend(
+                        method.__name__,
+                        time.perf_counter() - started_at,
+                    )
+            return
+        self.dispatch_worker.submit(method, *args, key=key)
+
+    @staticmethod
+    def traced(
+        tracer: tracing.Tracer,
+        method: "Callable[..., None]",
+    ) -> "Callable[..., None]":
+        """
+        :param tracer:
+        :param method: backend method
+        :return: method recording its trace spans
+        """
+        trace_id = tracing.current_trace.get()
+        if trace_id is None:
+            # untraced client or sequence engine step
+            trace_id = tracer.new_id()
+        received_at = tracing.received_at.get()
+        if received_at is not None:
+            tracer.complete("server_parse", trace_id, received_at)
+        return tracing.traced_call(tracer, trace_id, method)
+
+    def handle_frames(
+        self,
+        frames: "list[str]",
+        command: str = "",
+        connection: Optional[ClientConnection] = None,
+    ) -> None:
+        """
+        Execute command frames, e.g. `["claw|60", "rotation|1"]`, in order.
+        Consecutive commands for different joints are sent to the backend
+        as one pose, a repeated joint, a trace or a sequence frame sends
+        the commands collected before it first.
+
+        :param frames: commands without `COMMAND_ENDL`
+        :param command: full received command, for logging
+        :param connection: sender, subscribed to events if it controls sequence
+        :return:
+        """
+        pose = Pose()
+        for cmd in frames:
             prefix, *args = cmd.split(self.command_splitter)
+            if prefix == tracing.TRACE_PREFIX:
+                # commands before it belong to the previous trace
+                pose = self.send_frames_pose(pose)
+                self.handle_trace_frame(args)
+                continue
+            if prefix in self.sequence_methods:
+                pose = self.send_frames_pose(pose)
+                self.handle_sequence_command(prefix, args, command or cmd, connection)
+                continue
             if prefix not in self.methods:
-                log.warning(
-                    "Unknown command prefix %r, cmd %r, full: %r",
-                    prefix,
-                    cmd,
-                    command,
-                )
-            if prefix not in self.methods:
+                if self.metrics is not None:
+                    self.metrics.unknown_commands += 1
                 log.error(
                     "Error processing command %r, no prefix %r, full command %r.",
                     cmd,
                     prefix,
-                    command,
+                    command or cmd,
                 )
                 continue
-            method = self.methods[prefix]
+            if getattr(pose, prefix) is not None:
+                pose = self.send_frames_pose(pose)
             try:
-                method(*map(int, args))
-            except Exception as e:
+                pose.set(prefix, *map(int, args))
+            except ValueError as e:
+                if self.metrics is not None:
+                    self.metrics.parse_errors += 1
                 log.error(
-                    "Error executing cmd %r command %r: %s. Method: %s",
+                    "Error parsing cmd %r command %r: %s",
                     cmd,
-                    command,
+                    command or cmd,
+                    e,
+                )
+                continue
+            if self.metrics is not None:
+                self.metrics.command(prefix)
+        self.send_frames_pose(pose)
+
+    def send_frames_pose(self, pose: Pose) -> Pose:
+        """
+        :param pose: commands collected by `handle_frames`
+        :return: empty pose to collect the next commands into
+        """
+        if len(pose) > 1:
+            self.set_pose(pose)
+            return Pose()
+        for param, values in pose.items():
+            self.methods[param](*values)
+        return Pose()
+
+    @staticmethod
+    def handle_trace_frame(args: "list[str]") -> None:
+        """
+        Commands after `trace|<id>` belong to the client trace `id`,
+        ignored if tracing is disabled
+
+        :param args: trace id
+        :return:
+        """
+        tracer = tracing.tracer
+        if tracer is None:
+            return
+        try:
+            (trace_id,) = map(int, args)
+        except ValueError as e:
+            log.error("Error parsing trace frame args %r: %s", args, e)
+            return
+        tracing.current_trace.set(trace_id)
+        received_at = tracing.received_at.get()
+        tracer.flow(
+            tracing.PHASE_FLOW_END,
+            trace_id,
+            tracing.now() if received_at is None else received_at,
+        )
+
+    def handle_sequence_command(
+        self,
+        prefix: str,
+        args: "list[str]",
+        command: str,
+        connection: Optional[ClientConnection] = None,
+    ) -> None:
+        """
+        :param prefix: `SequenceCommand`
+        :param args:
+        :param command: full received command, for logging
+        :param connection: sender, subscribed to sequence events
+        :return:
+        """
+        if self.metrics is not None:
+            self.metrics.sequence_commands += 1
+        if connection is not None:
+            self.subscribe(connection)
+        try:
+            self.sequence_methods[prefix](*args)
+        except (TypeError, ValueError) as e:
+            if self.metrics is not None:
+                self.metrics.parse_errors += 1
+            log.error("Error executing sequence command %r: %s", command, e)
+
+    def handle_records(
+        self,
+        records: "list[Record]",
+        connection: Optional[ClientConnection] = None,
+    ) -> None:
+        for opcode, sequence, args in records:
+            if opcode == OP_TEXT:
+                self.handle_command(str(args[0]), connection)
+                continue
+            method = self.binary_methods.get(opcode)
+            if method is None:
+                if self.metrics is not None:
+                    self.metrics.unknown_commands += 1
+                log.error("Unknown opcode %s, sequence %s", opcode, sequence)
+                continue
+            if self.metrics is not None:
+                self.metrics.command(self.binary_params[opcode])
+            try:
+                method(*args)
+            except Exception as e:
+                log.error(
+                    "Error executing opcode %s sequence %s args %s: %s",
+                    opcode,
+                    sequence,
+                    args,
                     e,
-                    method,
                 )
 
+    def handle_received(self, connection: ClientConnection, nbytes: int) -> bytes:
+        """
+        Handle data received into `connection.writable()`
+
+        :param connection:
+        :param nbytes: number of bytes received
+        :return: reply to send to the client, empty if nothing to send
+        """
+        if tracing.tracer is None:
+            return self.handle_received_data(connection, nbytes)
+        with tracing.received():
+            return self.handle_received_data(connection, nbytes)
+
+    def handle_received_data(self, connection: ClientConnection, nbytes: int) -> bytes:
+        if connection.binary is not None:
+            self.handle_records(connection.binary.commit(nbytes), connection)
+            return b""
+
+        frames = connection.text.commit(nbytes)
+        log.debug("Received frames %r", frames)
+        if BINARY_PROTOCOL_HELLO not in frames:
+            self.handle_frames(frames, connection=connection)
+            return b""
+
+        hello_index = frames.index(BINARY_PROTOCOL_HELLO)
+        self.handle_frames(frames[:hello_index], connection=connection)
+        self.handle_frames(frames[hello_index + 1 :], connection=connection)
+        log.info("Switch connection to binary protocol")
+        self.handle_records(connection.switch_to_binary(), connection)
+        return BINARY_PROTOCOL_HELLO_FRAME
+
+    def handle_command(
+        self,
+        command: str,
+        connection: Optional[ClientConnection] = None,
+    ) -> None:
+        frames = [cmd for cmd in command.split(COMMAND_ENDL) if cmd]
+        self.handle_frames(frames, command, connection)
+
     def run_server(self) -> None:
         """
         :return:
@@ -102,10 +439,12 @@ class RobohandControlServerSocket(RobohandControlBase):
         log.debug("Create a TCP socket")
         with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as server_socket:
             log.debug("Bind the socket to the server address and port")
-            server_socket.bind((SERVER_IP_BIND, SERVER_PORT))
+            server_socket.bind((self.server_host, self.server_port))
             server_socket.listen()
             # List to keep track of client sockets
             monitor_sockets = [server_socket]
+            connections: "dict[socket.socket, ClientConnection]" = {}
+            writers: "dict[socket.socket, queue.Queue[Optional[bytes]]]" = {}
 
             log.info("Starting server")
 
@@ -118,16 +457,160 @@ class RobohandControlServerSocket(RobohandControlBase):
                         # Accept incoming connection
                         client_socket, address = server_socket.accept()
                         log.info("New connection from %s", address)
+                        if self.metrics is not None:
+                            self.metrics.connections += 1
                         monitor_sockets.append(client_socket)
+                        writers[client_socket] = self.start_writer(client_socket)
+                        connections[client_socket] = ClientConnection(
+                            send=writers[client_socket].put_nowait,
+                        )
+                        continue
+                    # Receive data from the client socket
+                    connection = connections[sock]
+                    try:
+                        nbytes = sock.recv_into(connection.writable())
+                        if nbytes:
+                            reply = self.handle_received(connection, nbytes)
+                            if reply:
+                                connection.send(reply)  # type: ignore[misc]
+                    except ConnectionError as e:
+                        log.warning("Client connection error: %s", e)
+                        nbytes = 0
+                    if not nbytes:
+                        # No new data, close the socket
+                        log.info("Client disconnected")
+                        if self.metrics is not None:
+                            self.metrics.disconnections += 1
+                        monitor_sockets.remove(sock)
+                        self.unsubscribe(connections.pop(sock))
+                        writers.pop(sock).put_nowait(None)
+                        sock.close()
+
+    @staticmethod
+    def start_writer(client_socket: socket.socket) -> "queue.Queue[Optional[bytes]]":
+        """
+        Replies and sequence events are sent in order by a writer thread,
+        so the select loop and the sequence engine never wait for a slow client
+
+        :param client_socket: blocking client socket
+        :return: outgoing queue, None stops the writer
+        """
+        outgoing: "queue.Queue[Optional[bytes]]" = queue.Queue()
+
+        def write() -> None:
+            while True:
+                data = outgoing.get()
+                if data is None:
+                    return
+                try:
+                    client_socket.sendall(data)
+                except OSError as e:
+                    log.warning("Could not send to client: %s", e)
+                    return
+
+        threading.Thread(
+            target=write,
+            name="robohand-client-writer",
+            daemon=True,
+        ).start()
+        return outgoing
+
+    def run_server_asyncio(self) -> None:
+        """
+        Run the server on an asyncio event loop,
+        one reader task per connected client.
+
+        :return:
+        """
+        asyncio.run(self.serve_asyncio())
+
+    async def serve_asyncio(self) -> None:
+        loop = asyncio.get_running_loop()
+        # all backend calls go through one thread in the order received,
+        # so a slow backend call doesn't block reading from other clients
+        with (
+            ThreadPoolExecutor(
+                max_workers=1,
+                thread_name_prefix="robohand",
+            ) as executor,
+            socket.socket(
+                socket.AF_INET,
+                socket.SOCK_STREAM,
+            ) as server_socket,
+        ):
+            server_socket.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+            server_socket.bind((self.server_host, self.server_port))
+            server_socket.listen(socket.SOMAXCONN)
+            server_socket.setblocking(False)
+
+            log.info("Starting asyncio server")
+            clients: "set[asyncio.Task[None]]" = set()
+            try:
+                while True:
+                    client_socket, address = await loop.sock_accept(server_socket)
+                    log.info("New connection from %s", address)
+                    task = loop.create_task(
+                        self.handle_client_asyncio(client_socket, executor),
+                    )
+                    clients.add(task)
+                    task.add_done_callback(clients.discard)
+            finally:
+                for task in clients:
+                    task.cancel()
+
+    async def handle_client_asyncio(
+        self,
+        client_socket: socket.socket,
+        executor: Executor,
+    ) -> None:
+        loop = asyncio.get_running_loop()
+        # replies and sequence events, sent in order by the writer task
+        outgoing: "asyncio.Queue[bytes]" = asyncio.Queue()
+
+        def send(data: bytes) -> None:
+            loop.call_soon_threadsafe(outgoing.put_nowait, data)
+
+        async def write() -> None:
+            while True:
+                data = await outgoing.get()
+                try:
+                    await loop.sock_sendall(client_socket, data)
+                except OSError as e:
+                    log.warning("Could not send to client: %s", e)
+                    return
+
+        connection = ClientConnection(send=send)
+        if self.metrics is not None:
+            self.metrics.connections += 1
+        with client_socket:
+            client_socket.setblocking(False)
+            client_socket.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+            writer = loop.create_task(write())
+            while True:
+                try:
+                    nbytes = await loop.sock_recv_into(
+                        client_socket,
+                        connection.writable(),
+                    )
+                    if not nbytes:
+                        break
+                    if self.dispatch_worker is None:
+                        reply = await loop.run_in_executor(
+                            executor,
+                            self.handle_received,
+                            connection,
+                            nbytes,
+                        )
                     else:
-                        # Receive data from the client socket
-                        data = sock.recv(1024)
-                        if data:
-                            d = data.decode()
-                            log.debug("Received data %r", d)
-                            self.handle_command(d)
-                        else:
-                            # No new data, close the socket
-                            log.info("Client disconnected")
-                            monitor_sockets.remove(sock)
-                            sock.close()
+                        # parse and queue only, the worker calls the backend
+                        reply = self.handle_received(connection, nbytes)
+                    if reply:
+                        outgoing.put_nowait(reply)
+                except ConnectionError as e:
+                    log.warning("Client connection error: %s", e)
+                    break
+            self.unsubscribe(connection)
+            writer.cancel()
+        if self.metrics is not None:
+            self.metrics.disconnections += 1
+        log.info("Client disconnected")
@@ -0,0 +1,248 @@
+import logging
+import threading
+import time
+from typing import TYPE_CHECKING, Optional
+
+import config
+from robohandcontrol.motion_timing import SequenceTiming
+from robohandcontrol.sequence_protocol import SequenceEvent, SequenceState
+
+if TYPE_CHECKING:
+    from typing import Callable
+
+    from robohandcontrol.motion_timing import MotionScheduler
+    from robohandcontrol.robocontrol import Pose, RobohandControlBase
+
+    EventListener = Callable[[str, tuple[object, ...]], None]
+
+log = logging.getLogger(__name__)
+
+
+class SequenceEngine:
+    """
+    Plays an uploaded sequence of poses next to the hardware.
+
+    Steps are scheduled on the monotonic clock: step N runs at
+    `start + (N + 1) * interval` (same as the GUI timer, first step
+    after one interval), so delays don't accumulate. If the backend
+    falls behind by more than one interval, the schedule is moved
+    instead of running missed steps in a burst.
+
+    With a motion scheduler the first step runs immediately and every
+    next one after the estimated duration of the previous one.
+    """
+
+    def __init__(
+        self,
+        robohand: "RobohandControlBase",
+        listener: "Optional[EventListener]" = None,
+        interval: float = config.COMMANDS_TIMEOUT / 1000,
+        motion_scheduler: "Optional[MotionScheduler]" = None,
+    ) -> None:
+        """
+        :param robohand: backend to send steps to
+        :param listener: called with events, on the engine thread or the thread
+            of the control call, never with the engine lock held
+        :param interval: seconds between steps
+        :param motion_scheduler: estimates step durations, `interval` is not used
+        """
+        self.robohand = robohand
+        self.listener = listener
+        self.interval = interval
+        self.motion_scheduler = motion_scheduler
+        self.timing = SequenceTiming()
+        self.steps: "list[Pose]" = []
+        self.index = 0
+        self.state = SequenceState.STOPPED
+        # monotonic time to run the next step at
+        self.next_at = 0.0
+        # time left to the next step when paused
+        self.remaining = 0.0
+        self._condition = threading.Condition()
+        # events queued with the lock held, delivered by `flush_events`
+        self._events: "list[tuple[str, tuple[object, ...]]]" = []
+        # keeps events in order when several threads flush them
+        self._emit_lock = threading.Lock()
+        self._thread: Optional[threading.Thread] = None
+        self._closed = False
+
+    def emit(self, event: str, *args: object) -> None:
+        """
+        Queue the event, it is sent by `flush_events` after the lock is released
+        """
+        if self.listener is None:
+            return
+        with self._condition:
+            self._events.append((event, args))
+
+    def flush_events(self) -> None:
+        if self.listener is None:
+            return
+        with self._emit_lock:
+            with self._condition:
+                events, self._events = self._events, []
+            for event, args in events:
+                try:
+                    self.listener(event, args)
+                except Exception:
+                    log.exception("Error handling sequence event %s%s", event, args)
+
+    def set_state(self, state: SequenceState) -> None:
+        self.state = state
+        log.info("Sequence %s", state.value)
+        self.emit(SequenceEvent.STATE, state.value)
+
+    def clear(self) -> None:
+        with self._condition:
+            self.steps = []
+            self.index = 0
+            if self.state is not SequenceState.STOPPED:
+                self.set_state(SequenceState.STOPPED)
+            self._condition.notify()
+        self.flush_events()
+
+    def add_step(self, pose: "Pose") -> None:
+        with self._condition:
+            self.steps.append(pose)
+
+    def start(self, interval: Optional[float] = None) -> None:
+        """
+        Play from the first step
+
+        :param interval: seconds between steps
+        :return:
+        """
+        with self._condition:
+            if interval is not None:
+                self.interval = interval
+            self.index = 0
+            self.next_at = time.monotonic()
+            if self.motion_scheduler is None:
+                self.next_at += self.interval
+            self.timing.start()
+            self.set_state(SequenceState.RUNNING)
+            self.ensure_thread()
+            self._condition.notify()
+        self.flush_events()
+
+    def stop(self) -> None:
+        with self._condition:
+            self.index = 0
+            self.set_state(SequenceState.STOPPED)
+            self._condition.notify()
+        self.flush_events()
+
+    def pause(self) -> None:
+        with self._condition:
+            if self.state is not SequenceState.RUNNING:
+                return
+            self.remaining = max(self.next_at - time.monotonic(), 0.0)
+            self.timing.pause()
+            self.set_state(SequenceState.PAUSED)
+        self.flush_events()
+
+    def resume(self) -> None:
+        with self._condition:
+            if self.state is not SequenceState.PAUSED:
+                return
+            self.next_at = time.monotonic() + self.remaining
+            self.timing.resume()
+            self.set_state(SequenceState.RUNNING)
+            self._condition.notify()
+        self.flush_events()
+
+    def seek(self, index: int) -> None:
+        """
+        Continue from the step, a running sequence runs it immediately
+
+        :param index: step index
+        :return:
+        """
+        with self._condition:
+            self.index = min(max(index, 0), len(self.steps))
+            self.remaining = 0.0
+            self.next_at = time.monotonic()
+            self._condition.notify()
+
+    def close(self) -> None:
+        with self._condition:
+            self._closed = True
+            self._condition.notify()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+    def ensure_thread(self) -> None:
+        if self._thread is not None and self._thread.is_alive():
+            return
+        self._thread = threading.Thread(
+            target=self.run,
+            name="robohand-sequence",
+            daemon=True,
+        )
+        self._thread.start()
+
+    def wait_next_step(self) -> "Optional[tuple[int, Pose]]":
+        """
+        Wait until the next step is due
+
+        :return: step index and pose, None if the sequence finished or closed
+        """
+        with self._condition:
+            while not self._closed:
+                if self.state is not SequenceState.RUNNING:
+                    self._condition.wait()
+                    continue
+                timeout = self.next_at - time.monotonic()
+                if timeout > 0:
+                    self._condition.wait(timeout)
+                    continue
+                if self.index >= len(self.steps):
+                    # last step had its time to finish
+                    self.finish()
+                    return None
+
+                index = self.index
+                pose = self.steps[index]
+                self.index += 1
+                duration = self.step_duration(pose)
+                self.timing.step(duration)
+                self.next_at += duration
+                now = time.monotonic()
+                if self.next_at < now - duration:
+                    log.warning("Sequence is behind schedule, skip the missed time")
+                    self.next_at = now + duration
+                return index, pose
+        return None
+
+    def step_duration(self, pose: "Pose") -> float:
+        """
+        :param pose: step being sent
+        :return: seconds to wait before the next step
+        """
+        if self.motion_scheduler is None:
+            return self.interval
+        return self.motion_scheduler.advance(pose)
+
+    def finish(self) -> None:
+        self.index = 0
+        report = self.timing.finish()
+        self.emit(
+            SequenceEvent.TIMING,
+            round(report.estimated * 1000),
+            round(report.actual * 1000),
+        )
+        self.set_state(SequenceState.FINISHED)
+
+    def run(self) -> None:
+        while not self._closed:
+            step = self.wait_next_step()
+            if step is not None:
+                index, pose = step
+                try:
+                    self.robohand.set_pose(pose)
+                except Exception:
+                    log.exception("Error sending sequence step %s %s", index, pose)
+                with self._condition:
+                    self.emit(SequenceEvent.PROGRESS, index, len(self.steps))
+            self.flush_events()
@@ -0,0 +1,146 @@
+"""
+PCA9685 register map behind a simulated I2C bus,
+enough of the `adafruit_pca9685.PCA9685` interface for `PCA9685BurstWriter`.
+"""
+
+import threading
+from dataclasses import dataclass
+from typing import TYPE_CHECKING, Optional
+
+import config
+from robohandcontrol.adafruit_servokit_robocontrol.pca9685_burst import (
+    CHANNEL_REGISTERS_SIZE,
+    LED0_ON_L_REGISTER,
+    MODE1_AUTO_INCREMENT,
+)
+
+if TYPE_CHECKING:
+    from typing import Callable
+
+    from robohandcontrol.simulated_robocontrol.clock import MonotonicClock
+
+    # first and last written register
+    WriteListener = Callable[[int, int], None]
+
+MODE1_REGISTER = 0x00
+REGISTERS_COUNT = 256
+# ServoKit default
+PWM_FREQUENCY = 50
+
+
+@dataclass
+class BusStats:
+    transactions: int = 0
+    # bytes on the bus, register address included
+    bytes: int = 0
+    # seconds
+    bus_time: float = 0.0
+
+
+class SimulatedI2CDevice:
+    """
+    Every transaction takes `latency + bytes * byte_time` on the clock,
+    transactions are serialized like on a real bus
+    """
+
+    def __init__(
+        self,
+        registers: bytearray,
+        clock: "MonotonicClock",
+        latency: float = config.SIMULATED_I2C_LATENCY / 1_000_000,
+        byte_time: float = config.SIMULATED_I2C_BYTE_TIME / 1_000_000,
+        listener: "Optional[WriteListener]" = None,
+    ) -> None:
+        """
+        :param registers: chip registers
+        :param clock:
+        :param latency: seconds per transaction
+        :param byte_time: seconds per byte
+        :param listener: called after every write
+        """
+        self.registers = registers
+        self.clock = clock
+        self.latency = latency
+        self.byte_time = byte_time
+        self.listener = listener
+        self.stats = BusStats()
+        self._lock = threading.RLock()
+
+    def __enter__(self) -> "SimulatedI2CDevice":
+        self._lock.acquire()
+        return self
+
+    def __exit__(self, *_: object) -> None:
+        self._lock.release()
+
+    def transfer(self, nbytes: int) -> None:
+        duration = self.latency + nbytes * self.byte_time
+        self.stats.transactions += 1
+        self.stats.bytes += nbytes
+        self.stats.bus_time += duration
+        self.clock.sleep(duration)
+
+    def auto_increment(self) -> bool:
+        return bool(self.registers[MODE1_REGISTER] & MODE1_AUTO_INCREMENT)
+
+    def write(self, buffer: "bytes | bytearray") -> None:
+        with self._lock:
+            self.transfer(len(buffer))
+            register = buffer[0]
+            data = buffer[1:] if self.auto_increment() else buffer[1:2]
+            end = register + len(data)
+            self.registers[register:end] = data
+            if self.listener is not None and data:
+                self.listener(register, end - 1)
+
+    def write_then_readinto(
+        self,
+        out_buffer: "bytes | bytearray",
+        in_buffer: bytearray,
+    ) -> None:
+        with self._lock:
+            self.transfer(len(out_buffer) + len(in_buffer))
+            register = out_buffer[0]
+            size = len(in_buffer) if self.auto_increment() else 1
+            in_buffer[:size] = self.registers[register : register + size]
+
+
+class SimulatedPCA9685:
+    def __init__(
+        self,
+        clock: "MonotonicClock",
+        latency: float = config.SIMULATED_I2C_LATENCY / 1_000_000,
+        byte_time: float = config.SIMULATED_I2C_BYTE_TIME / 1_000_000,
+        listener: "Optional[WriteListener]" = None,
+    ) -> None:
+        self.registers = bytearray(REGISTERS_COUNT)
+        self.frequency = PWM_FREQUENCY
+        self.i2c_device = SimulatedI2CDevice(
+            self.registers,
+            clock,
+            latency=latency,
+            byte_time=byte_time,
+            listener=listener,
+        )
+
+    @property
+    def mode1_reg(self) -> int:
+        value = bytearray(1)
+        self.i2c_device.write_then_readinto(bytes((MODE1_REGISTER,)), value)
+        return value[0]
+
+    @mode1_reg.setter
+    def mode1_reg(self, value: int) -> None:
+        self.i2c_device.write(bytes((MODE1_REGISTER, value)))
+
+    def channel_off(self, channel: int) -> int:
+        """
+        :param channel:
+        :return: 12-bit OFF count, with the full off bit
+        """
+        offset = LED0_ON_L_REGISTER + channel * CHANNEL_REGISTERS_SIZE
+        return self.registers[offset + 2] | self.registers[offset + 3] << 8
+
+    def channel_on(self, channel: int) -> int:
+        offset = LED0_ON_L_REGISTER + channel * CHANNEL_REGISTERS_SIZE
+        return self.registers[offset] | self.registers[offset + 1] << 8
@@ -0,0 +1,204 @@
+"""
+Simulated arm: the same PCA9685 control as the Adafruit ServoKit backend
+writes to a simulated device, servos slew to the written angles
+at a fixed speed per port.
+"""
+
+import math
+import threading
+from typing import TYPE_CHECKING, Optional
+
+import config
+from robohandcontrol.adafruit_servokit_robocontrol.pca9685_burst import (
+    CHANNEL_REGISTERS_SIZE,
+    FULL_ON_OFF,
+    LED0_ON_L_REGISTER,
+    SERVO_ACTUATION_RANGE,
+    SERVO_MAX_PULSE,
+    SERVO_MIN_PULSE,
+)
+from robohandcontrol.adafruit_servokit_robocontrol.pca9685_control import (
+    LED_PORTS,
+    PCA9685RobohandControl,
+)
+from robohandcontrol.calibration import SERVO_PORTS, ServoCalibration
+from robohandcontrol.motion_timing import JOINT_PORTS
+from robohandcontrol.robocontrol import Pose
+from robohandcontrol.simulated_robocontrol.clock import MonotonicClock
+from robohandcontrol.simulated_robocontrol.pca9685 import SimulatedPCA9685
+from robohandcontrol.utils import map_range
+
+if TYPE_CHECKING:
+    # time, port, target angle
+    TargetChange = tuple[float, int, float]
+
+PWM_RESOLUTION = 4096
+
+
+class SimulatedServo:
+    """
+    Moves to the target at a constant speed
+    """
+
+    def __init__(self, speed: float, position: float = 0.0, now: float = 0.0) -> None:
+        """
+        :param speed: degrees per second
+        :param position: start angle
+        :param now: clock time
+        """
+        self.speed = speed
+        self.start_position = position
+        self.start_time = now
+        self.target = position
+
+    def position_at(self, now: float) -> float:
+        delta = self.target - self.start_position
+        travel = self.speed * max(now - self.start_time, 0.0)
+        if abs(delta) <= travel:
+            return self.target
+        return self.start_position + math.copysign(travel, delta)
+
+    def arrival_time(self) -> float:
+        return self.start_time + abs(self.target - self.start_position) / self.speed
+
+    def set_target(self, now: float, target: float) -> None:
+        self.start_position = self.position_at(now)
+        self.start_time = now
+        self.target = target
+
+
+class RobohandSimulatedControl(PCA9685RobohandControl):
+    def __init__(
+        self,
+        clock: Optional[MonotonicClock] = None,
+        calibrations: "Optional[dict[int, ServoCalibration]]" = None,
+        latency: float = config.SIMULATED_I2C_LATENCY / 1_000_000,
+        byte_time: float = config.SIMULATED_I2C_BYTE_TIME / 1_000_000,
+    ) -> None:
+        """
+        :param clock: `VirtualClock` for deterministic runs, real time by default
+        :param calibrations: calibration by servo port, `speed` is the slew rate
+        :param latency: seconds per I2C transaction
+        :param byte_time: seconds per I2C byte
+        """
+        self.clock = clock or MonotonicClock()
+        calibrations = calibrations or {port: ServoCalibration() for port in SERVO_PORTS}
+        self._lock = threading.Lock()
+        now = self.clock.now()
+        self.servos = {
+            port: SimulatedServo(
+                speed=calibration.speed or config.SERVO_SPEED,
+                now=now,
+            )
+            for port, calibration in calibrations.items()
+        }
+        self.led: "tuple[int, int, int]" = (0, 0, 0)
+        # every servo target change
+        self.trace: "list[TargetChange]" = []
+
+        self.pca = SimulatedPCA9685(
+            self.clock,
+            latency=latency,
+            byte_time=byte_time,
+            listener=self.handle_write,
+        )
+        super().__init__(self.pca, calibrations)
+
+    def off_count_to_angle(self, off: int) -> float:
+        pulse = off * 1_000_000 / self.pca.frequency / PWM_RESOLUTION
+        servo_angle = (
+            (pulse - SERVO_MIN_PULSE)
+            * SERVO_ACTUATION_RANGE
+            / (SERVO_MAX_PULSE - SERVO_MIN_PULSE)
+        )
+        return servo_angle + config.SERVO_MIN_ANGLE
+
+    def handle_write(self, first_register: int, last_register: int) -> None:
+        """
+        Registers were written on the bus, update servo targets and LED
+
+        :param first_register:
+        :param last_register:
+        :return:
+        """
+        now = self.clock.now()
+        with self._lock:
+            for port, servo in self.servos.items():
+                if not self.channel_written(port, first_register, last_register):
+                    continue
+                off = self.pca.channel_off(port)
+                if not off or off & FULL_ON_OFF:
+                    # no pulse, servo is not driven
+                    continue
+                target = self.off_count_to_angle(off)
+                if target != servo.target:
+                    servo.set_target(now, target)
+                    self.trace.append((now, port, target))
+            if any(
+                self.channel_written(port, first_register, last_register)
+                for port in LED_PORTS
+            ):
+                red, green, blue = (self.channel_brightness(port) for port in LED_PORTS)
+                self.led = (red, green, blue)
+
+    @staticmethod
+    def channel_written(channel: int, first_register: int, last_register: int) -> bool:
+        start = LED0_ON_L_REGISTER + channel * CHANNEL_REGISTERS_SIZE
+        end = start + CHANNEL_REGISTERS_SIZE - 1
+        return start <= last_register and first_register <= end
+
+    def channel_brightness(self, channel: int) -> int:
+        if self.pca.channel_on(channel) & FULL_ON_OFF:
+            return 255
+        off = self.pca.channel_off(channel)
+        if off & FULL_ON_OFF:
+            return 0
+        return map_range(
+            off,
+            in_min=0,
+            in_max=PWM_RESOLUTION - 1,
+            out_min=0,
+            out_max=255,
+        )
+
+    def positions(self, now: Optional[float] = None) -> "dict[int, float]":
+        """
+        :param now: clock time, current if not set
+        :return: simulated servo angles by port
+        """
+        now = self.clock.now() if now is None else now
+        with self._lock:
+            return {port: servo.position_at(now) for port, servo in self.servos.items()}
+
+    def pose_at(self, now: Optional[float] = None) -> Pose:
+        positions = self.positions(now)
+        pose = Pose(led=self.led)
+        for param, port in JOINT_PORTS.items():
+            pose.set(param, round(positions[port]))
+        return pose
+
+    def sample(
+        self,
+        start: float,
+        end: float,
+        period: float,
+    ) -> "list[tuple[float, Pose]]":
+        """
+        :param start: clock time
+        :param end: clock time
+        :param period: seconds between samples
+        :return: (time, pose) samples
+        """
+        samples = []
+        count = int((end - start) / period) + 1
+        for index in range(count):
+            now = start + index * period
+            samples.append((now, self.pose_at(now)))
+        return samples
+
+    def settled_at(self) -> float:
+        """
+        :return: clock time all servos reach their targets at
+        """
+        with self._lock:
+            return max(servo.arrival_time() for servo in self.servos.values())
@@ -0,0 +1,309 @@
+"""
+Compiled sequences: commands files are compiled once into a binary timeline
+which is read by playback without parsing.
+
+Timeline file is little-endian: a header followed by fixed-size step records.
+Every step holds absolute targets: joints missing in a step are carried forward
+from the previous steps, joints never set yet are marked unknown in the mask
+(`POSE_*` bits from the binary protocol), plus the step duration in milliseconds.
+
+The commands JSON stays the editable source, the compiled file is a cache
+next to it (`<name>.timeline`), rebuilt when the source mtime and size change
+and its hash doesn't match, or when step durations settings change.
+"""
+
+import hashlib
+import json
+import logging
+import mmap
+import struct
+import sys
+from pathlib import Path
+from typing import TYPE_CHECKING, Optional
+
+import config
+from robohandcontrol.binary_protocol import (
+    POSE_CLAW,
+    POSE_EXTEND_ARROW,
+    POSE_LED,
+    POSE_RAISE_ARROW,
+    POSE_ROTATION,
+)
+from robohandcontrol.robocontrol import Pose
+
+if TYPE_CHECKING:
+    from collections.abc import Iterator
+
+    from robohandcontrol.motion_timing import MotionScheduler
+
+log = logging.getLogger(__name__)
+
+COMMANDS_JSON_KEY = "commands"
+TIMELINE_SUFFIX = ".timeline"
+TIMELINE_MAGIC = b"RHTL"
+TIMELINE_VERSION = 1
+
+# magic, version, source mtime ns, source size, source sha256,
+# durations settings digest, steps count
+TIMELINE_HEADER = struct.Struct("<4sH2xQQ32s8sI")
+# mask, rotation, raise_arrow, extend_arrow, claw, red, green, blue, duration ms
+STEP_RECORD = struct.Struct("<B4h3BI")
+
+
+def load_commands(filepath: Path) -> "list[str]":
+    """
+    :param filepath: commands JSON file
+    :return: stored commands
+    """
+    with filepath.open("r") as file:
+        data = json.load(file)
+    return list(data.get(COMMANDS_JSON_KEY, []))
+
+
+def durations_digest(motion_scheduler: "Optional[MotionScheduler]") -> bytes:
+    settings = (
+        f"interval:{config.COMMANDS_TIMEOUT}"
+        if motion_scheduler is None
+        else repr(motion_scheduler.model)
+    )
+    return hashlib.sha256(settings.encode("utf-8")).digest()[:8]
+
+
+def encode_step(pose: Pose, duration: int) -> bytes:
+    mask = 0
+    angles = []
+    for flag, angle in (
+        (POSE_ROTATION, pose.rotation),
+        (POSE_RAISE_ARROW, pose.raise_arrow),
+        (POSE_EXTEND_ARROW, pose.extend_arrow),
+        (POSE_CLAW, pose.claw),
+    ):
+        if angle is not None:
+            mask |= flag
+        angles.append(angle or 0)
+    rgb = (0, 0, 0)
+    if pose.led is not None:
+        mask |= POSE_LED
+        rgb = pose.led
+    return STEP_RECORD.pack(mask, *angles, *rgb, duration)
+
+
+def compile_commands(
+    commands: "list[str]",
+    motion_scheduler: "Optional[MotionScheduler]" = None,
+) -> "tuple[list[Pose], list[int]]":
+    """
+    :param commands: stored commands, e.g. `["claw|60;", "rotation|1;"]`
+    :param motion_scheduler: estimates step durations, `COMMANDS_TIMEOUT` if not set
+    :return: absolute poses and durations in milliseconds
+    :raises ValueError: invalid command
+    """
+    poses = []
+    state = Pose()
+    for commands_text in commands:
+        state = state.updated(Pose.from_commands(commands_text))
+        poses.append(state)
+    if motion_scheduler is None:
+        return poses, [config.COMMANDS_TIMEOUT] * len(poses)
+    durations = motion_scheduler.estimate(poses)
+    return poses, [round(duration * 1000) for duration in durations]
+
+
+def source_fingerprint(source: Path) -> "tuple[int, int, bytes]":
+    stat = source.stat()
+    digest = hashlib.sha256(source.read_bytes()).digest()
+    return stat.st_mtime_ns, stat.st_size, digest
+
+
+def write_timeline(
+    source: Path,
+    target: Path,
+    motion_scheduler: "Optional[MotionScheduler]" = None,
+) -> None:
+    mtime_ns, size, digest = source_fingerprint(source)
+    poses, durations = compile_commands(load_commands(source), motion_scheduler)
+    header = TIMELINE_HEADER.pack(
+        TIMELINE_MAGIC,
+        TIMELINE_VERSION,
+        mtime_ns,
+        size,
+        digest,
+        durations_digest(motion_scheduler),
+        len(poses),
+    )
+    write_steps(target, header, poses, durations)
+    log.info("Compiled %s steps from %s to %s", len(poses), source, target)
+
+
+def write_steps(
+    target: Path,
+    header: bytes,
+    poses: "list[Pose]",
+    durations: "list[int]",
+) -> None:
+    tmp_target = target.with_suffix(target.suffix + ".tmp")
+    with tmp_target.open("wb") as file:
+        file.write(header)
+        for pose, duration in zip(poses, durations):
+            file.write(encode_step(pose, duration))
+    # readers never see a partially written file
+    tmp_target.replace(target)
+
+
+class Timeline:
+    """
+    Memory-mapped compiled timeline, steps are decoded on access
+    """
+
+    def __init__(self, filepath: Path) -> None:
+        self.filepath = filepath
+        msg = f"{filepath} is not a timeline file of version {TIMELINE_VERSION}"
+        with filepath.open("rb") as file:
+            if filepath.stat().st_size < TIMELINE_HEADER.size:
+                raise ValueError(msg)
+            self.buffer = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+        self.source_mtime_ns: int
+        self.source_size: int
+        self.source_digest: bytes
+        self.durations_digest: bytes
+        self.count: int
+        (
+            magic,
+            version,
+            self.source_mtime_ns,
+            self.source_size,
+            self.source_digest,
+            self.durations_digest,
+            self.count,
+        ) = TIMELINE_HEADER.unpack_from(self.buffer)
+        expected_size = TIMELINE_HEADER.size + self.count * STEP_RECORD.size
+        if (
+            magic != TIMELINE_MAGIC
+            or version != TIMELINE_VERSION
+            or len(self.buffer) != expected_size
+        ):
+            self.close()
+            raise ValueError(msg)
+
+    def __len__(self) -> int:
+        return self.count
+
+    def __iter__(self) -> "Iterator[tuple[Pose, int]]":
+        for index in range(self.count):
+            yield self.step(index)
+
+    def __enter__(self) -> "Timeline":
+        return self
+
+    def __exit__(self, *_: object) -> None:
+        self.close()
+
+    def close(self) -> None:
+        self.buffer.close()
+
+    def step(self, index: int) -> "tuple[Pose, int]":
+        """
+        :param index:
+        :return: absolute pose and duration in milliseconds
+        """
+        if not 0 <= index < self.count:
+            msg = f"Step {index} out of range, timeline has {self.count} steps"
+            raise IndexError(msg)
+        offset = TIMELINE_HEADER.size + index * STEP_RECORD.size
+        (
+            mask,
+            rotation,
+            raise_arrow,
+            extend_arrow,
+            claw,
+            red,
+            green,
+            blue,
+            duration,
+        ) = STEP_RECORD.unpack_from(self.buffer, offset)
+        pose = Pose(
+            rotation=rotation if mask & POSE_ROTATION else None,
+            raise_arrow=raise_arrow if mask & POSE_RAISE_ARROW else None,
+            extend_arrow=extend_arrow if mask & POSE_EXTEND_ARROW else None,
+            claw=claw if mask & POSE_CLAW else None,
+            led=(red, green, blue) if mask & POSE_LED else None,
+        )
+        return pose, duration
+
+    def total_duration(self) -> int:
+        """
+        :return: milliseconds
+        """
+        return sum(duration for _, duration in self)
+
+    def is_up_to_date(
+        self,
+        source: Path,
+        motion_scheduler: "Optional[MotionScheduler]" = None,
+    ) -> bool:
+        if self.durations_digest != durations_digest(motion_scheduler):
+            return False
+        stat = source.stat()
+        if (stat.st_mtime_ns, stat.st_size) == (
+            self.source_mtime_ns,
+            self.source_size,
+        ):
+            return True
+        # touched or copied, but the same content
+        return source_fingerprint(source)[2] == self.source_digest
+
+
+def timeline_path(source: Path) -> Path:
+    return source.with_suffix(TIMELINE_SUFFIX)
+
+
+def load_timeline(
+    source: Path,
+    motion_scheduler: "Optional[MotionScheduler]" = None,
+) -> Timeline:
+    """
+    Open compiled timeline for the commands file, compile it if outdated
+
+    :param source: commands JSON file
+    :param motion_scheduler: estimates step durations, `COMMANDS_TIMEOUT` if not set
+    :return:
+    """
+    target = timeline_path(source)
+    if target.exists():
+        try:
+            timeline = Timeline(target)
+        except ValueError as e:
+            log.warning("Recompile timeline: %s", e)
+        else:
+            if timeline.is_up_to_date(source, motion_scheduler):
+                return timeline
+            timeline.close()
+            log.info("Timeline %s is outdated", target)
+    write_timeline(source, target, motion_scheduler)
+    return Timeline(target)
+
+
+def main() -> None:
+    logging.basicConfig(level=logging.INFO)
+    motion_scheduler = None
+    if "--motion-timing" in sys.argv:
+        from robohandcontrol.calibration import load_calibrations
+        from robohandcontrol.motion_timing import MotionModel, MotionScheduler
+
+        motion_scheduler = MotionScheduler(
+            MotionModel.from_calibrations(load_calibrations()),
+        )
+    for filename in sys.argv[1:]:
+        if filename.startswith("--"):
+            continue
+        with load_timeline(Path(filename), motion_scheduler) as timeline:
+            log.info(
+                "%s: %s steps, %s ms",
+                timeline.filepath,
+                len(timeline),
+                timeline.total_duration(),
+            )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,264 @@
+"""
+Opt-in per-command tracing (`--trace`): every command gets an id, each hop
+(input dispatch, `send_command`, server receive and parse, backend call) records
+a span into an in-memory ring buffer, dumped at exit as Chrome trace JSON
+(open in Perfetto or `chrome://tracing`).
+
+The id is sent to the server as a `trace|<id>;` frame before the command.
+Timestamps are `time.monotonic_ns()`, traces of processes on the same host
+share the clock and can be merged::
+
+    python -m robohandcontrol.tracing merged.json trace-gui-*.json trace-server-*.json
+
+When tracing is disabled `tracer` is None and call sites only check that.
+"""
+
+import atexit
+import collections
+import functools
+import itertools
+import json
+import logging
+import os
+import sys
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from pathlib import Path
+from typing import TYPE_CHECKING, Any, Optional
+
+import config
+from robohandcontrol.sequence_protocol import make_frame
+
+if TYPE_CHECKING:
+    from collections.abc import Iterator, Sequence
+    from typing import Callable
+
+    # phase, name, trace id, start ns, duration ns, thread id
+    TraceEvent = tuple[str, str, int, int, int, int]
+
+log = logging.getLogger(__name__)
+
+TRACE_PREFIX = "trace"
+# Chrome trace phases
+PHASE_COMPLETE = "X"
+PHASE_FLOW_START = "s"
+PHASE_FLOW_END = "f"
+FLOW_NAME = "command"
+
+tracer: "Optional[Tracer]" = None
+# trace id of the command being handled by this thread or asyncio task
+current_trace: "ContextVar[Optional[int]]" = ContextVar("current_trace", default=None)
+# when the server received the data being handled, ns
+received_at: "ContextVar[Optional[int]]" = ContextVar("received_at", default=None)
+
+
+def now() -> int:
+    return time.monotonic_ns()
+
+
+def trace_frame(trace_id: int) -> str:
+    return make_frame(TRACE_PREFIX, trace_id)
+
+
+class Tracer:
+    def __init__(
+        self,
+        process_name: str,
+        size: int = config.TRACE_BUFFER_SIZE,
+    ) -> None:
+        """
+        :param process_name: shown in the trace viewer
+        :param size: events kept, older ones are overwritten
+        """
+        self.process_name = process_name
+        self.pid = os.getpid()
+        # deque append is atomic, no lock on the hot path
+        self.events: "collections.deque[TraceEvent]" = collections.deque(maxlen=size)
+        # ids of different processes don't collide
+        self._ids = itertools.count((self.pid & 0xFFFF) << 32 | 1)
+
+    def new_id(self) -> int:
+        return next(self._ids)
+
+    def complete(
+        self,
+        name: str,
+        trace_id: int,
+        start: int,
+        end: Optional[int] = None,
+    ) -> None:
+        """
+        :param name: hop
+        :param trace_id:
+        :param start: ns
+        :param end: ns, now if not set
+        :return:
+        """
+        end = now() if end is None else end
+        self.events.append(
+            (PHASE_COMPLETE, name, trace_id, start, end - start, threading.get_ident()),
+        )
+
+    def flow(self, phase: str, trace_id: int, timestamp: int) -> None:
+        """
+        Arrow between processes in the viewer, bound to the span around `timestamp`
+        """
+        self.events.append(
+            (phase, FLOW_NAME, trace_id, timestamp, 0, threading.get_ident()),
+        )
+
+    @contextmanager
+    def span(self, name: str, trace_id: int) -> "Iterator[None]":
+        start = now()
+        try:
+            yield
+        finally:
+            self.complete(name, trace_id, start)
+
+    def start_command(self, name: str, start: Optional[int] = None) -> int:
+        """
+        New trace, the time since `start` is recorded as the first span
+
+        :param name: first hop, e.g. input_dispatch
+        :param start: ns
+        :return: trace id
+        """
+        trace_id = self.new_id()
+        self.complete(name, trace_id, now() if start is None else start)
+        return trace_id
+
+    def to_chrome_trace(self) -> "dict[str, Any]":
+        thread_names = {thread.ident: thread.name for thread in threading.enumerate()}
+        trace_events: "list[dict[str, Any]]" = [
+            {
+                "ph": "M",
+                "name": "process_name",
+                "pid": self.pid,
+                "args": {"name": self.process_name},
+            },
+        ]
+        thread_ids = set()
+        for phase, name, trace_id, start, duration, thread_id in list(self.events):
+            thread_ids.add(thread_id)
+            event: "dict[str, Any]" = {
+                "ph": phase,
+                "name": name,
+                "cat": FLOW_NAME,
+                "ts": start / 1000,
+                "pid": self.pid,
+                "tid": thread_id,
+            }
+            if phase == PHASE_COMPLETE:
+                event["dur"] = duration / 1000
+                event["args"] = {"trace_id": trace_id}
+            else:
+                event["id"] = trace_id
+                if phase == PHASE_FLOW_END:
+                    # bind to the enclosing span
+                    event["bp"] = "e"
+            trace_events.append(event)
+        trace_events.extend(
+            {
+                "ph": "M",
+                "name": "thread_name",
+                "pid": self.pid,
+                "tid": thread_id,
+                "args": {"name": thread_names.get(thread_id, str(thread_id))},
+            }
+            for thread_id in thread_ids
+        )
+        return {"traceEvents": trace_events, "displayTimeUnit": "ms"}
+
+    def dump(self, filepath: "str | Path") -> None:
+        with Path(filepath).open("w") as file:
+            json.dump(self.to_chrome_trace(), file)
+        log.info("Trace of %s events saved to %s", len(self.events), filepath)
+
+
+def enable(process_name: str, size: int = config.TRACE_BUFFER_SIZE) -> Tracer:
+    """
+    Start tracing, the trace is saved to `TRACE_FILE` at exit
+
+    :param process_name: e.g. gui or server
+    :param size: ring buffer size, events
+    :return:
+    """
+    global tracer  # noqa: PLW0603
+    tracer = Tracer(process_name, size)
+    filepath = config.TRACE_FILE.format(name=process_name, pid=tracer.pid)
+    atexit.register(tracer.dump, filepath)
+    return tracer
+
+
+@contextmanager
+def command_context(trace_id: int) -> "Iterator[None]":
+    """
+    Calls inside the block belong to the command `trace_id`
+    """
+    token = current_trace.set(trace_id)
+    try:
+        yield
+    finally:
+        current_trace.reset(token)
+
+
+@contextmanager
+def received() -> "Iterator[None]":
+    """
+    Server side: data handled inside the block was received now,
+    commands are untraced until a trace frame
+    """
+    time_token = received_at.set(now())
+    trace_token = current_trace.set(None)
+    try:
+        yield
+    finally:
+        current_trace.reset(trace_token)
+        received_at.reset(time_token)
+
+
+def traced_call(
+    tracer: Tracer,
+    trace_id: int,
+    method: "Callable[..., None]",
+) -> "Callable[..., None]":
+    """
+    :param tracer:
+    :param trace_id:
+    :param method: backend method
+    :return: method recording the wait before the call and the call itself
+    """
+    submitted_at = now()
+
+    @functools.wraps(method)
+    def call(*args: object) -> None:
+        tracer.complete("dispatch_wait", trace_id, submitted_at)
+        with tracer.span(f"backend {method.__name__}", trace_id):
+            method(*args)
+
+    return call
+
+
+def merge(output: "str | Path", inputs: "Sequence[str | Path]") -> None:
+    trace_events = []
+    for filepath in inputs:
+        with Path(filepath).open() as file:
+            trace_events.extend(json.load(file)["traceEvents"])
+    with Path(output).open("w") as file:
+        json.dump({"traceEvents": trace_events, "displayTimeUnit": "ms"}, file)
+
+
+def main() -> None:
+    logging.basicConfig(level=logging.INFO)
+    output, *inputs = sys.argv[1:] or [""]
+    if not inputs:
+        msg = "Usage: python -m robohandcontrol.tracing merged.json trace.json..."
+        raise SystemExit(msg)
+    merge(output, inputs)
+    log.info("Merged %s traces to %s", len(inputs), output)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,331 @@
+"""
+Smooth joint motion: targets are approached with velocity and acceleration
+limits, setpoints are sent to the backend at a fixed rate.
+
+Every tick each joint accelerates towards its target up to the max velocity
+and decelerates in time to stop on it (trapezoidal profile). A new target
+received mid-move starts from the current position and velocity,
+so the motion is pre-empted without a jump.
+"""
+
+import logging
+import math
+import threading
+import time
+from dataclasses import dataclass
+from typing import TYPE_CHECKING, Optional
+
+import config
+from config import ControlParam
+from robohandcontrol.robocontrol import Pose, RobohandControlBase
+
+if TYPE_CHECKING:
+    from typing import Callable
+
+log = logging.getLogger(__name__)
+
+JOINTS = (
+    ControlParam.ROTATION,
+    ControlParam.RAISE_ARROW,
+    ControlParam.EXTEND_ARROW,
+    ControlParam.CLAW,
+)
+# degrees, joint is considered at the target
+POSITION_TOLERANCE = 0.5
+SINGLE_PARAM_METHODS: "dict[str, str]" = {
+    ControlParam.ROTATION: "control_rotation",
+    ControlParam.RAISE_ARROW: "control_raise_arrow",
+    ControlParam.EXTEND_ARROW: "control_extend_arrow",
+    ControlParam.CLAW: "control_claw",
+    ControlParam.LED: "set_led_rgb",
+}
+
+
+@dataclass
+class JointLimits:
+    # degrees per second
+    max_velocity: float = float(config.SERVO_SPEED)
+    # degrees per second squared
+    max_acceleration: float = float(config.SERVO_ACCELERATION)
+
+
+def default_limits() -> "dict[str, JointLimits]":
+    return {param: JointLimits() for param in JOINTS}
+
+
+@dataclass
+class JointState:
+    limits: JointLimits
+    position: Optional[float] = None
+    velocity: float = 0.0
+    target: Optional[float] = None
+
+    @property
+    def is_moving(self) -> bool:
+        return self.target is not None and (
+            self.position != self.target or self.velocity != 0.0
+        )
+
+    def step(self, dt: float) -> None:
+        """
+        Move towards the target for `dt` seconds
+
+        :param dt:
+        :return:
+        """
+        if self.target is None:
+            return
+        if self.position is None:
+            # start position is unknown, nothing to interpolate from
+            self.position = self.target
+            return
+
+        error = self.target - self.position
+        max_acceleration = self.limits.max_acceleration
+        # fastest velocity which still allows to stop at the target
+        stopping_velocity = math.sqrt(2 * max_acceleration * abs(error))
+        desired = math.copysign(
+            min(self.limits.max_velocity, stopping_velocity),
+            error,
+        )
+        max_change = max_acceleration * dt
+        self.velocity += min(max(desired - self.velocity, -max_change), max_change)
+        self.position += self.velocity * dt
+
+        crossed = (self.target - self.position) * error <= 0
+        arrived = (
+            abs(self.target - self.position) < POSITION_TOLERANCE
+            and abs(self.velocity) <= max_change
+        )
+        if crossed or arrived:
+            self.position = self.target
+            self.velocity = 0.0
+
+
+class TrajectoryPlanner:
+    """
+    Joint states and targets, not thread safe
+    """
+
+    def __init__(self, limits: "Optional[dict[str, JointLimits]]" = None) -> None:
+        limits = limits or default_limits()
+        self.joints: "dict[str, JointState]" = {
+            param: JointState(limits=limits[param]) for param in JOINTS
+        }
+
+    @property
+    def is_moving(self) -> bool:
+        return any(joint.is_moving for joint in self.joints.values())
+
+    def set_position(self, pose: Pose) -> None:
+        """
+        Set known joint angles, e.g. at start
+
+        :param pose:
+        :return:
+        """
+        for param, args in pose.items():
+            if param in self.joints:
+                joint = self.joints[param]
+                joint.position = float(args[0])
+                joint.velocity = 0.0
+
+    def set_target(self, pose: Pose) -> None:
+        for param, args in pose.items():
+            if param in self.joints:
+                self.joints[param].target = float(args[0])
+
+    def finish(self) -> Pose:
+        """
+        Move every joint to its target at once
+
+        :return: setpoints of joints which were moving
+        """
+        setpoint = Pose()
+        for param, joint in self.joints.items():
+            if not joint.is_moving or joint.target is None:
+                continue
+            joint.position = joint.target
+            joint.velocity = 0.0
+            setpoint.set(param, round(joint.target))
+        return setpoint
+
+    def step(self, dt: float) -> Pose:
+        """
+        :param dt: seconds since the previous step
+        :return: joint setpoints, rounded to degrees
+        """
+        setpoint = Pose()
+        for param, joint in self.joints.items():
+            if not joint.is_moving:
+                continue
+            joint.step(dt)
+            if joint.position is not None:
+                setpoint.set(param, round(joint.position))
+        return setpoint
+
+
+@dataclass
+class TrajectoryStats:
+    ticks: int = 0
+    # ticks started later than the next tick time
+    overruns: int = 0
+    setpoints: int = 0
+    targets: int = 0
+
+
+class TrajectoryStreamer(RobohandControlBase):
+    """
+    Wraps a backend: control calls set targets,
+    the streaming thread sends interpolated setpoints at `rate` Hz.
+    LED changes are sent by the streaming thread on the next tick too,
+    so the backend is only called from one thread.
+    """
+
+    def __init__(
+        self,
+        robohand: RobohandControlBase,
+        limits: "Optional[dict[str, JointLimits]]" = None,
+        rate: float = config.TRAJECTORY_RATE,
+    ) -> None:
+        """
+        :param robohand: backend to send setpoints to
+        :param limits: limits by joint `ControlParam`
+        :param rate: setpoints per second
+        """
+        self.robohand = robohand
+        self.planner = TrajectoryPlanner(limits)
+        self.period = 1 / rate
+        self.stats = TrajectoryStats()
+        # last setpoint sent per joint
+        self.sent: "dict[str, tuple[int, ...]]" = {}
+        # LED color to send on the next tick
+        self.led: "Optional[tuple[int, int, int]]" = None
+        self._condition = threading.Condition()
+        self._closed = False
+        self._thread = threading.Thread(
+            target=self.run,
+            name="robohand-trajectory",
+            daemon=True,
+        )
+        self._thread.start()
+
+    def control_claw(self, angle: int) -> None:
+        self.set_target(Pose(claw=angle))
+
+    def control_extend_arrow(self, angle: int) -> None:
+        self.set_target(Pose(extend_arrow=angle))
+
+    def control_raise_arrow(self, angle: int) -> None:
+        self.set_target(Pose(raise_arrow=angle))
+
+    def control_rotation(self, angle: int) -> None:
+        self.set_target(Pose(rotation=angle))
+
+    def set_led_rgb(self, red: int, green: int, blue: int) -> None:
+        self.set_target(Pose(led=(red, green, blue)))
+
+    def set_pose(self, pose: Pose) -> None:
+        self.set_target(pose)
+
+    def pending_commands(self) -> int:
+        return self.robohand.pending_commands()
+
+    def set_target(self, pose: Pose) -> None:
+        with self._condition:
+            self.planner.set_target(pose)
+            if pose.led is not None:
+                self.led = pose.led
+            self.stats.targets += 1
+            self._condition.notify()
+
+    def set_position(self, pose: Pose) -> None:
+        with self._condition:
+            self.planner.set_position(pose)
+
+    def close(self, timeout: Optional[float] = None) -> None:
+        """
+        Stop the streaming thread, joints still moving are sent their targets
+
+        :param timeout: seconds to wait for the thread to finish
+        :return:
+        """
+        with self._condition:
+            self._closed = True
+            self._condition.notify()
+        self._thread.join(timeout)
+        if self._thread.is_alive():
+            return
+        with self._condition:
+            setpoint = self.planner.finish()
+            led, self.led = self.led, None
+        self.send_changed(setpoint, led)
+
+    @property
+    def has_pending(self) -> bool:
+        return self.planner.is_moving or self.led is not None
+
+    def wait_moving(self) -> bool:
+        """
+        :return: False if closed
+        """
+        with self._condition:
+            while not self._closed and not self.has_pending:
+                self._condition.wait()
+            return not self._closed
+
+    def tick(self) -> None:
+        with self._condition:
+            setpoint = self.planner.step(self.period)
+            led, self.led = self.led, None
+        self.stats.ticks += 1
+        self.send_changed(setpoint, led)
+
+    def send_changed(
+        self,
+        setpoint: Pose,
+        led: "Optional[tuple[int, int, int]]" = None,
+    ) -> None:
+        """
+        Send only joints whose rounded angle changed
+
+        :param setpoint: joint setpoints
+        :param led: LED color to send with them
+        :return:
+        """
+        if led is not None:
+            setpoint.set(ControlParam.LED, *led)
+        changed = Pose()
+        for param, args in setpoint.items():
+            if self.sent.get(param) != args:
+                changed.set(param, *args)
+                self.sent[param] = args
+        if changed:
+            self.stats.setpoints += 1
+            self.send(changed)
+
+    def send(self, pose: Pose) -> None:
+        method: "Callable[..., None]"
+        if len(pose) == 1:
+            ((param, args),) = pose.items()
+            method = getattr(self.robohand, SINGLE_PARAM_METHODS[param])
+            method(*args)
+            return
+        self.robohand.set_pose(pose)
+
+    def run(self) -> None:
+        while self.wait_moving():
+            next_at = time.monotonic()
+            while self.has_pending and not self._closed:
+                try:
+                    self.tick()
+                except Exception:
+                    log.exception("Error sending trajectory setpoint")
+                next_at += self.period
+                delay = next_at - time.monotonic()
+                if delay < 0:
+                    # skip missed ticks instead of sending them in a burst
+                    self.stats.overruns += 1
+                    next_at = time.monotonic()
+                    continue
+                time.sleep(delay)